@@ -2,13 +2,24 @@
 Universal RAG System - Flask Application
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from pathlib import Path
+import json
 import logging
-import os
+import time
 
+from config import Config
 from core import DatabaseManager, LLMService
+from core.embeddings import EmbeddingService
+from core.answer_cache import AnswerCache
 from core.classifier import DocumentClassifier
+from core.context_packer import ContextPacker
+from core.conversations import ConversationStore
+from core.file_index import FileIndex
+from core.manifest import IngestionManifest
+from core.model_warmer import ModelWarmer
+from core.stats import StatsService
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -23,9 +34,42 @@ DB_DIR = DATA_DIR / "database"
 SORTED_DIR = DATA_DIR / "sorted"
 
 # Initialize services
-db_manager = DatabaseManager(DB_DIR)
-llm_service = LLMService(model='llama3.2')
+db_manager = DatabaseManager(DB_DIR, retrieval_mode=Config.RETRIEVAL_MODE,
+                             embedding_service=EmbeddingService.from_config(Config),
+                             query_cache_size=Config.QUERY_EMBEDDING_CACHE_SIZE)
+answer_cache = AnswerCache(
+    max_entries=Config.ANSWER_CACHE_SIZE,
+    ttl_seconds=Config.ANSWER_CACHE_TTL,
+    db_path=Config.ANSWER_CACHE_DB
+)
+context_packer = ContextPacker(
+    token_budget=Config.CONTEXT_TOKEN_BUDGET,
+    max_sources=Config.CONTEXT_MAX_SOURCES,
+    num_ctx_min=Config.NUM_CTX_MIN,
+    num_ctx_max=Config.NUM_CTX_MAX
+)
+llm_service = LLMService(model=Config.LLM_MODEL, answer_cache=answer_cache, context_packer=context_packer,
+                         keep_alive=Config.OLLAMA_KEEP_ALIVE)
+# Loads the model at startup (if enabled) and keeps it resident during working hours
+model_warmer = ModelWarmer.from_config(Config, llm_service)
+model_warmer.start(warm_up=Config.OLLAMA_WARMUP)
 classifier = DocumentClassifier()
+# Follow-up questions reuse their session's chunks and Ollama context
+conversations = ConversationStore(max_sessions=Config.CONVERSATION_MAX_SESSIONS,
+                                  ttl_seconds=Config.CONVERSATION_TTL)
+# Download lookups; reloads itself when the watcher updates the manifest
+manifest = IngestionManifest(Config.MANIFEST_DB)
+file_index = FileIndex(manifest, SORTED_DIR)
+# /status counters; Ollama health and the vector store count are refreshed in the background
+stats_service = StatsService(manifest, SORTED_DIR, db_manager=db_manager, llm_service=llm_service,
+                             refresh_interval=Config.STATUS_HEALTH_INTERVAL)
+stats_service.start()
+# Extra /status sections registered by other serving layers (e.g. asgi.py's LLM queue)
+status_sections = {}
+
+# Shared by all /chat/batch requests, so it caps parallel Ollama generations overall
+generation_pool = ThreadPoolExecutor(max_workers=Config.BATCH_MAX_PARALLEL_GENERATIONS,
+                                     thread_name_prefix="generate")
 
 logger.info(f"✅ Database initialized with {db_manager.get_count()} documents")
 
@@ -44,7 +88,11 @@ def test():
 
 @app.route('/chat', methods=['POST'])
 def chat():
-    """Handle chat queries"""
+    """Handle chat queries
+    
+    Pass the returned session_id back with the next query so follow-up
+    questions reuse this turn's sources and context.
+    """
     try:
         data = request.get_json(silent=True)
         
@@ -56,23 +104,149 @@ def chat():
         if not query:
             return jsonify({'error': 'Empty query'}), 400
         
-        chunks = db_manager.query(query, n_results=5)
+        session = conversations.get_or_create(data.get('session_id'))
+        chunks, follow_up = conversations.start_turn(session, query, db_manager)
         
         if not chunks:
             return jsonify({
                 'answer': 'No relevant documents found.',
                 'cited_files': [],
                 'confidence_score': 0,
-                'source_snippets': []
+                'source_snippets': [],
+                'session_id': session['id']
             })
         
-        answer, cited_files, confidence_score, source_snippets = llm_service.generate_response(query, chunks)
+        report = {}
+        answer, cited_files, confidence_score, source_snippets = llm_service.generate_response(
+            query, chunks, conversation=session, report=report)
+        conversations.record_turn(session, query, chunks, follow_up)
         
         return jsonify({
             'answer': answer,
             'cited_files': cited_files,
             'confidence_score': confidence_score,
-            'source_snippets': source_snippets
+            'source_snippets': source_snippets,
+            'context': report.get('context'),
+            'session_id': session['id'],
+            'follow_up': follow_up
+        })
+        
+    except Exception as e:
+        logger.error(f"Error: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat queries, streaming the answer as newline-delimited JSON events
+
+    Emits {"type": "token", "text": ...} lines while the answer is generated,
+    then a final {"type": "done", ...} line with the same fields as /chat
+    (including session_id).
+    """
+    data = request.get_json(silent=True)
+    
+    if not data:
+        return jsonify({'error': 'Invalid request'}), 400
+    
+    query = str(data.get('query', '')).strip()
+    
+    if not query:
+        return jsonify({'error': 'Empty query'}), 400
+    
+    session = conversations.get_or_create(data.get('session_id'))
+    
+    def generate():
+        try:
+            chunks, follow_up = conversations.start_turn(session, query, db_manager)
+            
+            if not chunks:
+                yield json.dumps({
+                    'type': 'done',
+                    'answer': 'No relevant documents found.',
+                    'cited_files': [],
+                    'confidence_score': 0,
+                    'source_snippets': [],
+                    'session_id': session['id']
+                }) + "\n"
+                return
+            
+            for event in llm_service.generate_response_stream(query, chunks, conversation=session):
+                if event['type'] == 'done':
+                    conversations.record_turn(session, query, chunks, follow_up)
+                    event['session_id'] = session['id']
+                    event['follow_up'] = follow_up
+                yield json.dumps(event) + "\n"
+                
+        except Exception as e:
+            logger.error(f"Error: {e}", exc_info=True)
+            yield json.dumps({'type': 'error', 'error': str(e)}) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many queries in one request (for evaluation runs)
+
+    Takes {"queries": [...]}. All queries are embedded together and retrieved
+    with a single Chroma query, then answers are generated concurrently up to
+    Config.BATCH_MAX_PARALLEL_GENERATIONS. Results keep the input order and
+    carry per-query timings.
+    """
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('queries'), list):
+        return jsonify({'error': 'Invalid request'}), 400
+    
+    queries = [str(q).strip() for q in data['queries']]
+    
+    if not queries or any(not q for q in queries):
+        return jsonify({'error': 'Empty query'}), 400
+    if len(queries) > Config.BATCH_MAX_QUERIES:
+        return jsonify({'error': f'Too many queries (max {Config.BATCH_MAX_QUERIES})'}), 400
+    
+    try:
+        started = time.perf_counter()
+        retrieved = db_manager.query_batch(queries, n_results=5)
+        retrieval_ms = (time.perf_counter() - started) * 1000
+        
+        def answer(query, chunks, retrieval_timings):
+            generation_started = time.perf_counter()
+            report = {}
+            if chunks:
+                answer_text, cited_files, confidence_score, source_snippets = \
+                    llm_service.generate_response(query, chunks, report=report)
+            else:
+                answer_text, cited_files, confidence_score, source_snippets = \
+                    'No relevant documents found.', [], 0, []
+            return {
+                'query': query,
+                'answer': answer_text,
+                'cited_files': cited_files,
+                'confidence_score': confidence_score,
+                'source_snippets': source_snippets,
+                'context': report.get('context'),
+                'timings': {
+                    'retrieval_ms': retrieval_timings,
+                    'generation_ms': round((time.perf_counter() - generation_started) * 1000, 2),
+                }
+            }
+        
+        futures = [generation_pool.submit(answer, query, chunks, timings)
+                   for query, (chunks, timings) in zip(queries, retrieved)]
+        results = [future.result() for future in futures]
+        
+        return jsonify({
+            'results': results,
+            'timings': {
+                'retrieval_ms': round(retrieval_ms, 2),
+                'total_ms': round((time.perf_counter() - started) * 1000, 2),
+            }
         })
         
     except Exception as e:
@@ -106,17 +280,43 @@ def classify():
         return jsonify({'error': str(e)}), 500
 
 
+def send_indexed_file(file_id: str, filepath: Path):
+    """Send a file with Range, ETag (its content hash) and Last-Modified support"""
+    response = send_file(filepath, as_attachment=True, download_name=filepath.name,
+                         conditional=True, etag=file_id)
+    # Browsers revalidate with If-None-Match and get a 304 for files they already have
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/files/<file_id>')
+def download_by_id(file_id):
+    """Download a file by file ID (content hash) or by the ID of one of its chunks"""
+    try:
+        found = file_index.resolve(file_id)
+        if found is None:
+            return jsonify({'error': 'File not found'}), 404
+        return send_indexed_file(*found)
+        
+    except Exception as e:
+        logger.error(f"Error downloading file: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/download/<path:filename>')
 def download_file(filename):
-    """Download cited file"""
+    """Download cited file by name; colliding names list their file IDs instead"""
     try:
-        # Search for file in sorted directory
-        for root, dirs, files in os.walk(SORTED_DIR):
-            if filename in files:
-                filepath = os.path.join(root, filename)
-                return send_file(filepath, as_attachment=True)
-        
-        return jsonify({'error': 'File not found'}), 404
+        matches = file_index.find_by_name(filename)
+        if not matches:
+            return jsonify({'error': 'File not found'}), 404
+        if len(matches) > 1:
+            return jsonify({
+                'error': 'Several files have this name',
+                'files': [{'file_id': file_id, 'path': file_index.relative(path), 'url': f"/files/{file_id}"}
+                          for file_id, path in matches]
+            }), 409
+        return send_indexed_file(*matches[0])
         
     except Exception as e:
         logger.error(f"Error downloading file: {e}")
@@ -162,23 +362,24 @@ def export_chat():
 
 @app.route('/status')
 def status():
-    """Get system status"""
+    """Get system status from cached counters (no directory scans or Ollama calls)"""
     try:
-        doc_count = db_manager.get_count()
-        
-        # Count files in sorted directory
-        sorted_files = 0
-        categories = []
-        for category_dir in SORTED_DIR.iterdir():
-            if category_dir.is_dir():
-                categories.append(category_dir.name)
-                sorted_files += len(list(category_dir.glob('*')))
-        
         return jsonify({
-            'database_count': doc_count,
-            'sorted_files': sorted_files,
-            'categories': categories,
-            'ollama_available': llm_service.check_availability()
+            **stats_service.get_stats(),
+            'answer_cache': answer_cache.get_stats(),
+            'coalescing': llm_service.single_flight.get_stats(),
+            'conversations': conversations.get_stats(),
+            'model': {**model_warmer.get_stats(), 'latency': llm_service.latency.get_stats()},
+            'last_context': llm_service.last_context,
+            'retrieval': {
+                'mode': db_manager.retrieval_mode,
+                'last_timings_ms': db_manager.last_timings
+            },
+            'embeddings': (db_manager.embedding_service.get_stats() if db_manager.embedding_service
+                           else {'backend': 'chroma'}),
+            'query_embeddings': db_manager.query_cache.get_stats(),
+            'file_index': file_index.get_stats(),
+            **{name: get_section() for name, get_section in status_sections.items()}
         })
         
     except Exception as e:
@@ -0,0 +1,245 @@
+"""
+Universal RAG System - ASGI server
+
+/chat and /chat/stream are served natively with Ollama's async client behind
+admission control (bounded concurrency, bounded wait queue, 429/503 with
+Retry-After, per-request timeouts). Every other route is the Flask app,
+mounted as WSGI.
+
+Run with: python asgi.py   (or: uvicorn asgi:app --host 0.0.0.0 --port 5000)
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional, Tuple
+
+import uvicorn
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from config import Config
+from core.admission import AdmissionController, Overloaded
+from app import app as flask_app, conversations, db_manager, llm_service, status_sections
+
+logger = logging.getLogger(__name__)
+
+admission = AdmissionController(
+    max_concurrent=Config.LLM_MAX_CONCURRENT,
+    max_queue=Config.LLM_MAX_QUEUE,
+    queue_timeout=Config.LLM_QUEUE_TIMEOUT,
+    retry_after=Config.LLM_RETRY_AFTER
+)
+status_sections['llm_queue'] = admission.get_stats
+
+wsgi_app = WSGIMiddleware(flask_app, workers=Config.ASGI_WSGI_THREADS)
+
+NO_DOCUMENTS = {
+    'answer': 'No relevant documents found.',
+    'cited_files': [],
+    'confidence_score': 0,
+    'source_snippets': []
+}
+
+
+async def read_json(receive) -> Optional[dict]:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        data = json.loads(body or b'null')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def send_json(send, status: int, payload: dict, headers=()) -> None:
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()), *headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_overloaded(send, error: Overloaded) -> None:
+    logger.warning(f"⚠️ Rejected request ({error.status}): {error.reason}")
+    await send_json(send, error.status, {'error': error.reason, 'retry_after': error.retry_after},
+                    headers=[(b'retry-after', str(error.retry_after).encode())])
+
+
+async def read_query(receive, send) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse {"query": ..., "session_id": ...} like the Flask routes, answering 400 on bad input"""
+    data = await read_json(receive)
+    if not data:
+        await send_json(send, 400, {'error': 'Invalid request'})
+        return None
+    query = str(data.get('query', '')).strip()
+    if not query:
+        await send_json(send, 400, {'error': 'Empty query'})
+        return None
+    return query, data.get('session_id')
+
+
+async def chat(receive, send) -> None:
+    """Async /chat: same request and response shape as the Flask route"""
+    parsed = await read_query(receive, send)
+    if parsed is None:
+        return
+    query, session_id = parsed
+    try:
+        session = conversations.get_or_create(session_id)
+        chunks, follow_up = await asyncio.to_thread(conversations.start_turn, session, query, db_manager)
+        if not chunks:
+            await send_json(send, 200, dict(NO_DOCUMENTS, session_id=session['id']))
+            return
+
+        report = {}
+        answer, cited_files, confidence_score, source_snippets = await llm_service.generate_response_async(
+            query, chunks, timeout=Config.LLM_REQUEST_TIMEOUT, admission=admission, conversation=session,
+            report=report
+        )
+        conversations.record_turn(session, query, chunks, follow_up)
+        await send_json(send, 200, {
+            'answer': answer,
+            'cited_files': cited_files,
+            'confidence_score': confidence_score,
+            'source_snippets': source_snippets,
+            'context': report.get('context'),
+            'session_id': session['id'],
+            'follow_up': follow_up
+        })
+    except Overloaded as e:
+        await send_overloaded(send, e)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Generation timed out after {Config.LLM_REQUEST_TIMEOUT}s")
+        await send_json(send, 504, {'error': 'The answer took too long to generate. Please try again.'})
+    except Exception as e:
+        logger.error(f"Error: {e}", exc_info=True)
+        await send_json(send, 500, {'error': str(e)})
+
+
+async def wait_for_disconnect(receive) -> None:
+    """Return once the client goes away (call after the request body has been read)"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def chat_stream(receive, send) -> None:
+    """Async /chat/stream: NDJSON token events, then a done event
+
+    A client that disconnects cancels its generation, which releases the
+    admission slot and closes the Ollama stream.
+    """
+    parsed = await read_query(receive, send)
+    if parsed is None:
+        return
+    stream = asyncio.ensure_future(stream_chat(*parsed, send))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({stream, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        if not stream.done():
+            logger.info("🔌 Client disconnected, cancelling generation")
+            stream.cancel()
+            await asyncio.gather(stream, return_exceptions=True)
+    if not stream.cancelled():
+        stream.result()
+
+
+async def stream_chat(query: str, session_id: Optional[str], send) -> None:
+    events = None
+
+    def finish(event: dict) -> None:
+        conversations.record_turn(session, query, chunks, follow_up)
+        event['session_id'] = session['id']
+        event['follow_up'] = follow_up
+
+    try:
+        try:
+            session = conversations.get_or_create(session_id)
+            chunks, follow_up = await asyncio.to_thread(conversations.start_turn, session, query, db_manager)
+            events = llm_service.generate_response_stream_async(
+                query, chunks, timeout=Config.LLM_REQUEST_TIMEOUT, admission=admission, conversation=session
+            ) if chunks else None
+            # Admission happens before the first event, so rejections can still be a plain 429/503
+            first_event = (await events.__anext__() if events
+                           else dict(NO_DOCUMENTS, type='done', session_id=session['id']))
+            if events and first_event['type'] == 'done':
+                finish(first_event)
+        except Overloaded as e:
+            await send_overloaded(send, e)
+            return
+        except asyncio.TimeoutError:
+            await send_json(send, 504, {'error': 'The answer took too long to generate. Please try again.'})
+            return
+        except Exception as e:
+            logger.error(f"Error: {e}", exc_info=True)
+            await send_json(send, 500, {'error': str(e)})
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/x-ndjson'), (b'cache-control', b'no-cache'),
+                        (b'x-accel-buffering', b'no')]
+        })
+        await send({'type': 'http.response.body', 'body': (json.dumps(first_event) + "\n").encode(),
+                    'more_body': True})
+        if events:
+            try:
+                async for event in events:
+                    if event['type'] == 'done':
+                        finish(event)
+                    await send({'type': 'http.response.body', 'body': (json.dumps(event) + "\n").encode(),
+                                'more_body': True})
+            except asyncio.TimeoutError:
+                error = {'type': 'error', 'error': 'The answer took too long to generate. Please try again.'}
+                await send({'type': 'http.response.body', 'body': (json.dumps(error) + "\n").encode(),
+                            'more_body': True})
+            except Exception as e:
+                logger.error(f"Error: {e}", exc_info=True)
+                error = {'type': 'error', 'error': str(e)}
+                await send({'type': 'http.response.body', 'body': (json.dumps(error) + "\n").encode(),
+                            'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if events is not None:
+            # Exits the admission slot and closes Ollama's stream, also when cancelled mid-generation
+            await events.aclose()
+
+
+ASYNC_ROUTES = {
+    '/chat': chat,
+    '/chat/stream': chat_stream,
+}
+
+
+async def app(scope, receive, send):
+    """Route the LLM endpoints to async handlers and everything else to Flask"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    handler = ASYNC_ROUTES.get(scope.get('path'))
+    if scope['type'] == 'http' and scope['method'] == 'POST' and handler:
+        await handler(receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+
+if __name__ == '__main__':
+    logger.info("🚀 Starting DocuMind AI (ASGI)...")
+    logger.info(f"🔒 LLM concurrency {Config.LLM_MAX_CONCURRENT}, queue {Config.LLM_MAX_QUEUE}, "
+                f"timeout {Config.LLM_REQUEST_TIMEOUT}s")
+    uvicorn.run(app, host=Config.FLASK_HOST, port=Config.FLASK_PORT)
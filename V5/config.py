@@ -1,4 +1,5 @@
 """Configuration for Universal RAG System"""
+import os
 from pathlib import Path
 
 class Config:
@@ -10,14 +11,81 @@ class Config:
     INCOMING_DIR = DATA_DIR / "incoming"
     SORTED_DIR = DATA_DIR / "sorted"
     DB_DIR = DATA_DIR / "database"
+    MANIFEST_DB = DB_DIR / "manifest.db"  # lives with the vector store so both are reset together
     
     # LLM Settings
     LLM_MODEL = "llama3.2"
+    CONTEXT_TOKEN_BUDGET = 2500  # estimated tokens of document text per prompt
+    CONTEXT_MAX_SOURCES = 5  # passages per prompt after merging neighbouring chunks
+    NUM_CTX_MIN = 2048  # num_ctx is the smallest power of two >= prompt + num_predict,
+    NUM_CTX_MAX = 8192  # within these limits (each distinct value makes Ollama reload the model)
+    OLLAMA_KEEP_ALIVE = "30m"  # how long Ollama keeps the model loaded after a request
+    OLLAMA_WARMUP = True  # load the model with a one-token generation when the app starts
+    OLLAMA_HEARTBEAT_INTERVAL = 240  # seconds between keep_alive renewals (must be < OLLAMA_KEEP_ALIVE)
+    OLLAMA_WORKING_HOURS = (8, 20)  # [start, end) hours when the heartbeat keeps the model resident
+    OLLAMA_WORKING_DAYS = (0, 1, 2, 3, 4, 5, 6)  # weekdays, Monday = 0
+    
+    # Answer Cache Settings
+    ANSWER_CACHE_SIZE = 256
+    ANSWER_CACHE_TTL = 3600  # seconds
+    ANSWER_CACHE_DB = DATA_DIR / "cache" / "answers.db"  # None keeps the cache in memory only
+    
+    # Embedding Settings
+    EMBEDDING_BACKEND = "onnx"  # "onnx" (batched MiniLM, below) or "chroma" (Chroma's default function)
+    EMBEDDING_BATCH_SIZE = 64
+    EMBEDDING_THREADS = os.cpu_count() or 4  # onnxruntime intra-op threads
+    EMBEDDING_QUANTIZED = False  # int8 MiniLM; vectors differ slightly, so rebuild the DB after changing
+    EMBEDDING_CACHE_DB = DATA_DIR / "cache" / "embeddings.db"
+    QUERY_EMBEDDING_CACHE_SIZE = 1024  # LRU of recent query vectors
+    
+    # Retrieval Settings
+    RETRIEVAL_MODE = "hybrid"  # "vector" (Chroma only), "bm25" (keyword only) or "hybrid" (RRF fusion)
+    
+    # Conversation Settings (session_id on /chat and /chat/stream)
+    CONVERSATION_MAX_SESSIONS = 1000  # least recently used sessions are evicted beyond this
+    CONVERSATION_TTL = 1800  # seconds without a turn before a session expires
+    
+    # Status Settings (/status)
+    STATUS_HEALTH_INTERVAL = 30  # seconds between background Ollama and vector store checks
+    
+    # Batch Chat Settings (/chat/batch)
+    BATCH_MAX_QUERIES = 50
+    # Ollama only runs this many at once if OLLAMA_NUM_PARALLEL allows it
+    BATCH_MAX_PARALLEL_GENERATIONS = 2
+    
+    # OCR Settings (images and scanned PDF pages)
+    OCR_DPI = 200  # render resolution for PDF pages without a text layer
+    OCR_MAX_PAGES = 50  # scanned pages OCR'd per document
+    OCR_WORKERS = 2  # tesseract processes at once, shared by the extraction processes (at least one each)
+    OCR_TIMEOUT = 60  # seconds per image
+    OCR_LANG = "eng"
+    OCR_MAX_DPI = 300  # images are downscaled to this resolution before OCR
+    OCR_MAX_SIDE = 4000  # ...and to at most this many pixels on the longest side
+    OCR_BINARIZE = True  # grayscale + Otsu threshold before OCR
+    OCR_CACHE_DB = DATA_DIR / "cache" / "ocr.db"  # results by image content hash
     
     # Processing Settings
-    CHUNK_SIZE = 500
+    CHUNK_TOKENS = 200  # target estimated tokens per chunk (MiniLM reads at most 256)
+    CHUNK_OVERLAP_TOKENS = 30  # trailing sentences repeated when a section spans several chunks
     TOP_K_RETRIEVAL = 4
     
+    # Ingestion Pipeline Settings
+    INGEST_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # extraction processes
+    INGEST_BATCH_SIZE = 256  # chunks per database write
+    INGEST_QUEUE_SIZE = 64  # files buffered between stages before submit() blocks
+    
+    # Sorted-tree Sync Settings (deletions are tracked by filesystem events)
+    SYNC_RECONCILE_INTERVAL = 24 * 3600  # seconds between full metadata reconciliations
+    SYNC_PAGE_SIZE = 5000  # metadata records fetched per page during reconciliation
+    
+    # ASGI Server Settings (python asgi.py)
+    LLM_MAX_CONCURRENT = 4  # generations sent to Ollama at once
+    LLM_MAX_QUEUE = 32  # requests allowed to wait for a slot; more get 429
+    LLM_QUEUE_TIMEOUT = 30  # seconds to wait for a slot before 503
+    LLM_REQUEST_TIMEOUT = 120  # seconds per generation before 504
+    LLM_RETRY_AFTER = 5  # Retry-After header on 429/503, in seconds
+    ASGI_WSGI_THREADS = 10  # threads serving the remaining Flask routes
+    
     # Flask Settings
     FLASK_HOST = "0.0.0.0"
     FLASK_PORT = 5000
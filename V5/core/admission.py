@@ -0,0 +1,78 @@
+"""Admission control for LLM requests: bounded concurrency plus a bounded wait queue"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request is turned away; maps to an HTTP status with Retry-After"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Lets at most ``max_concurrent`` generations run and ``max_queue`` wait.
+
+    A request arriving when the queue is full is rejected at once with 429,
+    and one that waits longer than ``queue_timeout`` for a slot gets 503, so
+    clients back off instead of piling more work onto Ollama.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 32,
+                 queue_timeout: float = 30.0, retry_after: int = 5):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one generation slot for the duration of the block"""
+        if self._semaphore is None:
+            # Created lazily so it binds to the server's running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(429, "Server busy: LLM queue is full", self.retry_after)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(503, "Server busy: timed out waiting for the LLM", self.retry_after)
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> dict:
+        return {
+            'in_flight': self.in_flight,
+            'queue_depth': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+        }
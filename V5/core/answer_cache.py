@@ -0,0 +1,133 @@
+"""LRU + TTL answer cache with an optional SQLite tier"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerCache:
+    """Caches generated answers by normalized query, model and retrieved chunks.
+
+    The key includes the sorted chunk IDs the answer was generated from, so
+    re-indexing a document changes the retrieved set and the old answer is
+    simply never looked up again. Entries expire after ``ttl_seconds`` and the
+    in-memory tier evicts the least recently used entry beyond ``max_entries``.
+    When ``db_path`` is given, entries are also written to SQLite so they
+    survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600,
+                 db_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if db_path is not None:
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM answers WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            logger.info(f"Answer cache persisted at {db_path}")
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!. ")
+
+    @classmethod
+    def make_key(cls, query: str, model: str, chunk_ids: Iterable[str]) -> str:
+        """Build a cache key from the normalized query, model and retrieved chunk set"""
+        payload = json.dumps([cls.normalize_query(query), model, sorted(chunk_ids)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return the cached answer tuple, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM answers WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = tuple(json.loads(row[0]))
+                    self._store_memory(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: tuple) -> None:
+        """Store an answer tuple in memory and, if enabled, on disk"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store_memory(key, expires_at, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO answers (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(list(value)), expires_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not persist cached answer: {e}")
+
+    def _store_memory(self, key: str, expires_at: float, value: tuple) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached answer from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters and sizes for the status endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+            }
+            if self._db is not None:
+                stats['disk_entries'] = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            return stats
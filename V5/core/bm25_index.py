@@ -0,0 +1,132 @@
+"""SQLite FTS5 inverted index for BM25 keyword retrieval alongside ChromaDB"""
+from pathlib import Path
+from typing import Iterable, List, Optional
+import logging
+import re
+import sqlite3
+import threading
+
+from models.document import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+
+class BM25Index:
+    """Inverted index over chunk text, ranked with FTS5's built-in BM25.
+
+    Chunk text and metadata live in a plain ``chunks`` table; ``chunks_fts`` is
+    an external-content FTS5 table kept in sync by triggers, so deletes by
+    chunk ID, file hash or filepath use ordinary indexes.
+    """
+
+    MAX_QUERY_TERMS = 32
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                rowid INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                file_hash TEXT,
+                filepath TEXT,
+                filename TEXT,
+                category TEXT,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks (file_hash);
+            CREATE INDEX IF NOT EXISTS idx_chunks_filepath ON chunks (filepath);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, content='chunks', content_rowid='rowid', tokenize='unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts (rowid, text) VALUES (new.rowid, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+            END;
+        """)
+        self._conn.commit()
+
+    def add_chunks(self, chunks: List[DocumentChunk]) -> None:
+        """Index chunks, replacing any existing entries with the same IDs"""
+        if not chunks:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(c.chunk_id,) for c in chunks])
+            self._conn.executemany(
+                "INSERT INTO chunks (chunk_id, file_hash, filepath, filename, category, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(c.chunk_id, c.document_hash, c.filepath, c.filename, c.category, c.text) for c in chunks]
+            )
+            self._conn.commit()
+
+    def add_records(self, ids: List[str], documents: List[str], metadatas: List[dict]) -> None:
+        """Index raw Chroma records (used to backfill an existing collection)"""
+        chunks = [
+            DocumentChunk(chunk_id=chunk_id, document_hash=(meta or {}).get('file_hash', ''), text=doc or '',
+                          chunk_index=(meta or {}).get('chunk_index', 0), filename=(meta or {}).get('filename', ''),
+                          category=(meta or {}).get('category', ''), filepath=(meta or {}).get('filepath', ''))
+            for chunk_id, doc, meta in zip(ids, documents, metadatas)
+        ]
+        self.add_chunks(chunks)
+
+    def _delete_where(self, column: str, values: Iterable[str]) -> int:
+        with self._lock:
+            cursor = self._conn.executemany(f"DELETE FROM chunks WHERE {column} = ?", [(v,) for v in values])
+            self._conn.commit()
+            return cursor.rowcount
+
+    def delete_ids(self, chunk_ids: Iterable[str]) -> int:
+        return self._delete_where("chunk_id", chunk_ids)
+
+    def delete_by_hash(self, file_hash: str) -> int:
+        return self._delete_where("file_hash", [file_hash])
+
+    def delete_by_filepath(self, filepath: str) -> int:
+        return self._delete_where("filepath", [filepath])
+
+    def repoint(self, chunk_ids: Iterable[str], filepath: str, filename: str, category: Optional[str] = None) -> None:
+        """Change the file (and optionally the category) that existing chunks belong to"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET filepath = ?, filename = ?, category = COALESCE(?, category) WHERE chunk_id = ?",
+                [(filepath, filename, category, chunk_id) for chunk_id in chunk_ids])
+            self._conn.commit()
+
+    @classmethod
+    def build_match_query(cls, query: str) -> str:
+        """Turn free text into an FTS5 OR-query of quoted terms (no user syntax passes through)"""
+        terms = []
+        for term in re.findall(r"\w+", query.lower()):
+            if term not in terms:
+                terms.append(term)
+        return " OR ".join(f'"{term}"' for term in terms[:cls.MAX_QUERY_TERMS])
+
+    def search(self, query: str, n_results: int = 20) -> List[dict]:
+        """Return the best BM25 matches, best first"""
+        match = self.build_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.chunk_id, c.text, c.filename, c.category, c.filepath, bm25(chunks_fts) AS score "
+                "FROM chunks_fts JOIN chunks c ON c.rowid = chunks_fts.rowid "
+                "WHERE chunks_fts MATCH ? ORDER BY score LIMIT ?",
+                (match, n_results)
+            ).fetchall()
+        # FTS5 reports BM25 as a negative number (lower is better); flip it for readability
+        return [{
+            'chunk_id': row[0],
+            'text': row[1],
+            'filename': row[2] or 'Unknown',
+            'category': row[3] or 'Uncategorized',
+            'filepath': row[4] or '',
+            'bm25_score': -row[5],
+        } for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
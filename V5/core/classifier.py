@@ -2,6 +2,8 @@
 import logging
 from typing import Dict
 
+from utils.keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -211,72 +213,76 @@ class DocumentClassifier:
         }
     }
     
-    def _guardrail_classify(self, text_lower: str, filename_lower: str, filename: str):
-        """Apply explicit guardrail rules to prevent obvious misclassifications.
-        Returns a forced classification dict or None.
-        """
-        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    # Guardrail rules ordered by specificity and risk of misclassification
+    GUARDRAIL_RULES = [
+        # Technology
+        {"domain":"Technology","category":"UAV","kw":["uav","drone","quadcopter","aerial"]},
+        {"domain":"Technology","category":"API","kw":["openapi","swagger","graphql","grpc","raml","api gateway","rest api","api documentation","http method","endpoints"]},
+        {"domain":"Technology","category":"DevOps","kw":["docker","kubernetes","k8s","jenkins","terraform","ansible","helm","github actions","gitlab ci","ci/cd","cicd"]},
+        {"domain":"Technology","category":"Database","kw":["postgres","mysql","mongodb","redis","elasticsearch","dynamodb","cassandra","database","sql"],},
+        {"domain":"Technology","category":"Security","kw":["encryption","ssl","tls","certificate","oauth","jwt","firewall","penetration test","xss","csrf","aes","rsa","hashing"]},
+        {"domain":"Technology","category":"Mobile","kw":["android","ios","flutter","react native","xcode","apk","ipa","swift","kotlin"]},
+        {"domain":"Technology","category":"Cloud","kw":["aws","azure","gcp","lambda","s3","cloudformation","ec2","iam","gke","aks","app service","functions"]},
+
+        # Code
+        {"domain":"Code","category":"Frontend","kw":["react","jsx","tsx","nextjs","component","usestate","useeffect","<html","<div","<body","<!doctype","tailwind","redux","vue","angular"]},
+        {"domain":"Code","category":"Backend","kw":["api","endpoint","route","middleware","controller","express","django","flask","fastapi","spring","server","http","request","response","jwt","orm"]},
+        {"domain":"Code","category":"Algorithm","kw":["algorithm","sorting","binary search","time complexity","big o","graph","dynamic programming","quicksort","mergesort"]},
+        {"domain":"Code","category":"Testing","kw":["pytest","unittest","jest","mocha","vitest","test case","assert","mock","coverage","tdd","bdd"]},
 
-        # Rules ordered by specificity and risk of misclassification
-        rules = [
-            # Technology
-            {"domain":"Technology","category":"UAV","kw":["uav","drone","quadcopter","aerial"]},
-            {"domain":"Technology","category":"API","kw":["openapi","swagger","graphql","grpc","raml","api gateway","rest api","api documentation","http method","endpoints"]},
-            {"domain":"Technology","category":"DevOps","kw":["docker","kubernetes","k8s","jenkins","terraform","ansible","helm","github actions","gitlab ci","ci/cd","cicd"]},
-            {"domain":"Technology","category":"Database","kw":["postgres","mysql","mongodb","redis","elasticsearch","dynamodb","cassandra","database","sql"],},
-            {"domain":"Technology","category":"Security","kw":["encryption","ssl","tls","certificate","oauth","jwt","firewall","penetration test","xss","csrf","aes","rsa","hashing"]},
-            {"domain":"Technology","category":"Mobile","kw":["android","ios","flutter","react native","xcode","apk","ipa","swift","kotlin"]},
-            {"domain":"Technology","category":"Cloud","kw":["aws","azure","gcp","lambda","s3","cloudformation","ec2","iam","gke","aks","app service","functions"]},
+        # Finance
+        {"domain":"Finance","category":"Payroll","kw":["payroll","salary","wage","compensation","deduction","withholding"]},
+        {"domain":"Finance","category":"Accounting","kw":["ledger","balance sheet","trial balance","accounts payable","accounts receivable","audit","ifrs","gaap"]},
+        {"domain":"Finance","category":"Investment","kw":["portfolio","stock","dividend","equity","roi","bond","mutual fund","etf"]},
+        {"domain":"Finance","category":"Tax","kw":["tax","gst","vat","irs","filing","deduction"]},
+        {"domain":"Finance","category":"Expense","kw":["expense report","reimbursement","receipt","invoice","opex","capex"]},
+        {"domain":"Finance","category":"Budget","kw":["budget","forecast","planning","variance","allocation"]},
+        {"domain":"Finance","category":"Maintenance","kw":["maintenance","repair","upkeep"]},
 
-            # Code
-            {"domain":"Code","category":"Frontend","kw":["react","jsx","tsx","nextjs","component","usestate","useeffect","<html","<div","<body","<!doctype","tailwind","redux","vue","angular"]},
-            {"domain":"Code","category":"Backend","kw":["api","endpoint","route","middleware","controller","express","django","flask","fastapi","spring","server","http","request","response","jwt","orm"]},
-            {"domain":"Code","category":"Algorithm","kw":["algorithm","sorting","binary search","time complexity","big o","graph","dynamic programming","quicksort","mergesort"]},
-            {"domain":"Code","category":"Testing","kw":["pytest","unittest","jest","mocha","vitest","test case","assert","mock","coverage","tdd","bdd"]},
+        # Healthcare & Legal
+        {"domain":"Healthcare","category":"Other","kw":["patient","diagnosis","treatment","x-ray","mri","ct scan","clinical","hospital","prescription","medication","therapy"]},
+        {"domain":"Legal","category":"Other","kw":["contract","agreement","clause","liability","jurisdiction","indemnity","compliance","statute","copyright","patent","trademark","terms and conditions"]},
 
-            # Finance
-            {"domain":"Finance","category":"Payroll","kw":["payroll","salary","wage","compensation","deduction","withholding"]},
-            {"domain":"Finance","category":"Accounting","kw":["ledger","balance sheet","trial balance","accounts payable","accounts receivable","audit","ifrs","gaap"]},
-            {"domain":"Finance","category":"Investment","kw":["portfolio","stock","dividend","equity","roi","bond","mutual fund","etf"]},
-            {"domain":"Finance","category":"Tax","kw":["tax","gst","vat","irs","filing","deduction"]},
-            {"domain":"Finance","category":"Expense","kw":["expense report","reimbursement","receipt","invoice","opex","capex"]},
-            {"domain":"Finance","category":"Budget","kw":["budget","forecast","planning","variance","allocation"]},
-            {"domain":"Finance","category":"Maintenance","kw":["maintenance","repair","upkeep"]},
+        # Research & Documentation
+        {"domain":"ResearchPaper","category":"Other","kw":["abstract","introduction","methodology","results","doi","issn","arxiv","et al","peer review","journal"]},
+        {"domain":"Documentation","category":"Other","kw":["swagger","openapi","raml","api documentation","specification","parameters","request body","response body","getting started","installation","quick start","readme"]},
 
-            # Healthcare & Legal
-            {"domain":"Healthcare","category":"Other","kw":["patient","diagnosis","treatment","x-ray","mri","ct scan","clinical","hospital","prescription","medication","therapy"]},
-            {"domain":"Legal","category":"Other","kw":["contract","agreement","clause","liability","jurisdiction","indemnity","compliance","statute","copyright","patent","trademark","terms and conditions"]},
+        # Education, College, School
+        {"domain":"Education","category":"Mathematics","kw":["calculus","algebra","geometry","statistics","probability","linear algebra"]},
+        {"domain":"Education","category":"DataScience","kw":["pandas","numpy","scikit-learn","sklearn","tensorflow","pytorch","keras","neural network","dataset","model training","inference"]},
+        {"domain":"Education","category":"Science","kw":["physics","chemistry","biology","geology","astronomy"]},
+        {"domain":"Education","category":"Other","kw":["assignment","homework","syllabus","curriculum","quiz","lecture","semester"]},
+        {"domain":"College","category":"Clubs","kw":["club","fraternity","sorority","greek life","pledge"]},
+        {"domain":"College","category":"Other","kw":["university","campus","scholarship","dormitory","degree"]},
+        {"domain":"School","category":"Assignments","kw":["assignment","homework","worksheet","project"]},
 
-            # Research & Documentation
-            {"domain":"ResearchPaper","category":"Other","kw":["abstract","introduction","methodology","results","doi","issn","arxiv","et al","peer review","journal"]},
-            {"domain":"Documentation","category":"Other","kw":["swagger","openapi","raml","api documentation","specification","parameters","request body","response body","getting started","installation","quick start","readme"]},
+        # Company & Business
+        {"domain":"Company","category":"Product","kw":["product","roadmap","feature","specification","requirements"]},
+        {"domain":"Company","category":"HR","kw":["hiring","recruitment","onboarding","employee","training"]},
+        {"domain":"Company","category":"Marketing","kw":["marketing","campaign","brand","promotion"]},
+        {"domain":"Business","category":"Other","kw":["strategy","market analysis","competitive analysis","kpi","business model"]},
+    ]
 
-            # Education, College, School
-            {"domain":"Education","category":"Mathematics","kw":["calculus","algebra","geometry","statistics","probability","linear algebra"]},
-            {"domain":"Education","category":"DataScience","kw":["pandas","numpy","scikit-learn","sklearn","tensorflow","pytorch","keras","neural network","dataset","model training","inference"]},
-            {"domain":"Education","category":"Science","kw":["physics","chemistry","biology","geology","astronomy"]},
-            {"domain":"Education","category":"Other","kw":["assignment","homework","syllabus","curriculum","quiz","lecture","semester"]},
-            {"domain":"College","category":"Clubs","kw":["club","fraternity","sorority","greek life","pledge"]},
-            {"domain":"College","category":"Other","kw":["university","campus","scholarship","dormitory","degree"]},
-            {"domain":"School","category":"Assignments","kw":["assignment","homework","worksheet","project"]},
+    _guardrail_matcher = KeywordMatcher(kw for rule in GUARDRAIL_RULES for kw in rule["kw"])
 
-            # Company & Business
-            {"domain":"Company","category":"Product","kw":["product","roadmap","feature","specification","requirements"]},
-            {"domain":"Company","category":"HR","kw":["hiring","recruitment","onboarding","employee","training"]},
-            {"domain":"Company","category":"Marketing","kw":["marketing","campaign","brand","promotion"]},
-            {"domain":"Business","category":"Other","kw":["strategy","market analysis","competitive analysis","kpi","business model"]},
-        ]
+    def _guardrail_classify(self, text_lower: str, filename_lower: str, filename: str):
+        """Apply explicit guardrail rules to prevent obvious misclassifications.
+        Returns a forced classification dict or None.
+        """
+        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
 
-        for rule in rules:
-            if any(k in text_lower or k in filename_lower for k in rule["kw"]):
-                return {
-                    "domain": rule["domain"],
-                    "category": rule["category"],
-                    "file_extension": ext or "files",
-                    "confidence": 0.9 if rule["domain"] != "Technology" or rule["category"] != "UAV" else 0.95,
-                    "domain_score": 95 if rule["domain"] != "Technology" or rule["category"] != "UAV" else 100,
-                    "category_score": 95 if rule["domain"] != "Technology" or rule["category"] != "UAV" else 100,
-                }
+        # One scan rules out all guardrail keywords before the ordered per-rule checks
+        if self._guardrail_matcher.contains_any(text_lower) or self._guardrail_matcher.contains_any(filename_lower):
+            for rule in self.GUARDRAIL_RULES:
+                if any(k in text_lower or k in filename_lower for k in rule["kw"]):
+                    return {
+                        "domain": rule["domain"],
+                        "category": rule["category"],
+                        "file_extension": ext or "files",
+                        "confidence": 0.9 if rule["domain"] != "Technology" or rule["category"] != "UAV" else 0.95,
+                        "domain_score": 95 if rule["domain"] != "Technology" or rule["category"] != "UAV" else 100,
+                        "category_score": 95 if rule["domain"] != "Technology" or rule["category"] != "UAV" else 100,
+                    }
 
         # Extension-based documentation hint (applied only if no rule matched)
         if ext in {"md","rst","adoc"}:
@@ -415,6 +421,13 @@ class DocumentClassifier:
         }
     }
     
+    # Compiled once at class load: a single scan of the text yields the counts
+    # for every domain and category keyword
+    _keyword_matcher = KeywordMatcher(
+        [kw for keywords in DOMAIN_KEYWORDS.values() for kw in keywords["strong"] + keywords["weak"]]
+        + [kw for categories in CATEGORY_KEYWORDS_BY_DOMAIN.values() for kws in categories.values() for kw in kws]
+    )
+    
     def classify_hierarchical(self, text: str, filename: str = "") -> Dict[str, str]:
         """Classify content into hierarchical structure: Domain > Category > FileType
         
@@ -430,10 +443,15 @@ class DocumentClassifier:
             text_lower = text.lower()
             filename_lower = filename.lower()
 
-            # Apply guardrail rules (broad coverage for major types)
+            # Apply guardrail rules (broad coverage for major types).
+            # These stop at the first keyword found, so most documents return here.
             forced = self._guardrail_classify(text_lower, filename_lower, filename)
             if forced:
                 return forced
+
+            # Single pass over text and filename for every keyword count
+            text_counts = self._keyword_matcher.count_all(text_lower)
+            filename_counts = self._keyword_matcher.count_all(filename_lower)
             
             # Extract file extension
             file_ext = ""
@@ -446,13 +464,13 @@ class DocumentClassifier:
                 score = 0
                 # Count strong keywords (2x weight)
                 for keyword in keywords["strong"]:
-                    score += text_lower.count(keyword) * 2
+                    score += text_counts.get(keyword, 0) * 2
                 # Count weak keywords (1x weight)
                 for keyword in keywords["weak"]:
-                    score += text_lower.count(keyword) * 1
+                    score += text_counts.get(keyword, 0) * 1
                 # Filename bonus (5x weight)
                 for keyword in keywords["strong"]:
-                    if keyword in filename_lower:
+                    if keyword in filename_counts:
                         score += 5
                 domain_scores[domain] = score
             
@@ -472,9 +490,9 @@ class DocumentClassifier:
                 if category == "Other":
                     continue
                 # Sum keyword matches in text
-                score = sum(text_lower.count(kw) for kw in keywords)
+                score = sum(text_counts.get(kw, 0) for kw in keywords)
                 # Filename bonus
-                score += sum(5 for kw in keywords if kw in filename_lower)
+                score += sum(5 for kw in keywords if kw in filename_counts)
                 category_scores[category] = score
             
             # Select best category (default to Other if no matches)
@@ -0,0 +1,137 @@
+"""Token-budgeted context packing: merge overlapping chunks and fill a prompt budget by relevance"""
+from typing import Dict, List, Optional
+import logging
+
+from utils.text_utils import TextUtils
+
+logger = logging.getLogger(__name__)
+
+
+class ContextPacker:
+    """Turns ranked retrieval chunks into the context block of a prompt.
+
+    Chunks are expected in relevance order. Neighbouring chunks of the same
+    file (the chunker repeats a few sentences between them) are merged into one
+    passage with the overlap removed, exact duplicates are dropped, and
+    passages are then taken in relevance order until ``token_budget`` is
+    spent. ``num_ctx_for`` picks the Ollama context window for the result.
+    """
+
+    # How far from the end of one chunk the next chunk's start is searched for
+    OVERLAP_SEARCH_CHARS = 400
+    OVERLAP_PROBE_CHARS = 40
+
+    def __init__(self, token_budget: int = 2500, max_sources: int = 5,
+                 num_ctx_min: int = 2048, num_ctx_max: int = 8192):
+        self.token_budget = token_budget
+        self.max_sources = max_sources
+        self.num_ctx_min = num_ctx_min
+        self.num_ctx_max = num_ctx_max
+
+    @staticmethod
+    def _position(chunk: dict) -> Optional[tuple]:
+        """(document, chunk index) parsed from IDs like '<file_hash>_<index>'"""
+        document, _, index = str(chunk.get('chunk_id') or '').rpartition('_')
+        if not document or not index.isdigit():
+            return None
+        return document, int(index)
+
+    @classmethod
+    def join_overlapping(cls, first: str, second: str) -> str:
+        """Concatenate two consecutive chunks, dropping the text they share"""
+        probe = second[:cls.OVERLAP_PROBE_CHARS]
+        if probe:
+            start = first.rfind(probe, max(0, len(first) - cls.OVERLAP_SEARCH_CHARS))
+            if start != -1 and second.startswith(first[start:]):
+                return first[:start] + second
+        return first + "\n" + second
+
+    def merge_adjacent(self, chunks: List[dict]) -> List[dict]:
+        """Merge runs of consecutive chunks from one file and drop duplicate texts
+
+        A merged passage keeps the rank of its best member and records the
+        members in 'chunk_ids'.
+        """
+        passages: List[dict] = []
+        by_position: Dict[tuple, dict] = {}
+        seen_texts = set()
+
+        for chunk in chunks:
+            text = chunk.get('text', '')
+            if text in seen_texts:
+                continue
+            seen_texts.add(text)
+
+            passage = dict(chunk, chunk_ids=[chunk.get('chunk_id')], _rank=len(passages))
+            passages.append(passage)
+            position = self._position(chunk)
+            if position:
+                by_position[position] = passage
+
+        # Fold each passage into the one holding the previous index of its file
+        merged_away = set()
+        for document, index in sorted(by_position):
+            passage = by_position[(document, index)]
+            previous = by_position.get((document, index - 1))
+            # Neighbouring chunks of an archive can belong to different members
+            if previous is None or previous.get('member', '') != passage.get('member', ''):
+                continue
+            previous['text'] = self.join_overlapping(previous['text'], passage['text'])
+            previous['chunk_ids'] += passage['chunk_ids']
+            previous['similarity'] = max(previous.get('similarity', 0) or 0, passage.get('similarity', 0) or 0)
+            previous['_rank'] = min(previous['_rank'], passage['_rank'])
+            by_position[(document, index)] = previous
+            merged_away.add(id(passage))
+
+        merged = sorted((p for p in passages if id(p) not in merged_away), key=lambda p: p['_rank'])
+        for passage in merged:
+            del passage['_rank']
+        return merged
+
+    def pack(self, chunks: List[dict], token_budget: Optional[int] = None) -> Dict:
+        """Select passages for the prompt
+        
+        Returns {'chunks', 'context_tokens', 'merged', 'dropped'}: the passages
+        in relevance order, the estimated tokens they use, how many input
+        chunks were merged or deduplicated away, and how many did not fit.
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        passages = self.merge_adjacent(chunks)
+        packed, used, dropped = [], 0, 0
+
+        for passage in passages:
+            if len(packed) >= self.max_sources:
+                dropped += 1
+                continue
+            tokens = TextUtils.estimate_tokens(passage['text'])
+            if used + tokens > budget:
+                if packed:
+                    dropped += 1
+                    continue
+                # Never send an empty context: trim the most relevant passage to fit
+                passage = dict(passage, text=passage['text'][:budget * TextUtils.CHARS_PER_TOKEN])
+                tokens = TextUtils.estimate_tokens(passage['text'])
+            packed.append(passage)
+            used += tokens
+
+        return {
+            'chunks': packed,
+            'context_tokens': used,
+            'merged': len(chunks) - len(passages),
+            'dropped': dropped,
+        }
+
+    def num_ctx_for(self, prompt_tokens: int, num_predict: int) -> int:
+        """Smallest power-of-two window (within the limits) holding the prompt and the answer
+
+        Ollama reloads the model whenever num_ctx changes, so windows are
+        rounded to a few sizes instead of tracking the prompt exactly.
+        """
+        needed = prompt_tokens + num_predict
+        num_ctx = self.num_ctx_min
+        while num_ctx < needed and num_ctx < self.num_ctx_max:
+            num_ctx *= 2
+        num_ctx = min(num_ctx, self.num_ctx_max)
+        if needed > num_ctx:
+            logger.warning(f"⚠️ Prompt needs ~{needed} tokens but num_ctx is capped at {num_ctx}")
+        return num_ctx
@@ -0,0 +1,148 @@
+"""Server-side chat sessions for follow-up questions, with LRU + TTL eviction"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """Keeps each session's last retrieved chunk IDs and Ollama token context.
+
+    A short question that refers back to the previous answer ("explain the
+    second point more") and names no new subject is a follow-up: it reuses
+    the previous turn's chunks plus their neighbouring chunks instead of
+    running retrieval again, and the LLM continues from the stored token
+    context (or the previous question and answer). A question with a new
+    subject ("what about unit 4?") is retrieved afresh. Sessions expire after
+    ``ttl_seconds`` without a turn, and the least recently used session is
+    evicted beyond ``max_sessions``.
+    """
+
+    # Words that point back at the previous turn
+    FOLLOW_UP_PATTERN = re.compile(
+        r"^\s*(?:and|also|but|so|then|why|how about|what about)\b"
+        r"|\b(?:it|its|this|that|these|those|they|them|their|above|previous|earlier|more|further|"
+        r"elaborate|expand|again|point|step|example)\b",
+        re.IGNORECASE
+    )
+    MAX_FOLLOW_UP_WORDS = 12
+    # Words that name no subject: function words and requests to expand on the last answer
+    FILLER_WORDS = frozenset("""
+        a an the and or but so then also too what which who whom whose why how when where is are was were be been
+        being do does did can could would should will may might must i me my we us our you your it its this that
+        these those they them their there here of in on at to for from with by about as into than more most
+        further again please explain elaborate expand clarify describe tell show give say mean means meant
+        detail details detailed example examples instance point points step steps part parts first second third
+        last next previous earlier above same other else thing things like such some any all one ones
+    """.split())
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800, neighbours: int = 1):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.neighbours = neighbours
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.follow_ups = 0
+        self.fresh_turns = 0
+        self.evictions = 0
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Dict:
+        """The live session with this ID, or a new session (unknown and expired IDs get a new ID)"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and now - session['updated_at'] <= self.ttl_seconds:
+                self._sessions.move_to_end(session_id)
+                return session
+            if session is not None:
+                del self._sessions[session_id]
+                self.evictions += 1
+
+            session = {'id': secrets.token_urlsafe(16), 'chunk_ids': [], 'similarity': {}, 'topic': set(),
+                       'context': None, 'exchange': None, 'last_query': None, 'turns': 0, 'updated_at': now}
+            self._sessions[session['id']] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            return session
+
+    @classmethod
+    def content_terms(cls, text: str) -> set:
+        """Words of a question that name its subject"""
+        return {word for word in re.findall(r"[a-z0-9]+", text.lower())
+                if (len(word) > 1 or word.isdigit()) and word not in cls.FILLER_WORDS}
+
+    def is_follow_up(self, session: Dict, query: str) -> bool:
+        """Whether the query refers back to the previous turn without naming a new subject"""
+        if not session['chunk_ids'] or len(query.split()) > self.MAX_FOLLOW_UP_WORDS:
+            return False
+        if self.FOLLOW_UP_PATTERN.search(query) is None:
+            return False
+        return not self.content_terms(query) - session['topic']
+
+    def follow_up_chunk_ids(self, session: Dict) -> List[str]:
+        """Previous chunk IDs, then the chunks next to them in the same file ('<file_hash>_<index>')"""
+        chunk_ids = list(session['chunk_ids'])
+        seen = set(chunk_ids)
+        for chunk_id in session['chunk_ids']:
+            document, _, index = chunk_id.rpartition('_')
+            if not document or not index.isdigit():
+                continue
+            for offset in range(1, self.neighbours + 1):
+                for neighbour in (int(index) - offset, int(index) + offset):
+                    neighbour_id = f"{document}_{neighbour}"
+                    if neighbour >= 0 and neighbour_id not in seen:
+                        seen.add(neighbour_id)
+                        chunk_ids.append(neighbour_id)
+        return chunk_ids
+
+    def start_turn(self, session: Dict, query: str, db_manager, n_results: int = 5) -> Tuple[List[dict], bool]:
+        """Chunks to answer from and whether the query is a follow-up
+
+        Follow-ups get the previous turn's chunks and their neighbours,
+        fetched by ID; other questions run retrieval and start a new
+        conversation, so they can still be answered from the answer cache.
+        """
+        if self.is_follow_up(session, query):
+            chunks = db_manager.get_chunks(self.follow_up_chunk_ids(session))
+            if chunks:
+                for chunk in chunks:
+                    # Neighbours rank after the chunks that were actually retrieved
+                    chunk['similarity'] = session['similarity'].get(chunk['chunk_id'], 0.0)
+                return chunks, True
+        session['context'] = session['exchange'] = None
+        return db_manager.query(query, n_results=n_results), False
+
+    def record_turn(self, session: Dict, query: str, chunks: List[dict], follow_up: bool) -> None:
+        """Remember the chunks and subject of a retrieved turn (the LLM stores the context and exchange)"""
+        with self._lock:
+            if follow_up:
+                self.follow_ups += 1
+            else:
+                self.fresh_turns += 1
+                session['chunk_ids'] = [chunk['chunk_id'] for chunk in chunks if chunk.get('chunk_id')]
+                session['similarity'] = {chunk['chunk_id']: chunk.get('similarity', 0.0)
+                                         for chunk in chunks if chunk.get('chunk_id')}
+                session['topic'] = self.content_terms(query)
+            session['last_query'] = query
+            session['turns'] += 1
+            session['updated_at'] = time.time()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            turns = self.follow_ups + self.fresh_turns
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl_seconds,
+                'follow_ups': self.follow_ups,
+                'fresh_turns': self.fresh_turns,
+                'follow_up_rate': round(self.follow_ups / turns, 3) if turns else 0.0,
+                'evictions': self.evictions,
+            }
@@ -2,9 +2,14 @@
 import chromadb
 from chromadb.config import Settings
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
+import time
 
+import numpy as np
+
+from core.bm25_index import BM25Index
+from core.embeddings import EmbeddingService, QueryEmbeddingCache
 from models.document import DocumentChunk
 
 logger = logging.getLogger(__name__)
@@ -13,7 +18,21 @@ logger = logging.getLogger(__name__)
 class DatabaseManager:
     """Manages ChromaDB operations"""
     
-    def __init__(self, db_path: Path):
+    RETRIEVAL_MODES = ("vector", "bm25", "hybrid")
+    RRF_K = 60  # reciprocal rank fusion constant
+    # Keyword-only hits have no embedding distance; treat them as a middling match
+    LEXICAL_ONLY_SIMILARITY = 0.5
+    
+    def __init__(self, db_path: Path, retrieval_mode: str = "vector",
+                 embedding_service: Optional[EmbeddingService] = None, query_cache_size: int = 1024):
+        if retrieval_mode not in self.RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
+        self.retrieval_mode = retrieval_mode
+        # None lets Chroma embed with its default function
+        self.embedding_service = embedding_service
+        self._default_embedder = None
+        self.query_cache = QueryEmbeddingCache(max_entries=query_cache_size)
+        self.last_timings: Dict[str, float] = {}
         self.db_path = Path(db_path)
         self.db_path.mkdir(parents=True, exist_ok=True)
         
@@ -27,65 +46,195 @@ class DatabaseManager:
             metadata={"hnsw:space": "cosine"}
         )
         
-        logger.info(f"Database initialized. Total documents: {self.collection.count()}")
+        # The BM25 index is only maintained when a mode uses it
+        self.keyword_index = None
+        if retrieval_mode != "vector":
+            self.keyword_index = BM25Index(self.db_path / "bm25.db")
+            self._backfill_keyword_index()
+        
+        logger.info(f"Database initialized. Total documents: {self.collection.count()} "
+                    f"(retrieval: {retrieval_mode})")
+    
+    def _backfill_keyword_index(self, page_size: int = 1000) -> None:
+        """Index an existing collection the first time BM25 retrieval is enabled"""
+        total = self.collection.count()
+        if total == 0 or self.keyword_index.count() >= total:
+            return
+        logger.info(f"Building BM25 index for {total} chunks...")
+        offset = 0
+        while offset < total:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page.get('ids'):
+                break
+            self.keyword_index.add_records(page['ids'], page['documents'], page['metadatas'])
+            offset += page_size
+        logger.info(f"BM25 index ready: {self.keyword_index.count()} chunks")
     
     def add_chunks(self, chunks: List[DocumentChunk]) -> None:
-        """Add document chunks to database"""
+        """Add document chunks to database, replacing existing chunks with the same IDs"""
         if not chunks:
             return
         
         ids = [chunk.chunk_id for chunk in chunks]
         documents = [chunk.text for chunk in chunks]
         metadatas = [chunk.to_metadata() for chunk in chunks]
+        embeddings = self.embedding_service.embed(documents) if self.embedding_service else None
         
-        self.collection.add(
+        # upsert, not add: add silently keeps the old text for an existing ID, while BM25 replaces it
+        self.collection.upsert(
             documents=documents,
+            embeddings=embeddings,
             metadatas=metadatas,
             ids=ids
         )
+        if self.keyword_index is not None:
+            self.keyword_index.add_chunks(chunks)
         
         logger.info(f"Added {len(chunks)} chunks to database")
     
-    def query(self, query_text: str, n_results: int = 5) -> List[dict]:
-        """Query database for relevant chunks with optimized matching"""
-        if self.collection.count() == 0:
+    def embed_queries(self, query_texts: Sequence[str]) -> List[np.ndarray]:
+        """Embed query texts through the LRU cache, embedding all misses in one batch"""
+        keys = [QueryEmbeddingCache.normalize(text) for text in query_texts]
+        vectors = {key: self.query_cache.get(key) for key in dict.fromkeys(keys)}
+        missing = [key for key, vector in vectors.items() if vector is None]
+        if missing:
+            for key, vector in zip(missing, self._embed_uncached(missing)):
+                vector = np.asarray(vector, dtype=np.float32)
+                self.query_cache.put(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+    
+    def _embed_uncached(self, texts: List[str]) -> List[np.ndarray]:
+        if self.embedding_service:
+            return self.embedding_service.embed_uncached(texts)
+        if self._default_embedder is None:
+            # Same function the collection uses when no embedding service is configured
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            self._default_embedder = DefaultEmbeddingFunction()
+        return self._default_embedder(texts)
+    
+    def query(self, query_text: str, n_results: int = 5,
+              query_embedding: Optional[Sequence[float]] = None) -> List[dict]:
+        """Query database for relevant chunks using the configured retrieval mode.
+        
+        Pass ``query_embedding`` to skip embedding (e.g. when a batch of
+        queries was embedded together with ``embed_queries``).
+        """
+        embeddings = [query_embedding] if query_embedding is not None else None
+        chunks, timings = self.query_batch([query_text], n_results, query_embeddings=embeddings)[0]
+        self.last_timings = timings
+        logger.info(f"⏱️ Retrieval ({self.retrieval_mode}): " +
+                    ", ".join(f"{name} {ms:.1f}" for name, ms in timings.items()))
+        return chunks
+    
+    def query_batch(self, query_texts: Sequence[str], n_results: int = 5,
+                    query_embeddings: Optional[Sequence[Sequence[float]]] = None
+                    ) -> List[Tuple[List[dict], Dict[str, float]]]:
+        """Retrieve chunks for many queries with one embedding call and one Chroma query.
+        
+        Returns ``(chunks, timings_ms)`` per query, in input order. The
+        ``embed_ms`` and ``vector_ms`` stages are shared by the whole batch.
+        """
+        if not query_texts:
             return []
+        total = self.collection.count()
+        if total == 0:
+            return [([], {}) for _ in query_texts]
         
+        shared = {}
         try:
             # Get more results for better context coverage
-            search_count = min(n_results * 4, self.collection.count())
-            
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=search_count
-            )
+            search_count = min(n_results * 4, total)
             
+            vector_results = [[] for _ in query_texts]
+            if self.retrieval_mode in ("vector", "hybrid"):
+                if query_embeddings is None:
+                    started = time.perf_counter()
+                    query_embeddings = self.embed_queries(query_texts)
+                    shared['embed_ms'] = (time.perf_counter() - started) * 1000
+                started = time.perf_counter()
+                vector_results = self._vector_search(query_embeddings, search_count)
+                shared['vector_ms'] = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            logger.error(f"Error querying database: {e}")
+            return [([], {}) for _ in query_texts]
+        
+        results = []
+        for query_text, vector_chunks in zip(query_texts, vector_results):
+            timings = dict(shared)
+            try:
+                keyword_chunks = []
+                if self.retrieval_mode in ("bm25", "hybrid"):
+                    started = time.perf_counter()
+                    keyword_chunks = self.keyword_index.search(query_text, search_count)
+                    timings['bm25_ms'] = (time.perf_counter() - started) * 1000
+                
+                started = time.perf_counter()
+                if self.retrieval_mode == "vector":
+                    # Sort by similarity (best first)
+                    chunks = sorted(vector_chunks, key=lambda x: x['similarity'], reverse=True)
+                else:
+                    chunks = self.fuse_rankings(vector_chunks, keyword_chunks, k=self.RRF_K)
+                timings['fusion_ms'] = (time.perf_counter() - started) * 1000
+                timings['total_ms'] = sum(timings.values())
+                results.append((chunks[:n_results], {name: round(ms, 2) for name, ms in timings.items()}))
+            except Exception as e:
+                logger.error(f"Error querying database: {e}")
+                results.append(([], {}))
+        return results
+    
+    def _vector_search(self, query_embeddings: Sequence[Sequence[float]], search_count: int) -> List[List[dict]]:
+        """Dense retrieval from Chroma for each query, filtered by distance, in Chroma's rank order"""
+        results = self.collection.query(
+            query_embeddings=list(query_embeddings),
+            n_results=search_count
+        )
+        
+        per_query = []
+        for q in range(len(query_embeddings)):
             chunks = []
-            if results and results['documents'] and len(results['documents']) > 0:
+            if results and results['documents'] and len(results['documents']) > q:
                 # Improved similarity filtering with better thresholds
-                for i, doc in enumerate(results['documents'][0]):
-                    metadata = results['metadatas'][0][i] if results['metadatas'] else {}
-                    distance = results['distances'][0][i] if results['distances'] else 0
+                for i, doc in enumerate(results['documents'][q]):
+                    metadata = results['metadatas'][q][i] if results['metadatas'] else {}
+                    distance = results['distances'][q][i] if results['distances'] else 0
                     
                     # More aggressive filtering: distance < 1.3 for better recall
                     if distance < 1.3:
                         similarity = 1.0 - (distance / 2.0)
                         chunks.append({
+                            'chunk_id': results['ids'][q][i],
                             'text': doc,
                             'filename': metadata.get('filename', 'Unknown'),
                             'category': metadata.get('category', 'Uncategorized'),
                             'filepath': metadata.get('filepath', ''),
+                            'locator': metadata.get('locator', ''),
+                            'member': metadata.get('member', ''),
                             'similarity': similarity,
                             'distance': distance
                         })
-            
-            # Sort by similarity (best first) and return top n_results
-            chunks.sort(key=lambda x: x['similarity'], reverse=True)
-            return chunks[:n_results]
-            
-        except Exception as e:
-            logger.error(f"Error querying database: {e}")
-            return []
+            per_query.append(chunks)
+        return per_query
+    
+    @classmethod
+    def fuse_rankings(cls, vector_chunks: List[dict], keyword_chunks: List[dict], k: int = 60) -> List[dict]:
+        """Reciprocal rank fusion: score = sum of 1 / (k + rank) over both result lists"""
+        fused: Dict[str, dict] = {}
+        for ranking in (vector_chunks, keyword_chunks):
+            for rank, chunk in enumerate(ranking, 1):
+                entry = fused.get(chunk['chunk_id'])
+                if entry is None:
+                    entry = dict(chunk, rrf_score=0.0)
+                    fused[chunk['chunk_id']] = entry
+                else:
+                    entry.update({key: value for key, value in chunk.items() if key not in entry})
+                entry['rrf_score'] += 1.0 / (k + rank)
+        
+        for entry in fused.values():
+            if 'similarity' not in entry:
+                entry['similarity'] = cls.LEXICAL_ONLY_SIMILARITY
+                entry['distance'] = 2.0 * (1.0 - cls.LEXICAL_ONLY_SIMILARITY)
+        return sorted(fused.values(), key=lambda x: x['rrf_score'], reverse=True)
     
     def delete_by_hash(self, file_hash: str) -> int:
         """Delete all chunks for a given file hash"""
@@ -94,6 +243,8 @@ class DatabaseManager:
             if results and results.get('ids'):
                 self.collection.delete(ids=results['ids'])
                 deleted_count = len(results['ids'])
+                if self.keyword_index is not None:
+                    self.keyword_index.delete_by_hash(file_hash)
                 logger.info(f"Deleted {deleted_count} chunks for file hash {file_hash}")
                 return deleted_count
             return 0
@@ -108,6 +259,8 @@ class DatabaseManager:
             if results and results.get('ids'):
                 self.collection.delete(ids=results['ids'])
                 deleted_count = len(results['ids'])
+                if self.keyword_index is not None:
+                    self.keyword_index.delete_by_filepath(filepath)
                 logger.info(f"Deleted {deleted_count} chunks for filepath {filepath}")
                 return deleted_count
             return 0
@@ -115,6 +268,84 @@ class DatabaseManager:
             logger.error(f"Error deleting by filepath: {e}")
             return 0
 
+    def get_chunks(self, chunk_ids: List[str]) -> List[dict]:
+        """Chunks by ID, in the given order and shaped like query results; unknown IDs are skipped"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return []
+        try:
+            results = self.collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        except Exception as e:
+            logger.error(f"Error fetching chunks by ID: {e}")
+            return []
+
+        found = {}
+        for chunk_id, doc, metadata in zip(results['ids'], results['documents'], results['metadatas']):
+            metadata = metadata or {}
+            found[chunk_id] = {
+                'chunk_id': chunk_id,
+                'text': doc,
+                'filename': metadata.get('filename', 'Unknown'),
+                'category': metadata.get('category', 'Uncategorized'),
+                'filepath': metadata.get('filepath', ''),
+                'locator': metadata.get('locator', ''),
+                'member': metadata.get('member', ''),
+                'similarity': 0.0
+            }
+        return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
+
+    def repoint_chunks(self, chunk_ids: List[str], filepath: str, category: Optional[str] = None) -> int:
+        """Point chunks at another file with the same content (an identical copy, or the file's new
+        path after a move), optionally changing their category"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return 0
+        try:
+            results = self.collection.get(ids=chunk_ids, include=["metadatas"])
+            changes = {'filepath': filepath, 'filename': Path(filepath).name}
+            if category:
+                changes['category'] = category
+            metadatas = [dict(meta or {}, **changes) for meta in results['metadatas']]
+            if results['ids']:
+                self.collection.update(ids=results['ids'], metadatas=metadatas)
+                if self.keyword_index is not None:
+                    self.keyword_index.repoint(results['ids'], filepath, changes['filename'], category)
+            return len(results['ids'])
+        except Exception as e:
+            logger.error(f"Error repointing chunks to {filepath}: {e}")
+            return 0
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """Delete chunks by ID"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return 0
+        try:
+            self.collection.delete(ids=chunk_ids)
+            if self.keyword_index is not None:
+                self.keyword_index.delete_ids(chunk_ids)
+            logger.info(f"Deleted {len(chunk_ids)} chunks by ID")
+            return len(chunk_ids)
+        except Exception as e:
+            logger.error(f"Error deleting chunks by ID: {e}")
+            return 0
+
+    def iter_filepaths(self, page_size: int = 5000) -> Iterator[str]:
+        """Yield each distinct filepath in chunk metadata, paging through metadata only"""
+        seen = set()
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metadatas = page.get('metadatas') or []
+            for meta in metadatas:
+                fp = (meta or {}).get('filepath')
+                if fp and fp not in seen:
+                    seen.add(fp)
+                    yield fp
+            if len(metadatas) < page_size:
+                return
+            offset += page_size
+
     def has_filepath(self, filepath: str) -> bool:
         """Check if any chunks exist for the given filepath"""
         try:
@@ -0,0 +1,259 @@
+"""Local sentence embeddings with explicit batching, threading and a text-hash cache"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import importlib.util
+import logging
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxMiniLMBackend:
+    """all-MiniLM-L6-v2 on onnxruntime, using the model files Chroma downloads.
+
+    Produces the same mean-pooled, normalized vectors as Chroma's default
+    embedding function, so existing collections stay compatible. Unlike the
+    default it pads each batch to its longest text instead of 256 tokens,
+    lets the caller set the batch size and intra-op threads, and can run a
+    dynamically quantized int8 copy of the model (requires the ``onnx``
+    package the first time, to write ``model_int8.onnx``).
+    """
+
+    MAX_TOKENS = 256
+    DIMENSIONS = 384
+
+    def __init__(self, batch_size: int = 64, num_threads: Optional[int] = None, quantized: bool = False):
+        from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self._chroma_function = ONNXMiniLM_L6_V2()
+        self.model_dir = Path(ONNXMiniLM_L6_V2.DOWNLOAD_PATH) / ONNXMiniLM_L6_V2.EXTRACTED_FOLDER_NAME
+        self.quantized = quantized and self._can_quantize()
+        self.name = "all-MiniLM-L6-v2-int8" if self.quantized else "all-MiniLM-L6-v2"
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _can_quantize(self) -> bool:
+        if (self.model_dir / "model_int8.onnx").exists() or importlib.util.find_spec("onnx"):
+            return True
+        logger.warning("onnx not installed, cannot build the int8 embedding model; using fp32")
+        return False
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            # Downloads and verifies the model on first use
+            self._chroma_function._download_model_if_not_exists()
+
+            tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.MAX_TOKENS)
+            tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")  # pad to the longest text in each batch
+
+            model_path = self.model_dir / "model.onnx"
+            if self.quantized:
+                model_path = self._quantized_model(model_path)
+
+            options = ort.SessionOptions()
+            options.log_severity_level = 3
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+                options.inter_op_num_threads = 1
+
+            self._session = ort.InferenceSession(str(model_path), sess_options=options,
+                                                 providers=["CPUExecutionProvider"])
+            self._tokenizer = tokenizer
+            logger.info(f"Embedding model loaded: {self.name} (batch size {self.batch_size}, "
+                        f"threads {self.num_threads or 'auto'})")
+
+    def _quantized_model(self, model_path: Path) -> Path:
+        int8_path = model_path.with_name("model_int8.onnx")
+        if not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            logger.info("Quantizing embedding model to int8...")
+            quantize_dynamic(str(model_path), str(int8_path), weight_type=QuantType.QInt8)
+        return int8_path
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts in batches; returns a (len(texts), 384) float32 array"""
+        if not texts:
+            return np.zeros((0, self.DIMENSIONS), dtype=np.float32)
+        self._load()
+
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self._tokenizer.encode_batch(list(texts[start:start + self.batch_size]))
+            input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            hidden = self._session.run(None, {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": np.zeros_like(input_ids),
+            })[0]
+
+            # Attention-weighted mean pooling, then L2 normalization
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            norms[norms == 0] = 1e-12
+            batches.append((pooled / norms).astype(np.float32))
+        return np.concatenate(batches)
+
+
+class EmbeddingService:
+    """Embeds texts through a pluggable backend, caching vectors by text hash.
+
+    A backend is any object with a ``name`` attribute and an ``embed(texts)``
+    method returning one vector per text. Cache keys include the backend
+    name, so switching models (or to the int8 variant) never serves stale
+    vectors. With ``cache_path`` set the cache is a SQLite file, so
+    re-ingesting an identical chunk skips the model entirely.
+    """
+
+    BACKENDS = ("chroma", "onnx")
+    LOOKUP_BATCH = 500  # keys per SQLite IN (...) query
+
+    def __init__(self, backend, cache_path: Optional[Path] = None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        if cache_path is not None:
+            cache_path = Path(cache_path)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["EmbeddingService"]:
+        """Build the service from Config settings; None keeps Chroma's default embedding function"""
+        if config.EMBEDDING_BACKEND not in cls.BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {config.EMBEDDING_BACKEND}")
+        if config.EMBEDDING_BACKEND == "chroma":
+            return None
+        backend = OnnxMiniLMBackend(batch_size=config.EMBEDDING_BATCH_SIZE,
+                                    num_threads=config.EMBEDDING_THREADS,
+                                    quantized=config.EMBEDDING_QUANTIZED)
+        return cls(backend, cache_path=config.EMBEDDING_CACHE_DB)
+
+    def text_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.backend.name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        if self._db is None:
+            return found
+        for start in range(0, len(keys), self.LOOKUP_BATCH):
+            batch = keys[start:start + self.LOOKUP_BATCH]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Return one vector per text, embedding only texts not seen before"""
+        keys = [self.text_key(text) for text in texts]
+        with self._lock:
+            vectors = self._lookup(list(set(keys)))
+
+            # Embed each distinct uncached text once, even if repeated in this call
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in vectors and key not in missing:
+                    missing[key] = text
+            self.hits += len(keys) - sum(1 for key in keys if key in missing)
+            self.misses += len(missing)
+
+        if missing:
+            embedded = self.backend.embed(list(missing.values()))
+            new_vectors = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, embedded)}
+            with self._lock:
+                vectors.update(new_vectors)
+                if self._db is not None:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vector.tobytes()) for key, vector in new_vectors.items()]
+                    )
+                    self._db.commit()
+
+        return [vectors[key] for key in keys]
+
+    def embed_uncached(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Embed without touching the vector cache (queries would only bloat it)"""
+        return list(self.backend.embed(list(texts)))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': self.backend.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+            if self._db is not None:
+                stats['cached_vectors'] = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return stats
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of normalized query text -> query vector"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Lowercase and collapse whitespace and trailing punctuation (MiniLM is uncased)"""
+        return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!. ")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
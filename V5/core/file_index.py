@@ -0,0 +1,128 @@
+"""In-memory lookup of downloadable files by file ID, chunk ID or filename"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+from core.manifest import IngestionManifest
+
+logger = logging.getLogger(__name__)
+
+
+class FileIndex:
+    """Maps file IDs, chunk IDs and filenames to paths without walking the sorted tree.
+
+    A file ID is the file's content hash, the prefix of its chunk IDs
+    ('<file_hash>_<index>'), so a citation resolves to the exact file it
+    came from even when filenames collide. The index is loaded once from the
+    ingestion manifest, which the watcher updates on every ingest, move and
+    delete; after that, only the rows in the manifest's change log are
+    applied when its version changes. Only files under ``root`` are served.
+    """
+
+    def __init__(self, manifest: IngestionManifest, root: Path):
+        self.manifest = manifest
+        self.root = Path(root).absolute()
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, str] = {}
+        self._by_id: Dict[str, List[Path]] = {}
+        self._by_name: Dict[str, List[Tuple[str, Path]]] = {}
+        self._version = None
+        self._seq = 0
+        self.reloads = 0
+        self.updates = 0
+        self.refresh(force=True)
+
+    @staticmethod
+    def file_id_of(key: str) -> str:
+        """File ID of a chunk ID; a file ID is returned unchanged"""
+        document, _, index = key.rpartition('_')
+        return document if document and index.isdigit() else key
+
+    def refresh(self, force: bool = False) -> bool:
+        """Catch up with the manifest if it changed since the last call; True when anything changed"""
+        version = self.manifest.version()
+        if not force and version == self._version:
+            return False
+
+        changes = None if force else self.manifest.changes_since(self._seq)
+        if changes is None:
+            self._reload(version)
+            return True
+        with self._lock:
+            # Another request may have applied some of these already; replaying one is harmless
+            for seq, path, file_hash in changes:
+                self._apply(path, file_hash)
+                self._seq = max(self._seq, seq)
+            self._version = version
+            self.updates += len(changes)
+        return bool(changes)
+
+    def _reload(self, version) -> None:
+        # Read the log position first: changes made during the load are replayed by the next refresh
+        seq = self.manifest.last_change()
+        files = self.manifest.files()
+        with self._lock:
+            self._hashes, self._by_id, self._by_name = {}, {}, {}
+            for path, file_hash in files:
+                self._apply(path, file_hash)
+            self._version, self._seq = version, seq
+            self.reloads += 1
+        logger.info(f"📇 File index loaded: {len(self._by_id)} files")
+
+    def _apply(self, key: str, file_hash: Optional[str]) -> None:
+        """Point one manifest path at file_hash, or drop it when None; callers hold the lock"""
+        old_hash = self._hashes.pop(key, None)
+        path = Path(key)
+        if old_hash is not None:
+            self._discard(self._by_id, old_hash, path)
+            self._discard(self._by_name, path.name, (old_hash, path))
+        if file_hash is None or self.root not in path.parents:
+            return
+        self._hashes[key] = file_hash
+        self._by_id.setdefault(file_hash, []).append(path)
+        self._by_name.setdefault(path.name, []).append((file_hash, path))
+
+    @staticmethod
+    def _discard(mapping: dict, key: str, value) -> None:
+        values = mapping.get(key)
+        if values and value in values:
+            values.remove(value)
+            if not values:
+                del mapping[key]
+
+    def _existing(self, file_id: str) -> Optional[Path]:
+        with self._lock:
+            paths = list(self._by_id.get(file_id, ()))
+        # Identical copies share an ID; any one that still exists will do
+        for path in paths:
+            if path.is_file():
+                return path
+        return None
+
+    def resolve(self, key: str) -> Optional[Tuple[str, Path]]:
+        """(file ID, path) for a file ID or chunk ID, or None"""
+        file_id = self.file_id_of(key)
+        self.refresh()
+        path = self._existing(file_id)
+        return (file_id, path) if path is not None else None
+
+    def find_by_name(self, filename: str) -> List[Tuple[str, Path]]:
+        """(file ID, path) of each distinct existing file with this name; identical copies count once"""
+        self.refresh()
+        with self._lock:
+            matches = list(self._by_name.get(filename, ()))
+        found: Dict[str, Path] = {}
+        for file_id, path in matches:
+            if file_id not in found and path.is_file():
+                found[file_id] = path
+        return list(found.items())
+
+    def relative(self, path: Path) -> str:
+        """Path shown to clients, relative to the served root"""
+        return path.relative_to(self.root).as_posix()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'files': len(self._by_id), 'names': len(self._by_name),
+                    'reloads': self.reloads, 'updates': self.updates}
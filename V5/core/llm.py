@@ -1,9 +1,23 @@
 """LLM service using Ollama for response generation and semantic operations"""
 import ollama
+import asyncio
+import contextlib
+import hashlib
 import logging
 import re
-from typing import Tuple, List, Dict, Optional
+import threading
+import time
+from collections import Counter
+from typing import Tuple, List, Dict, Iterator, AsyncIterator, Optional
+from core.answer_cache import AnswerCache
 from core.classifier import DocumentClassifier
+from core.context_packer import ContextPacker
+from core.file_index import FileIndex
+from core.model_warmer import LatencyTracker
+from core.single_flight import SingleFlight
+from utils.keyword_matcher import KeywordMatcher, TokenizedText
+from utils.text_utils import TextUtils
+from utils.rule_engine import RuleEngine
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +25,19 @@ logger = logging.getLogger(__name__)
 class LLMService:
     """Handles LLM operations for query generation, response generation, and semantic operations"""
     
-    def __init__(self, model: str = "llama3.2"):
+    def __init__(self, model: str = "llama3.2", answer_cache: Optional[AnswerCache] = None,
+                 context_packer: Optional[ContextPacker] = None, keep_alive: Optional[str] = None):
         self.model = model
+        self.keep_alive = keep_alive  # how long Ollama keeps the model loaded after each request
         self.classifier = DocumentClassifier()
+        self.answer_cache = answer_cache
+        self.context_packer = context_packer or ContextPacker()
+        self.last_context: Optional[Dict] = None  # packing report of the latest generation, for /status
+        self._last_lock = threading.Lock()
+        self.last_num_ctx: Optional[int] = None  # num_ctx of the latest generation, for the model warmer
+        self._async_client = None  # created on first async call, inside the server's event loop
+        self.single_flight = SingleFlight()
+        self.latency = LatencyTracker()
         logger.info(f"LLM Service initialized with model: {model}")
     
     # Legacy category keywords for fallback
@@ -95,69 +119,252 @@ class LLMService:
         }
     }
     
-    def _analyze_keywords(self, text: str) -> Dict[str, int]:
+    # Keywords and structure markers counted with one matcher pass each
+    _category_keyword_matcher = KeywordMatcher(
+        kw for keywords in CATEGORY_KEYWORDS.values() for kw in keywords["strong"] + keywords["weak"]
+    )
+    HTML_INDICATORS = ['<!doctype html', '<html', '</html>', '<head>', '</head>', '<body>', '</body>',
+                       '<meta', '<link rel=']
+    _html_tag_matcher = KeywordMatcher(['<div', '<button', '<input', '<form', '<span', '<p>', '<h1', '<h2',
+                                        '<h3', '<nav', '<header', '<footer', '<section', '<article',
+                                        '<script', '<style'])
+    _code_line_matcher = KeywordMatcher(['def ', 'class ', 'import ', 'function', 'return', 'if ', 'for ',
+                                         'while '])
+    _qa_line_matcher = KeywordMatcher(['?', 'question:', 'answer:', 'q:', 'a:', 'what ', 'how ', 'why '])
+
+    # Content patterns. A rule adds its scores once when any term (matched as
+    # \bterm\b), substring or pattern is found in the lowercased text; every
+    # pattern match starts with one of the rule's "prefixes". Rules in
+    # the "documentation" and "edu_indicator" groups feed the combined
+    # Documentation/Education scoring, and "when": "edu_context" rules only
+    # apply when educational context was detected.
+    CONTENT_RULES = [
+        # BackendCode: Server-side logic, APIs, databases
+        {"name": "backend_frameworks", "scores": {"BackendCode": 4},
+         "terms": ["flask", "django", "fastapi", "express", "spring boot", "node.js"]},
+        {"name": "backend_sql", "scores": {"BackendCode": 3},
+         "terms": ["sql", "select", "insert", "update", "delete", "join", "where", "group by"]},
+        {"name": "backend_routing", "scores": {"BackendCode": 3},
+         "terms": ["endpoint", "route", "controller", "middleware", "authentication", "jwt", "session"]},
+        {"name": "backend_orm", "scores": {"BackendCode": 3},
+         "terms": ["pymongo", "sqlalchemy", "mongoose", "sequelize", "prisma", "orm"]},
+
+        # Code: Generic programming (not frontend/backend specific)
+        {"name": "code_algorithms", "scores": {"Code": 4},
+         "terms": ["algorithm", "data structure", "sorting", "searching", "recursion"]},
+        {"name": "code_debugging", "scores": {"Code": 3},
+         "terms": ["debug", "debugger", "breakpoint", "trace", "stack trace"]},
+        {"name": "code_testing", "scores": {"Code": 3},
+         "terms": ["test", "unit test", "assert", "expect", "mock"]},
+        {"name": "code_oop", "scores": {"Code": 2},
+         "terms": ["class", "object", "inheritance", "polymorphism", "encapsulation"]},
+
+        # FrontendCode: UI, HTML, CSS, JavaScript frameworks
+        {"name": "frontend_html_tags", "scores": {"FrontendCode": 5},
+         "substrings": ["<html", "<head", "<body", "<div", "<button", "<input", "<form", "<nav", "<header",
+                        "<footer"]},
+        {"name": "frontend_events", "scores": {"FrontendCode": 4},
+         "terms": ["onclick", "onchange", "event.prevent", "addeventlistener"]},
+        {"name": "frontend_css", "scores": {"FrontendCode": 3},
+         "terms": ["css", "stylesheet", "@media", "flexbox", "grid", "padding", "margin", "border"]},
+        {"name": "frontend_react", "scores": {"FrontendCode": 4},
+         "terms": ["usestate", "useeffect", "usecontext", "component", "props.", ".render("]},
+        {"name": "frontend_ui_libraries", "scores": {"FrontendCode": 3},
+         "terms": ["bootstrap", "tailwind", "material-ui", "styled-components"]},
+
+        # DataScience: ML, AI, data analysis
+        {"name": "datascience_libraries", "scores": {"DataScience": 5},
+         "patterns": [r'\b(pandas|numpy|matplotlib|seaborn|plotly)\.'],
+         "prefixes": ["pandas.", "numpy.", "matplotlib.", "seaborn.", "plotly."]},
+        {"name": "datascience_frameworks", "scores": {"DataScience": 5},
+         "terms": ["tensorflow", "pytorch", "keras", "scikit-learn", "sklearn"]},
+        {"name": "datascience_deep_learning", "scores": {"DataScience": 4},
+         "terms": ["neural network", "deep learning", "cnn", "rnn", "lstm", "transformer"]},
+        {"name": "datascience_modeling", "scores": {"DataScience": 4},
+         "terms": ["train_test_split", "fit", "predict", "accuracy", "precision", "recall", "f1-score",
+                   "f1 score"]},
+        {"name": "datascience_data", "scores": {"DataScience": 3},
+         "terms": ["dataset", "dataframe", "feature engineering", "preprocessing", "normalization"]},
+
+        # Documentation: Technical docs, guides, API references
+        {"name": "doc_api", "group": "documentation", "weight": 5,
+         "terms": ["api reference", "endpoint documentation", "swagger", "openapi"]},
+        {"name": "doc_install", "group": "documentation", "weight": 4,
+         "patterns": [r'(###?\s+installation|###?\s+usage|###?\s+getting started)'],
+         "prefixes": ["##"]},
+        {"name": "doc_tutorial", "group": "documentation", "weight": 3,
+         "terms": ["tutorial", "walkthrough", "step-by-step", "step by-step", "step-by step", "step by step",
+                   "how-to guide", "how to guide"]},
+        {"name": "doc_reqres", "group": "documentation", "weight": 3,
+         "substrings": ["request:", "response:", "parameter:", "parameters:", "return:", "returns:"]},
+
+        # Education indicators (prefer Education over Documentation when present)
+        {"name": "edu_curriculum", "group": "edu_indicator", "terms": ["curriculum"]},
+        {"name": "edu_syllabus", "group": "edu_indicator", "terms": ["syllabus"]},
+        {"name": "edu_course", "group": "edu_indicator", "terms": ["course"]},
+        {"name": "edu_module", "group": "edu_indicator", "terms": ["module"]},
+        {"name": "edu_lesson", "group": "edu_indicator", "terms": ["lesson"]},
+        {"name": "edu_unit", "group": "edu_indicator", "terms": ["unit"]},
+        {"name": "edu_lecture", "group": "edu_indicator", "terms": ["lecture"]},
+        {"name": "edu_assignment", "group": "edu_indicator", "terms": ["assignment"]},
+        {"name": "edu_exam", "group": "edu_indicator", "terms": ["exam"]},
+        {"name": "edu_quiz", "group": "edu_indicator", "terms": ["quiz"]},
+        {"name": "edu_exercise", "group": "edu_indicator", "terms": ["exercise"]},
+
+        # Education: Learning materials, Q&A, exercises
+        {"name": "edu_questions", "scores": {"Education": 5},
+         "patterns": [r'\b(question|answer|quiz|test|exam|assignment|homework)\s*[:\d]'],
+         "prefixes": ["question", "answer", "quiz", "test", "exam", "assignment", "homework"]},
+        {"name": "edu_numbered_units", "scores": {"Education": 4},
+         "patterns": [r'\b(chapter|lesson|module|unit)\s+\d+'],
+         "prefixes": ["chapter", "lesson", "module", "unit"]},
+        {"name": "edu_objectives", "scores": {"Education": 3},
+         "terms": ["objective", "learning outcome", "prerequisite", "exercise"]},
+        {"name": "edu_problem_solving", "scores": {"Education": 2},
+         "terms": ["solve", "evaluate", "calculate", "derive", "prove", "explain why"]},
+
+        # Field-specific boosts under Education: Database, CyberSecurity, Software, ML, DataScience
+        # If educational context words co-occur with these domains, prefer Education over Documentation/DataScience
+        {"name": "edu_context_words", "group": "edu_context",
+         "terms": ["unit", "chapter", "lesson", "module", "lecture", "course"]},
+        {"name": "edu_field_database", "when": "edu_context", "scores": {"Education": 4},
+         "terms": ["sql", "database", "relational", "normalization", "transaction", "index", "join"]},
+        {"name": "edu_field_security", "when": "edu_context", "scores": {"Education": 4},
+         "terms": ["cybersecurity", "encryption", "hashing", "firewall", "vulnerability", "penetration test"],
+         "patterns": [r'\bcyber\s*security\b'], "prefixes": ["cyber"]},
+        {"name": "edu_field_software", "when": "edu_context", "scores": {"Education": 4},
+         "terms": ["software engineering", "sdlc", "requirements", "design pattern", "testing",
+                   "version control", "git"]},
+        {"name": "edu_field_ml", "when": "edu_context", "scores": {"Education": 4},
+         "terms": ["ml", "machine learning", "supervised", "unsupervised", "regression", "classification",
+                   "neural network"]},
+        {"name": "edu_field_data_science", "when": "edu_context", "scores": {"Education": 4},
+         "terms": ["data science", "pandas", "numpy", "analysis", "visualization", "statistics"]},
+
+        # STRONG: Always route Database, Cybersecurity, REST, Software, Test to Education (not Documentation)
+        # These are learning topics, not technical API docs
+        {"name": "edu_topic_database", "scores": {"Education": 8, "Documentation": -3},
+         "terms": ["database", "sql", "relational", "normalization", "transaction", "index", "join", "schema",
+                   "query", "ddl", "dml"]},
+        {"name": "edu_topic_security", "scores": {"Education": 8, "Documentation": -3},
+         "terms": ["cybersecurity", "encryption", "hashing", "firewall", "vulnerability", "penetration",
+                   "attack vectors", "network security"],
+         "patterns": [r'\bcyber\s*security\b'], "prefixes": ["cyber"]},
+        {"name": "edu_topic_rest", "scores": {"Education": 8, "Documentation": -3},
+         "terms": ["rest", "rest api", "restful", "http methods", "status codes", "endpoint", "endpoints",
+                   "request", "response"]},
+        {"name": "edu_topic_software", "scores": {"Education": 8, "Documentation": -3},
+         "terms": ["software engineering", "software development", "sdlc", "design pattern", "design patterns",
+                   "architecture", "testing", "qa", "quality assurance"]},
+        {"name": "edu_topic_testing", "scores": {"Education": 6, "Documentation": -2},
+         "terms": ["test", "testing", "unit test", "integration test", "test case", "test suite", "debugging"]},
+
+        # Healthcare: Medical records, clinical data
+        {"name": "healthcare_clinical", "scores": {"Healthcare": 5},
+         "terms": ["patient", "diagnosis", "treatment", "symptom", "symptoms", "medication", "prescription"]},
+        {"name": "healthcare_vitals", "scores": {"Healthcare": 4},
+         "terms": ["clinical trial", "medical history", "vital signs", "blood pressure", "heart rate"]},
+        {"name": "healthcare_standards", "scores": {"Healthcare": 4},
+         "terms": ["dicom", "hl7", "icd-10", "icd 10", "icd10", "cpt code", "medical imaging"]},
+        {"name": "healthcare_facilities", "scores": {"Healthcare": 2},
+         "terms": ["doctor", "physician", "nurse", "hospital", "clinic", "emergency"]},
+
+        # Legal: Contracts, agreements, compliance
+        {"name": "legal_language", "scores": {"Legal": 5},
+         "terms": ["hereby", "whereas", "pursuant to", "in accordance with", "aforementioned"]},
+        {"name": "legal_contracts", "scores": {"Legal": 4},
+         "terms": ["contract", "agreement", "terms and conditions", "liability", "indemnity"]},
+        {"name": "legal_clauses", "scores": {"Legal": 3},
+         "terms": ["party", "parties", "shall", "clause", "section", "article", "amendment"]},
+        {"name": "legal_ip", "scores": {"Legal": 4},
+         "terms": ["copyright", "patent", "trademark", "intellectual property", "license"]},
+
+        # Finance: Financial statements, reports, analysis
+        {"name": "finance_statements", "scores": {"Finance": 5},
+         "terms": ["revenue", "profit", "loss", "ebitda", "balance sheet", "income statement"]},
+        {"name": "finance_balance", "scores": {"Finance": 4},
+         "terms": ["asset", "assets", "liabilities", "equity", "cash flow", "fiscal year"]},
+        {"name": "finance_investment", "scores": {"Finance": 4},
+         "terms": ["investment", "stock", "dividend", "portfolio", "return on investment", "roi"]},
+        {"name": "finance_accounting", "scores": {"Finance": 3},
+         "terms": ["accounting", "audit", "financial statement", "gaap", "ifrs"]},
+
+        # Business: Strategy, operations, management
+        {"name": "business_strategy", "scores": {"Business": 5},
+         "terms": ["strategy", "strategic plan", "business model", "value proposition"]},
+        {"name": "business_marketing", "scores": {"Business": 4},
+         "terms": ["marketing", "sales", "customer acquisition", "market share", "target audience"]},
+        {"name": "business_metrics", "scores": {"Business": 3},
+         "terms": ["kpi", "metrics", "objective", "objectives", "milestone", "milestones", "roadmap"]},
+        {"name": "business_management", "scores": {"Business": 3},
+         "terms": ["stakeholder", "management", "leadership", "organization", "team structure"]},
+
+        # ResearchPaper: Academic research, papers
+        {"name": "research_sections", "scores": {"ResearchPaper": 5},
+         "terms": ["abstract", "introduction", "methodology", "result", "results", "conclusion", "reference",
+                   "references"]},
+        {"name": "research_methods", "scores": {"ResearchPaper": 4},
+         "terms": ["hypothesis", "experiment", "empirical", "statistical analysis", "p-value", "p value"]},
+        {"name": "research_citations", "scores": {"ResearchPaper": 4},
+         "terms": ["citation", "bibliography", "doi", "journal", "peer-review", "peer review"]},
+        {"name": "research_figures", "scores": {"ResearchPaper": 3},
+         "terms": ["et al."],
+         "patterns": [r'\b(figure \d+|table \d+|section [ivxlc]+)\b'],
+         "prefixes": ["figure ", "table ", "section "]},
+    ]
+    _content_rule_engine = RuleEngine(CONTENT_RULES)
+
+    def _analyze_keywords(self, text: str, tokens: Optional[TokenizedText] = None) -> Dict[str, int]:
         """Analyze keyword distribution across categories"""
-        text_lower = text.lower()
+        tokens = tokens or TokenizedText(text.lower())
+        counts = self._category_keyword_matcher.count_all(tokens)
         scores = {category: 0 for category in self.CATEGORY_KEYWORDS}
         
         for category, keywords in self.CATEGORY_KEYWORDS.items():
             # Strong keyword matches (2 points each)
             for keyword in keywords["strong"]:
-                scores[category] += text_lower.count(keyword) * 2
+                scores[category] += counts.get(keyword, 0) * 2
             
             # Weak keyword matches (1 point each)
             for keyword in keywords["weak"]:
-                scores[category] += text_lower.count(keyword) * 1
+                scores[category] += counts.get(keyword, 0) * 1
         
         return scores
     
-    def _analyze_structure(self, text: str) -> Dict[str, float]:
+    def _analyze_structure(self, text: str, tokens: Optional[TokenizedText] = None) -> Dict[str, float]:
         """Analyze document structure to infer category"""
-        lines = text.split('\n')
+        tokens = tokens or TokenizedText(text.lower())
+        # Repeated lines (boilerplate, blank lines, closing tags) are checked once
+        line_counts = Counter(text.split('\n'))
+        total_lines = text.count('\n') + 1
         scores = {category: 0.0 for category in self.CATEGORY_KEYWORDS}
-        text_lower = text.lower()
         
         # Strong HTML detection - must classify as Frontend
-        html_indicators = [
-            '<!doctype html',
-            '<html',
-            '</html>',
-            '<head>',
-            '</head>',
-            '<body>',
-            '</body>',
-            '<meta',
-            '<link rel='
-        ]
-        html_tag_count = sum(1 for indicator in html_indicators if indicator in text_lower)
+        html_tag_count = sum(1 for indicator in self.HTML_INDICATORS if tokens.contains(indicator))
         if html_tag_count >= 3:  # If 3+ HTML structural tags present
             scores["FrontendCode"] += 20  # Very high score to override others
         
         # Count HTML tags
-        html_tag_patterns = ['<div', '<button', '<input', '<form', '<span', '<p>', '<h1', '<h2', '<h3',
-                            '<nav', '<header', '<footer', '<section', '<article', '<script', '<style']
-        html_count = sum(text_lower.count(tag) for tag in html_tag_patterns)
+        html_count = sum(self._html_tag_matcher.count_all(tokens).values())
         if html_count > 10:
             scores["FrontendCode"] += 10
         elif html_count > 5:
             scores["FrontendCode"] += 5
         
         # Header analysis (more headers = documentation)
-        header_count = sum(1 for line in lines if line.strip().startswith('#'))
+        header_count = sum(n for line, n in line_counts.items() if line.strip().startswith('#'))
         if header_count > 5:
             scores["Documentation"] += 3
         
         # Code pattern analysis - check for programming constructs
-        code_indicators = ['def ', 'class ', 'import ', 'function', 'return', 'if ', 'for ', 'while ']
-        code_lines = sum(1 for line in lines if any(ind in line for ind in code_indicators))
-        if code_lines > len(lines) * 0.2:  # 20%+ lines have code patterns
+        code_lines = sum(n for line, n in line_counts.items() if self._code_line_matcher.contains_any(line))
+        if code_lines > total_lines * 0.2:  # 20%+ lines have code patterns
             # Favor BackendCode when code indicators dominate
             scores["BackendCode"] += 4
         
         # Question/Answer analysis
-        qa_patterns = ['?', 'question:', 'answer:', 'q:', 'a:', 'what ', 'how ', 'why ']
-        qa_count = sum(1 for line in lines if any(pat in line.lower() for pat in qa_patterns))
-        if qa_count > len(lines) * 0.15:
+        qa_count = sum(n for line, n in line_counts.items() if self._qa_line_matcher.contains_any(line.lower()))
+        if qa_count > total_lines * 0.15:
             scores["Education"] += 3
         
         # JSON/Schema analysis (API/Documentation)
@@ -165,7 +372,7 @@ class LLMService:
             scores["Documentation"] += 2
         
         # Code block indicators
-        if '```' in text or '```python' in text or '```javascript' in text:
+        if tokens.contains('```'):
             scores["BackendCode"] += 3
         
         # Structured list patterns (documentation)
@@ -174,68 +381,17 @@ class LLMService:
         
         return scores
     
-    def _analyze_content_type(self, text: str) -> Dict[str, float]:
+    def _analyze_content_type(self, text: str, tokens: Optional[TokenizedText] = None) -> Dict[str, float]:
         """Analyze specific content patterns and semantic meaning"""
+        tokens = tokens or TokenizedText(text.lower())
+        fired = self._content_rule_engine.evaluate(tokens)
         scores = {category: 0.0 for category in self.CATEGORY_KEYWORDS}
-        text_lower = text.lower()
-        
-        # BackendCode: Server-side logic, APIs, databases
-        if re.search(r'\b(flask|django|fastapi|express|spring boot|node\.js)\b', text_lower):
-            scores["BackendCode"] += 4
-        if re.search(r'\b(sql|select|insert|update|delete|join|where|group by)\b', text_lower):
-            scores["BackendCode"] += 3
-        if re.search(r'\b(endpoint|route|controller|middleware|authentication|jwt|session)\b', text_lower):
-            scores["BackendCode"] += 3
-        if re.search(r'\b(pymongo|sqlalchemy|mongoose|sequelize|prisma|orm)\b', text_lower):
-            scores["BackendCode"] += 3
-        
-        # Code: Generic programming (not frontend/backend specific)
-        if re.search(r'\b(algorithm|data structure|sorting|searching|recursion)\b', text_lower):
-            scores["Code"] += 4
-        if re.search(r'\b(debug|debugger|breakpoint|trace|stack trace)\b', text_lower):
-            scores["Code"] += 3
-        if re.search(r'\b(test|unit test|assert|expect|mock)\b', text_lower):
-            scores["Code"] += 3
-        if re.search(r'\b(class|object|inheritance|polymorphism|encapsulation)\b', text_lower):
-            scores["Code"] += 2
-        
-        # FrontendCode: UI, HTML, CSS, JavaScript frameworks
-        if re.search(r'<(html|head|body|div|button|input|form|nav|header|footer)', text_lower):
-            scores["FrontendCode"] += 5
-        if re.search(r'\b(onclick|onchange|onclick|event\.prevent|addeventlistener)\b', text_lower):
-            scores["FrontendCode"] += 4
-        if re.search(r'\b(css|stylesheet|@media|flexbox|grid|padding|margin|border)\b', text_lower):
-            scores["FrontendCode"] += 3
-        if re.search(r'\b(usestate|useeffect|usecontext|component|props\.|\.render\()\b', text_lower):
-            scores["FrontendCode"] += 4
-        if re.search(r'\b(bootstrap|tailwind|material-ui|styled-components)\b', text_lower):
-            scores["FrontendCode"] += 3
-        
-        # DataScience: ML, AI, data analysis
-        if re.search(r'\b(pandas|numpy|matplotlib|seaborn|plotly)\.', text_lower):
-            scores["DataScience"] += 5
-        if re.search(r'\b(tensorflow|pytorch|keras|scikit-learn|sklearn)\b', text_lower):
-            scores["DataScience"] += 5
-        if re.search(r'\b(neural network|deep learning|cnn|rnn|lstm|transformer)\b', text_lower):
-            scores["DataScience"] += 4
-        if re.search(r'\b(train_test_split|fit|predict|accuracy|precision|recall|f1[- ]score)\b', text_lower):
-            scores["DataScience"] += 4
-        if re.search(r'\b(dataset|dataframe|feature engineering|preprocessing|normalization)\b', text_lower):
-            scores["DataScience"] += 3
         
         # Documentation: Technical docs, guides, API references
-        doc_api_hits = 1 if re.search(r'\b(api reference|endpoint documentation|swagger|openapi)\b', text_lower) else 0
-        doc_install_hits = 1 if re.search(r'(###?\s+installation|###?\s+usage|###?\s+getting started)', text_lower) else 0
-        doc_tutorial_hits = 1 if re.search(r'\b(tutorial|walkthrough|step[- ]by[- ]step|how[- ]to guide)\b', text_lower) else 0
-        doc_reqres_hits = 1 if re.search(r'(request:|response:|parameters?:|returns?:)', text_lower) else 0
-        documentation_score = doc_api_hits * 5 + doc_install_hits * 4 + doc_tutorial_hits * 3 + doc_reqres_hits * 3
-
-        # Education indicators (prefer Education over Documentation when present)
-        edu_indicators = [
-            r'\bcurriculum\b', r'\bsyllabus\b', r'\bcourse\b', r'\bmodule\b', r'\blesson\b', r'\bunit\b',
-            r'\blecture\b', r'\bassignment\b', r'\bexam\b', r'\bquiz\b', r'\bexercise\b'
-        ]
-        edu_hits = sum(1 for pat in edu_indicators if re.search(pat, text_lower))
+        documentation_score = sum(rule["weight"] for rule in self.CONTENT_RULES
+                                  if rule.get("group") == "documentation" and rule["name"] in fired)
+        edu_hits = sum(1 for rule in self.CONTENT_RULES
+                       if rule.get("group") == "edu_indicator" and rule["name"] in fired)
         if documentation_score:
             scores["Documentation"] += documentation_score
             # If educational context detected, boost Education to dominate and slightly dampen Documentation
@@ -243,106 +399,31 @@ class LLMService:
                 scores["Education"] += documentation_score * 1.5 + edu_hits * 2
                 scores["Documentation"] -= min(2.0, edu_hits * 0.5)
         
-        # Education: Learning materials, Q&A, exercises
-        if re.search(r'\b(question|answer|quiz|test|exam|assignment|homework)\s*[:\d]', text_lower):
-            scores["Education"] += 5
-        if re.search(r'\b(chapter|lesson|module|unit)\s+\d+', text_lower):
-            scores["Education"] += 4
-        if re.search(r'\b(objective|learning outcome|prerequisite|exercise)\b', text_lower):
-            scores["Education"] += 3
-        if re.search(r'\b(solve|evaluate|calculate|derive|prove|explain why)\b', text_lower):
-            scores["Education"] += 2
-
-        # Field-specific boosts under Education: Database, CyberSecurity, Software, ML, DataScience
-        # If educational context words co-occur with these domains, prefer Education over Documentation/DataScience
-        has_edu_context = edu_hits > 0 or re.search(r'\b(unit|chapter|lesson|module|lecture|course)\b', text_lower)
-        if has_edu_context:
-            if re.search(r'\b(sql|database|relational|normalization|transaction|index|join)\b', text_lower):
-                scores["Education"] += 4
-            if re.search(r'\b(cyber\s*security|cybersecurity|encryption|hashing|firewall|vulnerability|penetration test)\b', text_lower):
-                scores["Education"] += 4
-            if re.search(r'\b(software engineering|sdlc|requirements|design pattern|testing|version control|git)\b', text_lower):
-                scores["Education"] += 4
-            if re.search(r'\b(ml|machine learning|supervised|unsupervised|regression|classification|neural network)\b', text_lower):
-                scores["Education"] += 4
-            if re.search(r'\b(data science|pandas|numpy|analysis|visualization|statistics)\b', text_lower):
-                scores["Education"] += 4
-        
-        # STRONG: Always route Database, Cybersecurity, REST, Software, Test to Education (not Documentation)
-        # These are learning topics, not technical API docs
-        if re.search(r'\b(database|sql|relational|normalization|transaction|index|join|schema|query|ddl|dml)\b', text_lower):
-            scores["Education"] += 8  # Strong boost to override Documentation
-            scores["Documentation"] -= 3  # Dampen Documentation classification
-        if re.search(r'\b(cyber\s*security|cybersecurity|encryption|hashing|firewall|vulnerability|penetration|attack vectors|network security)\b', text_lower):
-            scores["Education"] += 8
-            scores["Documentation"] -= 3
-        if re.search(r'\b(rest|rest api|restful|http methods|status codes|endpoints?|request|response)\b', text_lower):
-            scores["Education"] += 8
-            scores["Documentation"] -= 3
-        if re.search(r'\b(software engineering|software development|sdlc|design patterns?|architecture|testing|qa|quality assurance)\b', text_lower):
-            scores["Education"] += 8
-            scores["Documentation"] -= 3
-        if re.search(r'\b(test|testing|unit test|integration test|test case|test suite|debugging)\b', text_lower):
-            scores["Education"] += 6
-            scores["Documentation"] -= 2
-        
-        # Healthcare: Medical records, clinical data
-        if re.search(r'\b(patient|diagnosis|treatment|symptoms?|medication|prescription)\b', text_lower):
-            scores["Healthcare"] += 5
-        if re.search(r'\b(clinical trial|medical history|vital signs|blood pressure|heart rate)\b', text_lower):
-            scores["Healthcare"] += 4
-        if re.search(r'\b(dicom|hl7|icd[- ]?10|cpt code|medical imaging)\b', text_lower):
-            scores["Healthcare"] += 4
-        if re.search(r'\b(doctor|physician|nurse|hospital|clinic|emergency)\b', text_lower):
-            scores["Healthcare"] += 2
-        
-        # Legal: Contracts, agreements, compliance
-        if re.search(r'\b(hereby|whereas|pursuant to|in accordance with|aforementioned)\b', text_lower):
-            scores["Legal"] += 5
-        if re.search(r'\b(contract|agreement|terms and conditions|liability|indemnity)\b', text_lower):
-            scores["Legal"] += 4
-        if re.search(r'\b(party|parties|shall|clause|section|article|amendment)\b', text_lower):
-            scores["Legal"] += 3
-        if re.search(r'\b(copyright|patent|trademark|intellectual property|license)\b', text_lower):
-            scores["Legal"] += 4
-        
-        # Finance: Financial statements, reports, analysis
-        if re.search(r'\b(revenue|profit|loss|ebitda|balance sheet|income statement)\b', text_lower):
-            scores["Finance"] += 5
-        if re.search(r'\b(assets?|liabilities|equity|cash flow|fiscal year)\b', text_lower):
-            scores["Finance"] += 4
-        if re.search(r'\b(investment|stock|dividend|portfolio|return on investment|roi)\b', text_lower):
-            scores["Finance"] += 4
-        if re.search(r'\b(accounting|audit|financial statement|gaap|ifrs)\b', text_lower):
-            scores["Finance"] += 3
-        
-        # Business: Strategy, operations, management
-        if re.search(r'\b(strategy|strategic plan|business model|value proposition)\b', text_lower):
-            scores["Business"] += 5
-        if re.search(r'\b(marketing|sales|customer acquisition|market share|target audience)\b', text_lower):
-            scores["Business"] += 4
-        if re.search(r'\b(kpi|metrics|objectives?|milestones?|roadmap)\b', text_lower):
-            scores["Business"] += 3
-        if re.search(r'\b(stakeholder|management|leadership|organization|team structure)\b', text_lower):
-            scores["Business"] += 3
-        
-        # ResearchPaper: Academic research, papers
-        if re.search(r'\b(abstract|introduction|methodology|results?|conclusion|references?)\b', text_lower):
-            scores["ResearchPaper"] += 5
-        if re.search(r'\b(hypothesis|experiment|empirical|statistical analysis|p[- ]value)\b', text_lower):
-            scores["ResearchPaper"] += 4
-        if re.search(r'\b(citation|bibliography|doi|journal|peer[- ]review)\b', text_lower):
-            scores["ResearchPaper"] += 4
-        if re.search(r'\b(et al\.|figure \d+|table \d+|section [ivxlc]+)\b', text_lower):
-            scores["ResearchPaper"] += 3
+        has_edu_context = edu_hits > 0 or "edu_context_words" in fired
+        for rule in self.CONTENT_RULES:
+            if rule["name"] not in fired or "scores" not in rule:
+                continue
+            if rule.get("when") == "edu_context" and not has_edu_context:
+                continue
+            for category, points in rule["scores"].items():
+                scores[category] += points
         
         return scores
     
+    def explain_content_rules(self, text: str) -> Dict[str, int]:
+        """Count matches per content rule, for debugging misclassified documents"""
+        counts = self._content_rule_engine.count_matches(text.lower())
+        matched = {name: n for name, n in counts.items() if n}
+        logger.debug(f"Content rule matches: {matched}")
+        return counts
+    
     def _classify_by_analysis(self, text: str) -> Tuple[str, float]:
         """Use multi-strategy analysis to classify content - fast and accurate"""
-        keyword_scores = self._analyze_keywords(text)
-        structure_scores = self._analyze_structure(text)
-        content_scores = self._analyze_content_type(text)
+        # Tokenize once and share the result across all three analyzers
+        tokens = TokenizedText(text.lower())
+        keyword_scores = self._analyze_keywords(text, tokens)
+        structure_scores = self._analyze_structure(text, tokens)
+        content_scores = self._analyze_content_type(text, tokens)
         
         # Combine all scores with strategic weighting
         final_scores = {}
@@ -445,7 +526,8 @@ Category:"""
                 options={
                     "temperature": 0.05,
                     "num_predict": 5
-                }
+                },
+                keep_alive=self.keep_alive
             )
             
             raw_response = response['response'].strip().lower()
@@ -582,13 +664,57 @@ Category:"""
         else:
             return "🔴 LOW"
     
-    def generate_response(self, query: str, context_chunks: List[dict]) -> Tuple[str, List[str], float, List[dict]]:
-        """Generate response STRICTLY from documents only - no external knowledge"""
-        
-        if not context_chunks:
-            # No documents found - cannot answer
-            return "I don't have this information in your documents. Please upload relevant documents or ask questions about the documents you've provided.", [], 0, []
+    NO_DOCUMENTS_ANSWER = ("I don't have this information in your documents. Please upload relevant documents "
+                           "or ask questions about the documents you've provided.")
+    
+    # Phrases the model uses when the answer is not in the documents
+    NO_INFO_PHRASES = [
+        "don't have this information",
+        "not in the provided documents",
+        "not in the documents",
+        "cannot find this information",
+        "no information about",
+        "not mentioned in the documents",
+        "not available in the documents"
+    ]
+    
+    # Identical for every request, so it is sent as Ollama's system prompt: it always
+    # comes first, and Ollama reuses the cached prefill of a matching prompt prefix
+    SYSTEM_PROMPT = """You are a helpful AI assistant that answers questions EXCLUSIVELY and STRICTLY based on the provided documents.
+
+CRITICAL RULES:
+1. ONLY answer using information from the documents given with each question
+2. Do NOT use any external knowledge, general knowledge, or information from training data
+3. If the answer is NOT in the documents, respond: "I don't have this information in the provided documents."
+4. Do NOT make up, infer, or assume information
+5. Always cite which document the information comes from
+6. Provide detailed, comprehensive answers using ALL relevant information from the documents
+7. Include all types, categories, characteristics, and details mentioned in the documents
+8. Use bullet points, numbering, or clear formatting when listing multiple items"""
+    
+    # Previous answer text restated in a follow-up that has no token context
+    MAX_EXCHANGE_CHARS = 2000
+    
+    GENERATION_OPTIONS = {
+        "temperature": 0.3,
+        "top_p": 0.9,
+        "top_k": 40,
+        "num_predict": 1024,
+        "num_ctx": 4096,  # replaced per request by the context packer's choice
+        "repeat_penalty": 1.1,
+        "num_thread": 8,
+    }
+    
+    def _prepare_generation(self, query: str, context_chunks: List[dict],
+                            history: Optional[List[int]] = None,
+                            exchange: Optional[Tuple[str, str]] = None) -> Dict:
+        """Rank context chunks, score confidence and build the strict document-only prompt
         
+        ``history`` is the token context Ollama returned for the previous
+        turn of a conversation; it is dropped when it would not fit num_ctx.
+        Without one, ``exchange`` (the previous question and answer) is
+        restated in the prompt instead.
+        """
         # Relevance filter: prefer chunks containing query keywords
         keywords = [w.strip().lower() for w in re.split(r"[^A-Za-z0-9]+", query) if len(w.strip()) > 2]
         def relevance(c):
@@ -596,9 +722,14 @@ Category:"""
             hits = sum(1 for k in keywords if k and k in text)
             sim = float(c.get('similarity', 0) or 0)
             return hits * 2 + sim
-        context_chunks = sorted(context_chunks, key=relevance, reverse=True)[:5]
-        confidence_score = self._calculate_confidence(query, context_chunks)
-        confidence_level = self._get_confidence_level(confidence_score)
+        # Hybrid retrieval already ranks lexical matches; keep its fused order
+        if not (context_chunks and all('rrf_score' in c for c in context_chunks)):
+            context_chunks = sorted(context_chunks, key=relevance, reverse=True)
+        confidence_score = self._calculate_confidence(query, context_chunks[:self.context_packer.max_sources])
+        
+        # Merge overlapping neighbours and keep what fits the token budget
+        packing = self.context_packer.pack(context_chunks)
+        context_chunks = packing['chunks']
         
         source_snippets = []
         for i, chunk in enumerate(context_chunks, 1):
@@ -606,6 +737,9 @@ Category:"""
                 'id': i,
                 'filename': chunk['filename'],
                 'category': chunk.get('category', 'Unknown'),
+                'locator': chunk.get('locator', ''),
+                'member': chunk.get('member', ''),
+                'file_id': FileIndex.file_id_of(str(chunk.get('chunk_id') or '')),
                 'text': chunk['text'][:300] + '...' if len(chunk['text']) > 300 else chunk['text'],
                 'similarity': chunk.get('similarity', 0),
                 'relevance_pct': int(chunk.get('similarity', 0) * 100)
@@ -614,91 +748,489 @@ Category:"""
         
         context_parts = []
         for i, chunk in enumerate(context_chunks, 1):
-            source_info = f"[Source {i}: {chunk['filename']}]"
+            member = f"/{chunk['member']}" if chunk.get('member') else ""
+            locator = f", {chunk['locator']}" if chunk.get('locator') else ""
+            source_info = f"[Source {i}: {chunk['filename']}{member}{locator}]"
             context_parts.append(f"{source_info}\n{chunk['text']}\n")
         
         context_text = "\n".join(context_parts)
         
-        # STRICT DOCUMENT-ONLY PROMPT - No external knowledge allowed
+        # STRICT DOCUMENT-ONLY PROMPT - the rules are in SYSTEM_PROMPT, this carries the documents
         # If query asks for definition, require a direct definition first
         needs_definition = any(x in query.lower() for x in ["what is", "define", "definition of", "meaning of"]) 
-        definition_preamble = "" if not needs_definition else "Provide a concise 1-2 line definition FIRST, then details."
+        definition_preamble = "" if not needs_definition else " Provide a concise 1-2 line definition FIRST, then details."
 
-        full_prompt = f"""You are a helpful AI assistant that answers questions EXCLUSIVELY and STRICTLY based on the provided documents.
-
-CRITICAL RULES:
-1. ONLY answer using information from the documents below
-2. Do NOT use any external knowledge, general knowledge, or information from training data
-3. If the answer is NOT in the documents, respond: "I don't have this information in the provided documents."
-4. Do NOT make up, infer, or assume information
-5. Always cite which document the information comes from
-6. Provide detailed, comprehensive answers using ALL relevant information from the documents
-7. Include all types, categories, characteristics, and details mentioned in the documents
-8. Use bullet points, numbering, or clear formatting when listing multiple items
-9. {definition_preamble}
+        # The previous turn's answer came from the cache or another request, so there is no token context
+        previous = ""
+        if exchange and not history:
+            previous = f"Previous question: {exchange[0]}\nPrevious answer: {exchange[1]}\n\n"
 
-Documents:
+        full_prompt = f"""Documents:
 {context_text}
 
-Question: {query}
+{previous}Question: {query}
 
-Answer ONLY based on the documents above. Provide a comprehensive, detailed answer with all relevant information. If information is not in documents, say so clearly:"""
+Answer ONLY based on the documents above. Provide a comprehensive, detailed answer with all relevant information. If information is not in documents, say so clearly.{definition_preamble}"""
+        
+        prompt_tokens = TextUtils.estimate_tokens(self.SYSTEM_PROMPT) + TextUtils.estimate_tokens(full_prompt)
+        num_predict = self.GENERATION_OPTIONS['num_predict']
+        history = list(history or [])
+        if history and prompt_tokens + len(history) + num_predict > self.context_packer.num_ctx_max:
+            # Too long to carry over; the conversation starts afresh from the documents
+            history = []
+        num_ctx = self.context_packer.num_ctx_for(prompt_tokens + len(history), num_predict)
+        context = {
+            'num_ctx': num_ctx,
+            'prompt_tokens': prompt_tokens,
+            'history_tokens': len(history),
+            'context_tokens': packing['context_tokens'],
+            'passages': len(context_chunks),
+            'merged': packing['merged'],
+            'dropped': packing['dropped'],
+        }
+        return {
+            'context_chunks': context_chunks,
+            'confidence_score': confidence_score,
+            'source_snippets': source_snippets,
+            'prompt': full_prompt,
+            'system': self.SYSTEM_PROMPT,
+            'history': history or None,
+            'options': dict(self.GENERATION_OPTIONS, num_ctx=num_ctx),
+            'context': context,
+        }
+    
+    def serving_options(self) -> Dict:
+        """Options of the latest generation, or of a full-budget prompt before the first one
+        
+        Ollama reloads the model when num_ctx changes, so the model warmer
+        sends these to keep the model loaded the way real requests use it.
+        """
+        num_ctx = self.last_num_ctx or self.context_packer.num_ctx_for(
+            TextUtils.estimate_tokens(self.SYSTEM_PROMPT) + self.context_packer.token_budget,
+            self.GENERATION_OPTIONS['num_predict'])
+        return dict(self.GENERATION_OPTIONS, num_ctx=num_ctx)
+    
+    def _finalize_answer(self, answer: str, prepared: Dict) -> Tuple[str, List[str], float, List[dict]]:
+        """Attach confidence and sources to a generated answer"""
+        answer = answer.strip()
+        
+        # Check if LLM says information is not in documents
+        is_no_info = any(phrase in answer.lower() for phrase in self.NO_INFO_PHRASES)
+        
+        if is_no_info:
+            # Don't add sources/confidence if information not found
+            return answer, [], 0, []
+        
+        confidence_score = prepared['confidence_score']
+        cited_files = list(set([chunk['filename'] for chunk in prepared['context_chunks']]))
+        
+        if cited_files:
+            answer += f"\n\n📊 Confidence: {self._get_confidence_level(confidence_score)} ({confidence_score}%)"
+            answer += f"\n📄 Sources: {', '.join(cited_files)}"
+        
+        return answer, cited_files, confidence_score, prepared['source_snippets']
+    
+    def _generation_error_answer(self, error: Exception) -> Tuple[str, List[str], float, List[dict]]:
+        """Turn a generation failure into a user-facing answer"""
+        error_msg = str(error).lower()
+        
+        # Check if it's an Ollama connection error
+        if "connection" in error_msg or "ollama" in error_msg or "failed" in error_msg:
+            logger.warning(f"Ollama unavailable: {error}")
+            # Return message asking to start Ollama
+            return "I cannot answer right now because Ollama is not running. Please start Ollama to get AI-powered answers from your documents.", [], 0, []
+        
+        logger.error(f"Error generating response: {error}")
+        return f"Error: Unable to generate response. {str(error)}", [], 0, []
+    
+    def generate_response(self, query: str, context_chunks: List[dict], conversation: Optional[Dict] = None,
+                          report: Optional[Dict] = None) -> Tuple[str, List[str], float, List[dict]]:
+        """Generate response STRICTLY from documents only - no external knowledge
+        
+        ``conversation`` is a dict the caller keeps across turns: the token
+        context Ollama returns is stored under 'context' and passed back on
+        the next turn, so earlier turns are not prefilled again, and the
+        question and answer under 'exchange'. A turn that follows an earlier
+        one is neither cached nor coalesced; a first turn (an empty or reset
+        conversation) can be, and keeps the answer for the next turn.
+        
+        When this request builds a prompt, ``report['context']`` receives its
+        packing report (num_ctx, estimated tokens, merged/dropped chunks);
+        answers from the cache or a concurrent identical request leave it unset.
+        """
+        
+        if not context_chunks:
+            # No documents found - cannot answer
+            return self.NO_DOCUMENTS_ANSWER, [], 0, []
+        
+        if self._continues(conversation):
+            # A follow-up depends on earlier turns, so it is neither cached nor coalesced
+            result = self._generate(query, context_chunks, conversation, report)
+        else:
+            result = self._cached_answer(query, context_chunks)
+            if result is None:
+                # Identical concurrent requests wait for one generation instead of starting their own
+                result = self.single_flight.do(self._request_key(query, context_chunks),
+                                               lambda: self._generate(query, context_chunks, conversation, report))
+        self._remember_exchange(conversation, query, result)
+        return result
+    
+    def _generate(self, query: str, context_chunks: List[dict], conversation: Optional[Dict] = None,
+                  report: Optional[Dict] = None) -> Tuple[str, List[str], float, List[dict]]:
+        cacheable = not self._continues(conversation)
+        prepared = self._prepare_generation(query, context_chunks, self._history(conversation),
+                                            self._exchange(conversation))
+        if report is not None:
+            report['context'] = prepared['context']
         
         try:
+            start = time.perf_counter()
             response = ollama.generate(
                 model=self.model,
-                prompt=full_prompt,
+                prompt=prepared['prompt'],
+                system=prepared['system'],
+                context=prepared['history'],
                 stream=False,
-                options={
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "top_k": 40,
-                    "num_predict": 1024,
-                    "num_ctx": 4096,
-                    "repeat_penalty": 1.1,
-                    "num_thread": 8,
-                }
+                options=prepared['options'],
+                keep_alive=self.keep_alive
             )
+            self._record_generation(response, start, prepared, conversation)
+            result = self._finalize_answer(response['response'], prepared)
             
-            answer = response['response'].strip()
-            
-            # Check if LLM says information is not in documents
-            no_info_phrases = [
-                "don't have this information",
-                "not in the provided documents",
-                "not in the documents",
-                "cannot find this information",
-                "no information about",
-                "not mentioned in the documents",
-                "not available in the documents"
-            ]
-            
-            is_no_info = any(phrase in answer.lower() for phrase in no_info_phrases)
-            
-            if is_no_info:
-                # Don't add sources/confidence if information not found
-                return answer, [], 0, []
+        except Exception as e:
+            # Failures are not cached so the next request retries Ollama
+            return self._generation_error_answer(e)
+        
+        if cacheable:
+            self._cache_answer(query, context_chunks, result)
+        return result
+    
+    @staticmethod
+    def _history(conversation: Optional[Dict]) -> Optional[List[int]]:
+        """Token context of the conversation's previous turn, if any"""
+        return (conversation or {}).get('context') or None
+    
+    @staticmethod
+    def _exchange(conversation: Optional[Dict]) -> Optional[Tuple[str, str]]:
+        """Question and answer of the conversation's previous turn, if any"""
+        return (conversation or {}).get('exchange') or None
+    
+    @classmethod
+    def _continues(cls, conversation: Optional[Dict]) -> bool:
+        """Whether this turn follows an earlier one, so its answer depends on more than query and chunks"""
+        return bool(cls._history(conversation) or cls._exchange(conversation))
+    
+    def _remember_exchange(self, conversation: Optional[Dict], query: str, result: tuple) -> None:
+        """Keep an answered turn's question and answer, also for cache hits and coalesced requests"""
+        if conversation is not None and result[1]:
+            conversation['exchange'] = (query, result[0][:self.MAX_EXCHANGE_CHARS])
+    
+    def _record_generation(self, response, start: float, prepared: Dict, conversation: Optional[Dict]) -> None:
+        """Log latency and prefill, and keep Ollama's token context for the next turn
+        
+        ``response`` is the full response, or the final chunk of a stream.
+        """
+        self.latency.record(time.perf_counter() - start, LatencyTracker.load_seconds(response))
+        self.latency.record_prompt_eval(response, prepared['context']['prompt_tokens'])
+        with self._last_lock:
+            self.last_num_ctx = prepared['options']['num_ctx']
+            self.last_context = prepared['context']
+        if conversation is not None:
+            conversation['context'] = response.get('context') or None
+    
+    def _request_key(self, query: str, context_chunks: List[dict]) -> str:
+        """Key for this query, model and retrieved chunk set (shared by the cache and single-flight)"""
+        # Chunks without an ID (not from the database) are identified by their text
+        chunk_ids = [chunk.get('chunk_id') or hashlib.md5(chunk.get('text', '').encode('utf-8')).hexdigest()
+                     for chunk in context_chunks]
+        return AnswerCache.make_key(query, self.model, chunk_ids)
+    
+    def _cached_answer(self, query: str, context_chunks: List[dict]) -> Optional[tuple]:
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.get(self._request_key(query, context_chunks))
+        if cached is not None:
+            logger.info("⚡ Answer cache hit")
+        return cached
+    
+    def _cache_answer(self, query: str, context_chunks: List[dict], result: tuple) -> None:
+        if self.answer_cache is not None:
+            self.answer_cache.put(self._request_key(query, context_chunks), result)
+    
+    def _follower_result(self, flight) -> Tuple[str, List[str], float, List[dict]]:
+        """Result of a generation another request is running (sync followers)"""
+        try:
+            return flight.wait()
+        except Exception as e:
+            return self._generation_error_answer(e)
+    
+    def generate_response_stream(self, query: str, context_chunks: List[dict],
+                                 conversation: Optional[Dict] = None) -> Iterator[Dict]:
+        """Stream a document-only answer as it is generated
+        
+        Yields {"type": "token", "text": ...} events while Ollama produces the
+        answer, then one {"type": "done", ...} event carrying the final answer,
+        cited_files, confidence_score and source_snippets, the same values
+        generate_response returns, plus the prompt's packing report under
+        'context' (None when no prompt was built). A request identical to one
+        already being generated just receives the done event when that
+        generation finishes. ``conversation`` works as in generate_response.
+        """
+        if not context_chunks:
+            yield self._done_event(self.NO_DOCUMENTS_ANSWER, [], 0, [])
+            return
+        
+        continues = self._continues(conversation)
+        key = flight = None
+        if not continues:
+            cached = self._cached_answer(query, context_chunks)
+            if cached is not None:
+                self._remember_exchange(conversation, query, cached)
+                yield self._done_event(*cached)
+                return
             
-            cited_files = list(set([chunk['filename'] for chunk in context_chunks]))
+            key = self._request_key(query, context_chunks)
+            flight, leader = self.single_flight.join(key)
+            if not leader:
+                result = self._follower_result(flight)
+                self._remember_exchange(conversation, query, result)
+                yield self._done_event(*result)
+                return
+        
+        result = None
+        try:
+            prepared = self._prepare_generation(query, context_chunks, self._history(conversation),
+                                                self._exchange(conversation))
+            start = time.perf_counter()
+            first_token_time = None
+            parts = []
             
-            if cited_files:
-                answer += f"\n\n📊 Confidence: {confidence_level} ({confidence_score}%)"
-                answer += f"\n📄 Sources: {', '.join(cited_files)}"
+            try:
+                stream = ollama.generate(
+                    model=self.model,
+                    prompt=prepared['prompt'],
+                    system=prepared['system'],
+                    context=prepared['history'],
+                    stream=True,
+                    options=prepared['options'],
+                    keep_alive=self.keep_alive
+                )
+                last_chunk = {}
+                for chunk in stream:
+                    last_chunk = chunk
+                    token = chunk.get('response', '')
+                    if not token:
+                        continue
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter() - start
+                        logger.info(f"⏱️ Time to first token: {first_token_time:.2f}s")
+                    parts.append(token)
+                    yield {'type': 'token', 'text': token}
+                
+                # The final chunk carries Ollama's durations and token context
+                self._record_generation(last_chunk, start, prepared, conversation)
+                result = self._finalize_answer(''.join(parts), prepared)
+                if not continues:
+                    self._cache_answer(query, context_chunks, result)
+                
+            except Exception as e:
+                result = self._generation_error_answer(e)
             
-            return answer, cited_files, confidence_score, source_snippets
+            logger.info(f"⏱️ Streamed {len(parts)} tokens in {time.perf_counter() - start:.2f}s")
+        finally:
+            # Also runs when the client disconnects mid-stream, so followers never hang
+            if flight is not None:
+                self.single_flight.finish(key, flight, result=result,
+                                          error=None if result else RuntimeError("Generation was cancelled"))
+        self._remember_exchange(conversation, query, result)
+        yield self._done_event(*result, context=prepared['context'])
+    
+    def _get_async_client(self) -> "ollama.AsyncClient":
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient()
+        return self._async_client
+    
+    async def generate_response_async(self, query: str, context_chunks: List[dict],
+                                      timeout: Optional[float] = None, admission=None,
+                                      conversation: Optional[Dict] = None, report: Optional[Dict] = None
+                                      ) -> Tuple[str, List[str], float, List[dict]]:
+        """generate_response for the ASGI server, using Ollama's async client
+        
+        Cache misses wait for an ``admission`` slot (an AdmissionController)
+        before calling Ollama, so cached answers and coalesced duplicates never
+        queue. Raises asyncio.TimeoutError when generation exceeds ``timeout``
+        seconds. ``conversation`` and ``report`` work as in generate_response.
+        """
+        if not context_chunks:
+            return self.NO_DOCUMENTS_ANSWER, [], 0, []
+        
+        if self._continues(conversation):
+            result = await self._generate_async(query, context_chunks, timeout, admission, conversation, report)
+            self._remember_exchange(conversation, query, result)
+            return result
+        
+        result = self._cached_answer(query, context_chunks)
+        if result is None:
+            key = self._request_key(query, context_chunks)
+            flight, leader = self.single_flight.join(key)
+            if not leader:
+                result = await flight.wait_async()
+            else:
+                try:
+                    result = await self._generate_async(query, context_chunks, timeout, admission,
+                                                        conversation, report)
+                except BaseException as e:
+                    self.single_flight.finish(key, flight, error=e)
+                    raise
+                self.single_flight.finish(key, flight, result=result)
+        self._remember_exchange(conversation, query, result)
+        return result
+    
+    async def _generate_async(self, query: str, context_chunks: List[dict], timeout: Optional[float],
+                              admission, conversation: Optional[Dict] = None, report: Optional[Dict] = None
+                              ) -> Tuple[str, List[str], float, List[dict]]:
+        cacheable = not self._continues(conversation)
+        prepared = self._prepare_generation(query, context_chunks, self._history(conversation),
+                                            self._exchange(conversation))
+        if report is not None:
+            report['context'] = prepared['context']
+        
+        async with (admission.slot() if admission else contextlib.nullcontext()):
+            try:
+                start = time.perf_counter()
+                response = await asyncio.wait_for(self._get_async_client().generate(
+                    model=self.model,
+                    prompt=prepared['prompt'],
+                    system=prepared['system'],
+                    context=prepared['history'],
+                    stream=False,
+                    options=prepared['options'],
+                    keep_alive=self.keep_alive
+                ), timeout=timeout)
+                self._record_generation(response, start, prepared, conversation)
+                result = self._finalize_answer(response['response'], prepared)
+                
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                return self._generation_error_answer(e)
+        
+        if cacheable:
+            self._cache_answer(query, context_chunks, result)
+        return result
+    
+    async def generate_response_stream_async(self, query: str, context_chunks: List[dict],
+                                             timeout: Optional[float] = None, admission=None,
+                                             conversation: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """Async generate_response_stream; the whole generation must finish within ``timeout``
+        
+        Holds an ``admission`` slot while Ollama streams (cache hits and
+        coalesced duplicates skip it). Raises Overloaded before the first
+        event when no slot is available and asyncio.TimeoutError once the
+        deadline passes. ``conversation`` works as in generate_response.
+        """
+        if not context_chunks:
+            yield self._done_event(self.NO_DOCUMENTS_ANSWER, [], 0, [])
+            return
+        
+        continues = self._continues(conversation)
+        key = flight = None
+        if not continues:
+            cached = self._cached_answer(query, context_chunks)
+            if cached is not None:
+                self._remember_exchange(conversation, query, cached)
+                yield self._done_event(*cached)
+                return
             
-        except Exception as e:
-            error_msg = str(e).lower()
+            key = self._request_key(query, context_chunks)
+            flight, leader = self.single_flight.join(key)
+            if not leader:
+                result = await flight.wait_async()
+                self._remember_exchange(conversation, query, result)
+                yield self._done_event(*result)
+                return
+        
+        result = None
+        error: Optional[BaseException] = None
+        try:
+            prepared = self._prepare_generation(query, context_chunks, self._history(conversation),
+                                                self._exchange(conversation))
             
-            # Check if it's an Ollama connection error
-            if "connection" in error_msg or "ollama" in error_msg or "failed" in error_msg:
-                logger.warning(f"Ollama unavailable: {e}")
-                # Return message asking to start Ollama
-                return "I cannot answer right now because Ollama is not running. Please start Ollama to get AI-powered answers from your documents.", [], 0, []
+            async with (admission.slot() if admission else contextlib.nullcontext()):
+                start = time.perf_counter()
+                deadline = None if timeout is None else start + timeout
+                first_token_time = None
+                parts = []
+                
+                def remaining() -> Optional[float]:
+                    return None if deadline is None else max(0.0, deadline - time.perf_counter())
+                
+                try:
+                    stream = await asyncio.wait_for(self._get_async_client().generate(
+                        model=self.model,
+                        prompt=prepared['prompt'],
+                        system=prepared['system'],
+                        context=prepared['history'],
+                        stream=True,
+                        options=prepared['options'],
+                        keep_alive=self.keep_alive
+                    ), timeout=remaining())
+                    iterator = stream.__aiter__()
+                    last_chunk = {}
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining())
+                            except StopAsyncIteration:
+                                break
+                            last_chunk = chunk
+                            token = chunk.get('response', '')
+                            if not token:
+                                continue
+                            if first_token_time is None:
+                                first_token_time = time.perf_counter() - start
+                                logger.info(f"⏱️ Time to first token: {first_token_time:.2f}s")
+                            parts.append(token)
+                            yield {'type': 'token', 'text': token}
+                    finally:
+                        # Closing the HTTP stream tells Ollama to stop generating (timeouts, disconnects)
+                        if hasattr(iterator, 'aclose'):
+                            await iterator.aclose()
+                    
+                    self._record_generation(last_chunk, start, prepared, conversation)
+                    result = self._finalize_answer(''.join(parts), prepared)
+                    if not continues:
+                        self._cache_answer(query, context_chunks, result)
+                    
+                except asyncio.TimeoutError:
+                    raise
+                except Exception as e:
+                    result = self._generation_error_answer(e)
             
-            else:
-                logger.error(f"Error generating response: {e}")
-                return f"Error: Unable to generate response. {str(e)}", [], 0, []
+            logger.info(f"⏱️ Streamed {len(parts)} tokens in {time.perf_counter() - start:.2f}s")
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if result is None and error is None:
+                error = RuntimeError("Generation was cancelled")
+            if flight is not None:
+                self.single_flight.finish(key, flight, result=result, error=error)
+        self._remember_exchange(conversation, query, result)
+        yield self._done_event(*result, context=prepared['context'])
+    
+    @staticmethod
+    def _done_event(answer: str, cited_files: List[str], confidence_score: float,
+                    source_snippets: List[dict], context: Optional[Dict] = None) -> Dict:
+        """Final stream event with the same fields as the /chat response"""
+        return {
+            'type': 'done',
+            'answer': answer,
+            'cited_files': cited_files,
+            'confidence_score': confidence_score,
+            'source_snippets': source_snippets,
+            'context': context
+        }
     
     def check_availability(self) -> bool:
         """Check if Ollama is available"""
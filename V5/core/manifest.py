@@ -0,0 +1,348 @@
+"""SQLite manifest of ingested files, used to skip unchanged files on rebuilds and restarts"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils import FileUtils
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionManifest:
+    """Tracks path, size, mtime, content hash, extractor version and chunk IDs per file.
+
+    ``needs_ingest`` does a cheap ``stat`` first and only hashes the file when
+    size or mtime differ from the recorded values, so a no-op pass over a
+    large tree costs one ``stat`` per file.
+
+    Running totals of files, chunks and bytes per directory and extension
+    are kept in step with every ``record`` and ``remove``, so statistics
+    never scan the files table. Each of those writes is also appended to a
+    short change log, so readers in other processes (the download index)
+    can apply just the rows that changed.
+    """
+
+    # PRAGMA user_version once dir_totals has been filled from existing records
+    TOTALS_VERSION = 1
+    # Newest change log entries kept; readers further behind reload everything
+    CHANGE_LOG_LIMIT = 10_000
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "file_hash TEXT NOT NULL, extractor_version TEXT NOT NULL, chunk_ids TEXT NOT NULL, "
+            "indexed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_hash ON files (file_hash)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dir_totals ("
+            "dir TEXT NOT NULL, ext TEXT NOT NULL, files INTEGER NOT NULL, chunks INTEGER NOT NULL, "
+            "bytes INTEGER NOT NULL, PRIMARY KEY (dir, ext))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, file_hash TEXT)"
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.TOTALS_VERSION:
+            self._rebuild_totals()
+        self._conn.commit()
+
+    def _rebuild_totals(self) -> None:
+        """Fill dir_totals from the files table (manifests written before totals existed)"""
+        self._conn.execute("DELETE FROM dir_totals")
+        for path, size, chunk_ids in self._conn.execute("SELECT path, size, chunk_ids FROM files").fetchall():
+            self._add_totals(path, size, len(json.loads(chunk_ids)), 1)
+        self._conn.execute(f"PRAGMA user_version = {self.TOTALS_VERSION}")
+
+    def _add_totals(self, key: str, size: int, chunks: int, sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) one file; callers hold the lock and commit"""
+        directory, ext = os.path.dirname(key), os.path.splitext(key)[1].lower()
+        self._conn.execute(
+            "INSERT INTO dir_totals (dir, ext, files, chunks, bytes) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (dir, ext) DO UPDATE SET files = files + excluded.files, "
+            "chunks = chunks + excluded.chunks, bytes = bytes + excluded.bytes",
+            (directory, ext, sign, sign * chunks, sign * size)
+        )
+        if sign < 0:
+            self._conn.execute("DELETE FROM dir_totals WHERE dir = ? AND ext = ? AND files <= 0", (directory, ext))
+
+    def _log_change(self, key: str, file_hash: Optional[str]) -> None:
+        """Append a change (file_hash None for a removal); callers hold the lock and commit"""
+        seq = self._conn.execute("INSERT INTO changes (path, file_hash) VALUES (?, ?)", (key, file_hash)).lastrowid
+        self._conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - self.CHANGE_LOG_LIMIT,))
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        """Absolute, normalized path so scripts and the watcher agree on keys"""
+        return os.path.abspath(str(path))
+
+    def get(self, path: Path) -> Optional[dict]:
+        """Return the manifest record for a path, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, mtime_ns, file_hash, extractor_version, chunk_ids, indexed_at "
+                "FROM files WHERE path = ?", (self._key(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'path': row[0],
+            'size': row[1],
+            'mtime_ns': row[2],
+            'file_hash': row[3],
+            'extractor_version': row[4],
+            'chunk_ids': json.loads(row[5]),
+            'indexed_at': row[6],
+        }
+
+    def needs_ingest(self, path: Path, extractor_version: str) -> Tuple[bool, Optional[str]]:
+        """Check whether a file must be (re)ingested.
+
+        Returns ``(needed, file_hash)``. The hash is only computed when the
+        stat data differs from the manifest, and is returned so callers do
+        not hash the file a second time.
+        """
+        path = Path(path)
+        stat = path.stat()
+        record = self.get(path)
+        if record is None:
+            return True, None
+        if record['extractor_version'] != extractor_version:
+            return True, None
+        if record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            return False, record['file_hash']
+
+        # Stat changed (touched, copied back, restored): compare content before re-ingesting
+        file_hash = FileUtils.get_file_hash(path)
+        if file_hash != record['file_hash']:
+            return True, file_hash
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                (stat.st_size, stat.st_mtime_ns, self._key(path))
+            )
+            self._conn.commit()
+        return False, file_hash
+
+    def record(self, path: Path, file_hash: str, extractor_version: str, chunk_ids: List[str]) -> None:
+        """Store or replace the record for an ingested file, using its current stat data"""
+        path = Path(path)
+        stat = path.stat()
+        key = self._key(path)
+        with self._lock:
+            previous = self._conn.execute("SELECT size, chunk_ids FROM files WHERE path = ?", (key,)).fetchone()
+            if previous:
+                self._add_totals(key, previous[0], len(json.loads(previous[1])), -1)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, size, mtime_ns, file_hash, extractor_version, chunk_ids, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, file_hash, extractor_version,
+                 json.dumps(chunk_ids), time.time())
+            )
+            self._add_totals(key, stat.st_size, len(chunk_ids), 1)
+            self._log_change(key, file_hash)
+            self._conn.commit()
+
+    def remove(self, path: Path) -> Optional[dict]:
+        """Delete and return the record for a path"""
+        record = self.get(path)
+        if record is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM files WHERE path = ?", (record['path'],))
+                self._add_totals(record['path'], record['size'], len(record['chunk_ids']), -1)
+                self._log_change(record['path'], None)
+                self._conn.commit()
+        return record
+
+    def move(self, src: Path, dest: Path) -> bool:
+        """Re-key src's record to dest after a move or rename, keeping its hash and chunk IDs.
+
+        A record already at dest is replaced; the caller releases its chunks.
+        Returns False when src has no record.
+        """
+        dest = Path(dest)
+        stat = dest.stat()
+        src_key, dest_key = self._key(src), self._key(dest)
+        with self._lock:
+            row = self._conn.execute("SELECT size, chunk_ids, file_hash FROM files WHERE path = ?",
+                                     (src_key,)).fetchone()
+            if row is None:
+                return False
+            replaced = self._conn.execute("SELECT size, chunk_ids FROM files WHERE path = ?",
+                                          (dest_key,)).fetchone()
+            if replaced and dest_key != src_key:
+                self._conn.execute("DELETE FROM files WHERE path = ?", (dest_key,))
+                self._add_totals(dest_key, replaced[0], len(json.loads(replaced[1])), -1)
+            self._conn.execute("UPDATE files SET path = ?, size = ?, mtime_ns = ? WHERE path = ?",
+                               (dest_key, stat.st_size, stat.st_mtime_ns, src_key))
+            chunks = len(json.loads(row[1]))
+            self._add_totals(src_key, row[0], chunks, -1)
+            self._add_totals(dest_key, stat.st_size, chunks, 1)
+            self._log_change(src_key, None)
+            self._log_change(dest_key, row[2])
+            self._conn.commit()
+        return True
+
+    def copies(self, file_hash: str, exclude: Path) -> List[Tuple[str, List[str]]]:
+        """(path, chunk_ids) of other files with this content; identical copies share chunk IDs"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, chunk_ids FROM files WHERE file_hash = ? AND path != ?",
+                (file_hash, self._key(exclude))
+            ).fetchall()
+        return [(path, json.loads(chunk_ids)) for path, chunk_ids in rows]
+
+    def paths(self) -> List[str]:
+        """All recorded paths"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM files")]
+
+    def files(self) -> List[Tuple[str, str]]:
+        """(path, file_hash) of every recorded file"""
+        with self._lock:
+            return self._conn.execute("SELECT path, file_hash FROM files").fetchall()
+
+    def last_change(self) -> int:
+        """Sequence number of the newest change log entry (0 when empty)"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq: int) -> Optional[List[Tuple[int, str, Optional[str]]]]:
+        """(seq, path, file_hash or None if removed) written after ``seq``, oldest first.
+
+        None when entries after ``seq`` were already trimmed from the log.
+        """
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if oldest is not None and oldest > seq + 1:
+                return None
+            return self._conn.execute(
+                "SELECT seq, path, file_hash FROM changes WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+
+    def totals(self) -> List[Tuple[str, str, int, int, int]]:
+        """(directory, extension, files, chunks, bytes) running totals"""
+        with self._lock:
+            return self._conn.execute("SELECT dir, ext, files, chunks, bytes FROM dir_totals").fetchall()
+
+    def version(self) -> Tuple[int, int]:
+        """Changes when any connection (this one or another process's) writes the manifest"""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return data_version, self._conn.total_changes
+
+    def paths_under(self, directory: Path) -> List[str]:
+        """Recorded paths inside a directory, via a range scan on the primary key"""
+        prefix = self._key(directory).rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (prefix, upper)
+            )]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+def reindex_if_changed(manifest: IngestionManifest, db_manager, file_processor, filepath: Path,
+                       category: str, batch_size: int = 256) -> Optional[int]:
+    """Re-index a file in place when the manifest says it is new or changed.
+
+    Returns the number of chunks written, or None when the file was skipped.
+    New chunks are written in batches of ``batch_size`` before the previous
+    version's leftover chunks are released; a file with no record may still
+    have chunks from before the manifest (or from an older chunker), so
+    those are cleared by filepath first.
+    """
+    from core.processor import FileProcessor
+
+    filepath = Path(filepath)
+    needed, file_hash = manifest.needs_ingest(filepath, FileProcessor.EXTRACTOR_VERSION)
+    if not needed:
+        return None
+
+    text = file_processor.extract_text(filepath) or f"File: {filepath.name}"
+    document = file_processor.create_document(filepath, text, category, file_hash=file_hash)
+
+    previous = manifest.get(filepath)
+    if not previous:
+        db_manager.delete_by_filepath(str(filepath))
+    chunk_ids = []
+    for batch in file_processor.iter_chunk_batches(document, batch_size):
+        db_manager.add_chunks(batch)
+        chunk_ids.extend(chunk.chunk_id for chunk in batch)
+    if previous:
+        release_chunks(manifest, db_manager, previous, keep=set(chunk_ids))
+    manifest.record(filepath, document.file_hash, FileProcessor.EXTRACTOR_VERSION, chunk_ids)
+    return len(chunk_ids)
+
+
+def move_indexed(manifest: IngestionManifest, db_manager, src: Path, dest: Path, category: str) -> bool:
+    """Follow a move or rename of an indexed file without extracting or embedding it again.
+
+    The record is re-keyed and its chunks are pointed at ``dest`` (and its
+    domain ``category``). Returns False, leaving everything untouched, when
+    src has no current record or dest's content differs; the caller then
+    re-indexes dest. Like needs_ingest, a matching size and mtime (which
+    moves keep) skips hashing.
+    """
+    from core.processor import FileProcessor
+
+    dest = Path(dest)
+    record = manifest.get(src)
+    if record is None or record['extractor_version'] != FileProcessor.EXTRACTOR_VERSION or not dest.is_file():
+        return False
+    stat = dest.stat()
+    if ((stat.st_size, stat.st_mtime_ns) != (record['size'], record['mtime_ns'])
+            and FileUtils.get_file_hash(dest) != record['file_hash']):
+        return False
+
+    replaced = manifest.get(dest)
+    if replaced and replaced['path'] != record['path']:
+        # The move overwrote another indexed file
+        manifest.remove(dest)
+        release_chunks(manifest, db_manager, replaced, keep=set(record['chunk_ids']))
+    manifest.move(src, dest)
+    db_manager.repoint_chunks(record['chunk_ids'], str(dest), category=category)
+    return True
+
+
+def prune_missing(manifest: IngestionManifest, db_manager) -> int:
+    """Drop manifest records (and their chunks) for files that no longer exist"""
+    removed = 0
+    for path in manifest.paths():
+        if not os.path.exists(path):
+            record = manifest.remove(path)
+            if record:
+                release_chunks(manifest, db_manager, record)
+                removed += 1
+    return removed
+
+
+def release_chunks(manifest: IngestionManifest, db_manager, record: dict, keep=()) -> int:
+    """Delete a record's chunks, except those an identical copy at another path still uses.
+
+    Shared chunks are pointed at that copy instead, so their metadata never
+    names a deleted file. IDs in ``keep`` (about to be rewritten) are left
+    alone. Returns the number of chunks deleted.
+    """
+    copies = manifest.copies(record['file_hash'], record['path'])
+    shared = {chunk_id for _, chunk_ids in copies for chunk_id in chunk_ids}
+    kept = [chunk_id for chunk_id in record['chunk_ids'] if chunk_id in shared and chunk_id not in keep]
+    if kept:
+        db_manager.repoint_chunks(kept, copies[0][0])
+    return db_manager.delete_chunks([chunk_id for chunk_id in record['chunk_ids']
+                                     if chunk_id not in shared and chunk_id not in keep])
@@ -0,0 +1,189 @@
+"""Keep the Ollama model loaded: startup warm-up, keep_alive heartbeat and cold/warm latency"""
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+import ollama
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Generation latency split by whether Ollama had to load the model first.
+
+    Ollama reports ``load_duration`` with each response; a request is cold
+    when loading took at least ``COLD_LOAD_SECONDS``. Prefill is tracked from
+    ``prompt_eval_count`` and ``prompt_eval_duration``, which leave out the
+    prompt prefix Ollama reused from its cache.
+    """
+
+    COLD_LOAD_SECONDS = 0.5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {'cold': [0, 0.0, 0.0], 'warm': [0, 0.0, 0.0]}  # count, seconds, load seconds
+        self._prompt_eval = [0, 0, 0.0, 0]  # count, evaluated tokens, seconds, estimated prompt tokens
+        self.last: Optional[dict] = None
+
+    @staticmethod
+    def load_seconds(response) -> float:
+        """Model load time reported by Ollama (nanoseconds in the response)"""
+        try:
+            return (response.get('load_duration') or 0) / 1e9
+        except Exception:
+            return 0.0
+
+    def record(self, seconds: float, load_seconds: float) -> str:
+        """Add one request; returns 'cold' or 'warm'"""
+        kind = 'cold' if load_seconds >= self.COLD_LOAD_SECONDS else 'warm'
+        with self._lock:
+            totals = self._totals[kind]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += load_seconds
+            self.last = {'kind': kind, 'seconds': round(seconds, 3), 'load_seconds': round(load_seconds, 3)}
+        logger.info(f"⏱️ {kind.capitalize()} generation: {seconds:.2f}s (model load {load_seconds:.2f}s)")
+        return kind
+
+    def record_prompt_eval(self, response, estimated_tokens: int) -> None:
+        """Add one request's prefill: tokens Ollama evaluated (cached prefixes are not) and time taken"""
+        try:
+            evaluated = response.get('prompt_eval_count') or 0
+            seconds = (response.get('prompt_eval_duration') or 0) / 1e9
+        except Exception:
+            return
+        with self._lock:
+            totals = self._prompt_eval
+            totals[0] += 1
+            totals[1] += evaluated
+            totals[2] += seconds
+            totals[3] += estimated_tokens
+        logger.info(f"🧮 Prompt eval: {evaluated} tokens in {seconds * 1000:.0f}ms "
+                    f"(prompt ~{estimated_tokens} tokens)")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            eval_count, evaluated, eval_seconds, estimated = self._prompt_eval
+            stats = {
+                kind: {
+                    'requests': count,
+                    'avg_seconds': round(seconds / count, 3) if count else None,
+                    'avg_load_seconds': round(load / count, 3) if count else None,
+                }
+                for kind, (count, seconds, load) in self._totals.items()
+            }
+            stats['prompt_eval'] = {
+                'requests': eval_count,
+                'avg_tokens': round(evaluated / eval_count) if eval_count else None,
+                'avg_ms': round(eval_seconds * 1000 / eval_count, 1) if eval_count else None,
+                'avg_estimated_prompt_tokens': round(estimated / eval_count) if eval_count else None,
+            }
+            stats['last'] = self.last
+            return stats
+
+
+class ModelWarmer:
+    """Loads the model at startup and keeps it resident during working hours.
+
+    ``warm_up`` runs a one-token generation so the first user request does
+    not pay the model load. The heartbeat then sends an empty prompt every
+    ``interval`` seconds (Ollama loads the model, if needed, without
+    generating) inside ``working_hours`` on ``working_days``, renewing
+    ``keep_alive``. Outside those hours the heartbeat pauses and Ollama
+    unloads the model once keep_alive expires. A different num_ctx (or
+    thread count) makes Ollama reload the model, so each request takes its
+    options from ``options_source`` (the service's latest generation) when
+    given. Warming up with the service's ``system`` prompt also caches its
+    prefill.
+    """
+
+    def __init__(self, model: str, keep_alive: str = "30m", interval: float = 240,
+                 working_hours: Tuple[int, int] = (8, 20), working_days: Sequence[int] = range(7),
+                 num_ctx: Optional[int] = None, system: Optional[str] = None,
+                 options_source: Optional[Callable[[], Dict]] = None):
+        self.model = model
+        self.system = system
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.working_hours = working_hours
+        self.working_days = set(working_days)
+        self.options = {'num_ctx': num_ctx} if num_ctx else {}
+        self.options_source = options_source
+        self.warmups = 0
+        self.heartbeats = 0
+        self.last_warmup: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config, llm_service) -> "ModelWarmer":
+        """Warmer for an LLMService, sending its system prompt and serving options"""
+        return cls(llm_service.model, keep_alive=config.OLLAMA_KEEP_ALIVE,
+                   interval=config.OLLAMA_HEARTBEAT_INTERVAL, working_hours=config.OLLAMA_WORKING_HOURS,
+                   working_days=config.OLLAMA_WORKING_DAYS, system=llm_service.SYSTEM_PROMPT,
+                   options_source=llm_service.serving_options)
+
+    def current_options(self) -> Dict:
+        """Options matching real requests, so warm-up and heartbeats do not reload the model"""
+        return dict(self.options_source()) if self.options_source else dict(self.options)
+
+    def in_working_hours(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.now()
+        start, end = self.working_hours
+        return now.weekday() in self.working_days and start <= now.hour < end
+
+    def warm_up(self) -> bool:
+        """Load the model with a one-token generation; False when Ollama is unreachable"""
+        start = time.perf_counter()
+        try:
+            response = ollama.generate(model=self.model, prompt="Hi", system=self.system, stream=False,
+                                       options=dict(self.current_options(), num_predict=1), keep_alive=self.keep_alive)
+        except Exception as e:
+            logger.warning(f"⚠️ Model warm-up failed: {e}")
+            return False
+        seconds = time.perf_counter() - start
+        self.warmups += 1
+        self.last_warmup = {'at': time.time(), 'seconds': round(seconds, 3),
+                            'load_seconds': round(LatencyTracker.load_seconds(response), 3)}
+        logger.info(f"🔥 Model {self.model} warmed up in {seconds:.2f}s (keep_alive {self.keep_alive})")
+        return True
+
+    def heartbeat(self) -> bool:
+        """Renew keep_alive (loading the model if it was unloaded) without generating"""
+        try:
+            ollama.generate(model=self.model, prompt="", options=self.current_options(),
+                            keep_alive=self.keep_alive)
+        except Exception as e:
+            logger.warning(f"⚠️ Model heartbeat failed: {e}")
+            return False
+        self.heartbeats += 1
+        return True
+
+    def _run(self, warm_up: bool) -> None:
+        if warm_up:
+            self.warm_up()
+        while not self._stop.wait(self.interval):
+            if self.in_working_hours():
+                self.heartbeat()
+
+    def start(self, warm_up: bool = True) -> None:
+        """Warm up (optionally) and start the heartbeat in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(warm_up,), name="model-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def get_stats(self) -> dict:
+        return {
+            'keep_alive': self.keep_alive,
+            'num_ctx': self.current_options().get('num_ctx'),
+            'working_hours': list(self.working_hours),
+            'in_working_hours': self.in_working_hours(),
+            'warmups': self.warmups,
+            'heartbeats': self.heartbeats,
+            'last_warmup': self.last_warmup,
+        }
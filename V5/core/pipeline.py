@@ -0,0 +1,330 @@
+"""Staged ingestion pipeline: parallel extraction, classification and batched database writes"""
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import logging
+import queue
+import shutil
+import threading
+import time
+
+from models.document import Document, DocumentChunk
+from utils import FileUtils
+
+logger = logging.getLogger(__name__)
+
+# Per-process FileProcessor, created once by the pool initializer
+_worker_processor = None
+
+
+def _init_worker(processor=None, ocr_workers: Optional[int] = None, archive_workers: Optional[int] = None) -> None:
+    global _worker_processor
+    from core.processor import FileProcessor
+    # The pipeline passes its own processor so workers share its chunking and OCR settings
+    _worker_processor = processor or FileProcessor()
+    if ocr_workers:
+        # This process's share, so all workers together run about OCR_WORKERS tesseracts
+        _worker_processor.ocr.workers = ocr_workers
+    if archive_workers:
+        # Likewise for archive members, and only for archives large enough to be worth a pool
+        archive = _worker_processor.archive_extractor
+        archive.workers = archive_workers
+        archive.parallel_min_members = archive.WORKER_MIN_MEMBERS
+
+
+def _extract_in_worker(filepath: str) -> Tuple[str, str]:
+    """Extract text and hash a file inside a pool worker"""
+    if _worker_processor is None:
+        _init_worker()
+    path = Path(filepath)
+    text = _worker_processor.extract_text(path) or f"File: {path.name}"
+    return text, FileUtils.get_file_hash(path)
+
+
+def move_to_sorted(filepath: Path, hierarchy: dict, sorted_dir: Path) -> Path:
+    """Move a file into sorted_dir/Domain/Category/FileExtension/ and return its new path"""
+    category_dir = Path(sorted_dir) / hierarchy["domain"] / hierarchy["category"] / hierarchy["file_extension"]
+    category_dir.mkdir(parents=True, exist_ok=True)
+
+    dest_path = category_dir / filepath.name
+
+    # Handle duplicate filenames with clean numbering (not cascading)
+    if dest_path.exists():
+        counter = 2
+        while dest_path.exists():
+            dest_path = category_dir / f"{filepath.stem}_{counter}{filepath.suffix}"
+            counter += 1
+        logger.info(f"File exists, using clean name: {dest_path.name}")
+
+    shutil.move(str(filepath), str(dest_path))
+    logger.info(f"Moved to: {dest_path}")
+    return dest_path
+
+
+# A file's chunks travel to the writer in parts: (document, chunks or None on failure, is last part)
+WritePart = Tuple[Document, Optional[List[DocumentChunk]], bool]
+
+
+class IngestionStats:
+    """Running totals for files/sec and chunks/sec progress reports"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.submitted = 0
+        self.files = 0
+        self.chunks = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def add(self, files: int = 0, chunks: int = 0, failed: int = 0, submitted: int = 0) -> None:
+        with self._lock:
+            self.files += files
+            self.chunks += chunks
+            self.failed += failed
+            self.submitted += submitted
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.files - self.failed
+
+    def summary(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{self.files} files ({self.files / elapsed:.1f} files/s), "
+                f"{self.chunks} chunks ({self.chunks / elapsed:.1f} chunks/s), "
+                f"{self.failed} failed, {self.pending} pending, {elapsed:.1f}s elapsed")
+
+
+class IngestionPipeline:
+    """Extract -> classify/move/chunk -> batched writer, connected by bounded queues.
+
+    Extraction (PDF parsing, OCR, Office formats) is CPU-bound and runs in a
+    process pool. A single classifier thread classifies each extracted file,
+    moves it into the sorted tree and chunks it, and a single writer thread
+    groups chunks from many files into large ``add_chunks`` calls. At most
+    ``queue_size`` files are in flight between ``submit`` and the classifier,
+    and at most ``queue_size`` parts of up to ``batch_size`` chunks wait for
+    the writer, so neither a huge folder drop nor a huge spreadsheet can
+    exhaust memory: ``submit`` and chunking block instead. ``on_indexed``
+    receives each file's chunk IDs once its last part is written.
+    """
+
+    def __init__(self, db_manager, llm_service, file_processor, sorted_dir: Path,
+                 workers: int = 2, batch_size: int = 256, queue_size: int = 64,
+                 flush_interval: float = 2.0, report_interval: float = 10.0, use_processes: bool = True,
+                 on_indexed: Optional[Callable[[Document, List[str]], None]] = None):
+        self.db_manager = db_manager
+        self.llm_service = llm_service
+        self.file_processor = file_processor
+        self.sorted_dir = Path(sorted_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.report_interval = report_interval
+        self.on_indexed = on_indexed
+        self.stats = IngestionStats()
+        # Files moved into the sorted tree whose database write failed, for the caller to retry
+        self._unwritten: List[Path] = []
+        self._unwritten_lock = threading.Lock()
+
+        if use_processes:
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(file_processor, file_processor.ocr.per_process(workers),
+                          file_processor.archive_extractor.per_process(workers)))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+
+        self._in_flight = threading.BoundedSemaphore(queue_size)
+        self._extracted: "queue.Queue[Optional[Tuple[Path, Future]]]" = queue.Queue(maxsize=queue_size)
+        self._to_write: "queue.Queue[Optional[WritePart]]" = queue.Queue(maxsize=queue_size)
+        # Writer-side chunk IDs of files whose parts are still arriving, and files whose write failed
+        self._written_ids: Dict[int, List[str]] = {}
+        self._failed_files: Set[int] = set()
+        self._idle = threading.Condition()
+        self._closed = False
+
+        self._classifier_thread = threading.Thread(target=self._classify_loop, name="ingest-classify", daemon=True)
+        self._writer_thread = threading.Thread(target=self._write_loop, name="ingest-writer", daemon=True)
+        self._classifier_thread.start()
+        self._writer_thread.start()
+
+        logger.info(f"Ingestion pipeline started: {workers} extraction workers, "
+                    f"batch size {batch_size}, queue size {queue_size}")
+
+    def submit(self, filepath: Path) -> None:
+        """Queue a file for ingestion, blocking while the pipeline is full"""
+        if self._closed:
+            raise RuntimeError("Ingestion pipeline is closed")
+        filepath = Path(filepath)
+        self._in_flight.acquire()
+        self.stats.add(submitted=1)
+        future = self._executor.submit(_extract_in_worker, str(filepath))
+        # Never blocks: the semaphore keeps in-flight files below the queue size
+        future.add_done_callback(lambda f: self._extracted.put((filepath, f)))
+
+    def _classify_loop(self) -> None:
+        while True:
+            item = self._extracted.get()
+            if item is None:
+                self._to_write.put(None)
+                return
+            filepath, future = item
+            try:
+                text, file_hash = future.result()
+                logger.info(f"Extracted {len(text)} characters from {filepath.name}")
+
+                hierarchy = self.llm_service.classify_hierarchical(text, filepath.name)
+                logger.info(f"Hierarchical classification: {hierarchy['domain']} > "
+                            f"{hierarchy['category']} > {hierarchy['file_extension']}")
+
+                # Use domain as legacy category for DB
+                document = self.file_processor.create_document(filepath, text, hierarchy["domain"],
+                                                               file_hash=file_hash)
+                document.filepath = move_to_sorted(filepath, hierarchy, self.sorted_dir)
+                self._queue_chunks(document)
+            except Exception as e:
+                logger.error(f"Error processing {filepath}: {e}")
+                self._finish(failed=1)
+            finally:
+                self._in_flight.release()
+
+    def _queue_chunks(self, document: Document) -> None:
+        """Hand the writer a moved file's chunks in parts of at most batch_size"""
+        batches = self.file_processor.iter_chunk_batches(document, self.batch_size)
+        try:
+            part = next(batches, [])
+            for following in batches:
+                self._to_write.put((document, part, False))
+                part = following
+        except Exception as e:
+            # Earlier parts are already queued, so the writer settles this file
+            logger.error(f"Error chunking {document.filename}, queued for retry: {e}")
+            self._to_write.put((document, None, True))
+            return
+        self._to_write.put((document, part, True))
+
+    def _write_loop(self) -> None:
+        pending: List[WritePart] = []
+        pending_chunks = 0
+        pending_since = 0.0
+        last_report = time.perf_counter()
+        done = False
+
+        while not done:
+            try:
+                item = self._to_write.get(timeout=self.flush_interval)
+                if item is None:
+                    done = True
+                else:
+                    if not pending:
+                        pending_since = time.perf_counter()
+                    pending.append(item)
+                    pending_chunks += len(item[1] or ())
+            except queue.Empty:
+                pass
+
+            # Flush on a full batch, when the oldest file has waited long enough, or at shutdown
+            if pending and (pending_chunks >= self.batch_size or done
+                            or time.perf_counter() - pending_since >= self.flush_interval):
+                self._flush(pending)
+                pending, pending_chunks = [], 0
+
+            now = time.perf_counter()
+            if now - last_report >= self.report_interval and self.stats.submitted:
+                logger.info(f"📈 Ingestion progress: {self.stats.summary()}")
+                last_report = now
+
+    def _unique_chunks(self, pending: List[WritePart]) -> List[DocumentChunk]:
+        """Batch chunks with each chunk ID once (identical files share content-derived IDs),
+        skipping later parts of files whose write already failed"""
+        seen = set()
+        chunks = []
+        for document, file_chunks, _ in pending:
+            if id(document) in self._failed_files:
+                continue
+            for chunk in file_chunks or ():
+                if chunk.chunk_id not in seen:
+                    seen.add(chunk.chunk_id)
+                    chunks.append(chunk)
+        return chunks
+
+    def _flush(self, pending: List[WritePart]) -> None:
+        chunks = self._unique_chunks(pending)
+        try:
+            if chunks:
+                self.db_manager.add_chunks(chunks)
+        except Exception as e:
+            # Files are already in the sorted tree: write them one by one so a bad file cannot sink the batch
+            logger.error(f"Error writing batch of {len(chunks)} chunks, retrying file by file: {e}")
+            for document, file_chunks, _ in pending:
+                try:
+                    if file_chunks and id(document) not in self._failed_files:
+                        self.db_manager.add_chunks(file_chunks)
+                except Exception as e:
+                    logger.error(f"Error writing {document.filename}: {e}")
+                    self._failed_files.add(id(document))
+
+        files = chunk_count = failed = 0
+        for document, file_chunks, last in pending:
+            key = id(document)
+            if file_chunks is None:
+                self._failed_files.add(key)
+            if key not in self._failed_files:
+                self._written_ids.setdefault(key, []).extend(chunk.chunk_id for chunk in file_chunks)
+            if not last:
+                continue
+
+            chunk_ids = self._written_ids.pop(key, [])
+            if key in self._failed_files:
+                self._failed_files.discard(key)
+                logger.error(f"Error writing {document.filename}, queued for retry")
+                self.mark_unwritten(document.filepath)
+                failed += 1
+                continue
+            logger.info(f"✓ Successfully processed: {document.filename} ({len(chunk_ids)} chunks)")
+            if self.on_indexed:
+                try:
+                    self.on_indexed(document, chunk_ids)
+                except Exception as e:
+                    logger.error(f"Error in on_indexed callback for {document.filename}: {e}")
+            files += 1
+            chunk_count += len(chunk_ids)
+        self._finish(files=files, chunks=chunk_count, failed=failed)
+
+    def mark_unwritten(self, filepath: Path) -> None:
+        """Queue a sorted file whose database write failed for take_unwritten"""
+        with self._unwritten_lock:
+            self._unwritten.append(Path(filepath))
+
+    def take_unwritten(self) -> List[Path]:
+        """Sorted paths whose database write failed since the last call"""
+        with self._unwritten_lock:
+            unwritten, self._unwritten = self._unwritten, []
+        return unwritten
+
+    def _finish(self, files: int = 0, chunks: int = 0, failed: int = 0) -> None:
+        self.stats.add(files=files, chunks=chunks, failed=failed)
+        with self._idle:
+            self._idle.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted file has been written or has failed"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.stats.pending <= 0, timeout=timeout)
+
+    def close(self) -> IngestionStats:
+        """Drain all stages, stop the workers and log a final report"""
+        if self._closed:
+            return self.stats
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        self._extracted.put(None)
+        self._classifier_thread.join()
+        self._writer_thread.join()
+        logger.info(f"📈 Ingestion finished: {self.stats.summary()}")
+        return self.stats
+
+    def __enter__(self) -> "IngestionPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,15 +1,15 @@
 """File processor - orchestrates text extraction and processing"""
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import datetime
 import logging
 
 from models.document import Document, DocumentChunk
 from extractors import (
     PDFExtractor, ImageExtractor, AudioExtractor,
-    DocumentExtractor, CodeExtractor
+    DocumentExtractor, CodeExtractor, OCRService, ArchiveExtractor
 )
-from utils import FileUtils, TextUtils
+from utils import FileUtils, StructuredChunker, TextChunk
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +17,20 @@ logger = logging.getLogger(__name__)
 class FileProcessor:
     """Processes files and extracts text"""
     
-    def __init__(self):
-        self.pdf_extractor = PDFExtractor()
-        self.image_extractor = ImageExtractor()
+    # Bump when extraction or chunking output changes so the ingestion
+    # manifest re-ingests files that were indexed with the old behaviour
+    EXTRACTOR_VERSION = "7"
+    
+    def __init__(self, chunk_tokens: int = 200, overlap_tokens: int = 30,
+                 ocr: Optional[OCRService] = None, ocr_dpi: int = 200, ocr_max_pages: int = 50):
+        self.chunker = StructuredChunker(target_tokens=chunk_tokens, overlap_tokens=overlap_tokens)
+        self.ocr = ocr or OCRService()
+        self.pdf_extractor = PDFExtractor(ocr=self.ocr, ocr_dpi=ocr_dpi, ocr_max_pages=ocr_max_pages)
+        self.image_extractor = ImageExtractor(ocr=self.ocr)
         self.audio_extractor = AudioExtractor()
         self.document_extractor = DocumentExtractor()
         self.code_extractor = CodeExtractor()
+        self.archive_extractor = ArchiveExtractor()
     
     def extract_text(self, filepath: Path) -> str:
         """Extract text from any file type"""
@@ -74,9 +82,9 @@ class FileProcessor:
             elif ext in ['.tex', '.bib']:
                 return self.document_extractor.extract_text(filepath)
             
-            # ZIP files
+            # ZIP/TAR archives (each member through extract_text)
             elif file_type == 'archive':
-                return FileUtils.list_zip_contents(filepath)
+                return self.archive_extractor.extract(filepath, self)
             
             # Medical files (metadata only)
             elif file_type == 'medical':
@@ -102,12 +110,13 @@ class FileProcessor:
             logger.error(f"Error extracting text from {filepath}: {e}")
             return f"File: {filepath.name}"
     
-    def create_document(self, filepath: Path, text: str, category: str) -> Document:
-        """Create Document object"""
+    def create_document(self, filepath: Path, text: str, category: str,
+                        file_hash: Optional[str] = None) -> Document:
+        """Create Document object, reusing file_hash when it was already computed"""
         return Document(
             filename=filepath.name,
             filepath=filepath,
-            file_hash=FileUtils.get_file_hash(filepath),
+            file_hash=file_hash or FileUtils.get_file_hash(filepath),
             category=category,
             text_content=text,
             file_type=FileUtils.get_file_type(filepath),
@@ -116,24 +125,56 @@ class FileProcessor:
             processed_at=datetime.now()
         )
     
-    def create_chunks(self, document: Document, chunk_size: int = 1200) -> List[DocumentChunk]:
-        """Create chunks from document - optimized size for accuracy and retrieval"""
-        text_chunks = TextUtils.chunk_text(document.text_content, chunk_size)
-        
-        chunks = []
-        for i, text in enumerate(text_chunks):
-            chunk = DocumentChunk(
+    def iter_text_chunks(self, document: Document) -> Iterator[TextChunk]:
+        """Spreadsheets and CSVs are re-read row by row from disk; everything else chunks text_content"""
+        tables = self.document_extractor.iter_tables(document.filepath)
+        if tables is not None and document.filepath.exists():
+            return self.chunker.iter_table_chunks(tables)
+        return self.chunker.iter_chunks(document.text_content)
+    
+    def iter_document_chunks(self, document: Document) -> Iterator[DocumentChunk]:
+        """Lazily chunk a document along its pages, slides, sheets, cells, table rows and archive members"""
+        count = 0
+        try:
+            for chunk in self._build_chunks(document, self.iter_text_chunks(document)):
+                count += 1
+                yield chunk
+        except Exception as e:
+            if count:
+                # Chunks already handed out cannot be taken back: keep the rows read so far
+                logger.error(f"Error streaming {document.filename} after {count} chunks, stopping there: {e}")
+                return
+            logger.error(f"Error streaming {document.filename}, chunking extracted text instead: {e}")
+            yield from self._build_chunks(document, self.chunker.iter_chunks(document.text_content))
+    
+    def iter_chunk_batches(self, document: Document, batch_size: int) -> Iterator[List[DocumentChunk]]:
+        """Chunks in lists of at most batch_size, so a huge spreadsheet is never held in memory whole"""
+        batch = []
+        for chunk in self.iter_document_chunks(document):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def create_chunks(self, document: Document) -> List[DocumentChunk]:
+        """Create chunks from document along its pages, slides, sheets, cells, table rows and archive members"""
+        return list(self.iter_document_chunks(document))
+    
+    def _build_chunks(self, document: Document, text_chunks: Iterator[TextChunk]) -> Iterator[DocumentChunk]:
+        for i, text_chunk in enumerate(text_chunks):
+            yield DocumentChunk(
                 chunk_id=f"{document.file_hash}_{i}",
                 document_hash=document.file_hash,
-                text=text,
+                text=text_chunk.text,
                 chunk_index=i,
                 filename=document.filename,
                 category=document.category,
-                filepath=str(document.filepath)
+                filepath=str(document.filepath),
+                locator=text_chunk.locator,
+                member=text_chunk.member
             )
-            chunks.append(chunk)
-        
-        return chunks
 
     def process_file(self, filepath: str, category: str) -> List[DocumentChunk]:
         """Process a file and return chunks"""
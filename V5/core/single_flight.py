@@ -0,0 +1,121 @@
+"""Single-flight request coalescing: concurrent identical requests share one result"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """One in-progress computation that followers can wait on from threads or coroutines"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+    def resolve(self, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.result, self.error = result, error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def wait(self) -> Any:
+        """Block the calling thread until the leader finishes"""
+        self._done.wait()
+        return self._outcome()
+
+    async def wait_async(self) -> Any:
+        """Await the leader without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(notify)
+                pending = True
+            else:
+                pending = False
+        if pending:
+            await future
+        return self._outcome()
+
+
+class SingleFlight:
+    """Tracks in-flight computations by key.
+
+    The first caller for a key becomes the leader and must ``finish`` it; any
+    caller arriving before then is a follower and waits for the leader's
+    result (or exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """Return the flight for ``key`` and whether the caller leads it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.coalesced += 1
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self.leaders += 1
+            return flight, True
+
+    def finish(self, key: str, flight: Flight, result: Any = None,
+               error: Optional[BaseException] = None) -> None:
+        """Publish the leader's outcome and let new callers start a fresh flight
+
+        A leader that was cancelled (CancelledError, GeneratorExit,
+        KeyboardInterrupt) re-raises that itself; followers get a
+        RuntimeError instead, which their handlers turn into a response.
+        """
+        if error is not None and not isinstance(error, Exception):
+            error = RuntimeError("Generation was cancelled")
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if flight.followers:
+            logger.info(f"🔗 Shared one generation with {flight.followers} identical request(s)")
+        flight.resolve(result, error)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` once for all concurrent callers with the same key"""
+        flight, leader = self.join(key)
+        if not leader:
+            return flight.wait()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,109 @@
+"""Cached library statistics and service health for /status"""
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+import threading
+import time
+
+from core.manifest import IngestionManifest
+
+logger = logging.getLogger(__name__)
+
+
+class StatsService:
+    """Serves /status numbers from counters instead of scanning on every poll.
+
+    Files, chunks and bytes per domain, category and extension come from
+    the manifest's running totals, which move with every ingest and delete
+    the watcher records. They are re-read (one row per directory and
+    extension, not per file) only when the manifest version changes. The
+    vector store count and Ollama health are refreshed by a background
+    thread every ``refresh_interval`` seconds, so a request only pays for
+    an O(1) version check.
+    """
+
+    def __init__(self, manifest: IngestionManifest, root: Path, db_manager=None, llm_service=None,
+                 refresh_interval: float = 30.0):
+        self.manifest = manifest
+        self.root = Path(root).absolute()
+        self.db_manager = db_manager
+        self.llm_service = llm_service
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._library: Dict = {}
+        self._version = None
+        self._health = {'ollama_available': None, 'database_count': None, 'checked_at': None}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _add(totals: dict, files: int, chunks: int, size: int) -> None:
+        totals['files'] = totals.get('files', 0) + files
+        totals['chunks'] = totals.get('chunks', 0) + chunks
+        totals['bytes'] = totals.get('bytes', 0) + size
+
+    def _load_library(self) -> dict:
+        """Nest the manifest's per-directory totals into domain -> category -> extension"""
+        library = {'files': 0, 'chunks': 0, 'bytes': 0, 'domains': {}}
+        for directory, ext, files, chunks, size in self.manifest.totals():
+            try:
+                parts = Path(directory).relative_to(self.root).parts
+            except ValueError:
+                continue
+            domain = library['domains'].setdefault(parts[0] if parts else "", {'categories': {}})
+            category = domain['categories'].setdefault(parts[1] if len(parts) > 1 else "", {'extensions': {}})
+            extension = category['extensions'].setdefault(ext or "(none)", {})
+            for totals in (library, domain, category, extension):
+                self._add(totals, files, chunks, size)
+        return library
+
+    def library(self) -> dict:
+        """Current totals, reloaded only when the manifest has changed"""
+        version = self.manifest.version()
+        if version != self._version:
+            library = self._load_library()
+            with self._lock:
+                self._library, self._version = library, version
+        return self._library
+
+    def refresh_health(self) -> None:
+        """Check Ollama and count stored chunks (run off the request path)"""
+        health = {'checked_at': time.time()}
+        health['ollama_available'] = self.llm_service.check_availability() if self.llm_service else None
+        try:
+            health['database_count'] = self.db_manager.get_count() if self.db_manager else None
+        except Exception as e:
+            logger.error(f"Error counting database chunks: {e}")
+            health['database_count'] = self._health.get('database_count')
+        with self._lock:
+            self._health = health
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh_health()
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def start(self) -> None:
+        """Start the background health checks"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="status-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def get_stats(self) -> dict:
+        library = self.library()
+        with self._lock:
+            health = dict(self._health)
+        return {
+            'database_count': health['database_count'],
+            'ollama_available': health['ollama_available'],
+            'health_checked_at': health['checked_at'],
+            'sorted_files': library.get('files', 0),
+            'categories': sorted(library.get('domains', {})),
+            'library': library,
+        }
@@ -4,11 +4,15 @@ from .image_extractor import ImageExtractor
 from .audio_extractor import AudioExtractor
 from .document_extractor import DocumentExtractor
 from .code_extractor import CodeExtractor
+from .ocr import OCRService
+from .archive_extractor import ArchiveExtractor
 
 __all__ = [
     'PDFExtractor',
     'ImageExtractor', 
     'AudioExtractor',
     'DocumentExtractor',
-    'CodeExtractor'
+    'CodeExtractor',
+    'OCRService',
+    'ArchiveExtractor'
 ]
@@ -0,0 +1,203 @@
+"""ZIP and TAR extraction, member by member"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from pathlib import Path, PurePosixPath
+from typing import IO, Iterator, List, Optional, Tuple
+import gzip
+import logging
+import os
+import tarfile
+import tempfile
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Members that are themselves archives are listed but not opened, so nesting cannot multiply the limits
+NESTED_ARCHIVE_SUFFIXES = ('.zip', '.rar', '.7z', '.tar', '.gz', '.tgz', '.bz2', '.xz')
+
+# FileProcessor of a member pool worker, set by _init_member_worker
+_worker_processor = None
+
+
+def _init_member_worker(processor, ocr_workers: Optional[int] = None) -> None:
+    global _worker_processor
+    _worker_processor = processor
+    if ocr_workers:
+        # This process's share of the processor's OCR workers
+        _worker_processor.ocr.workers = ocr_workers
+
+
+def _extract_member(name: str, data: bytes, processor=None) -> str:
+    """Text of one member via FileProcessor.extract_text
+
+    The extractors are path based, so the member's bytes are written to a
+    private temporary file named like the member (its suffix picks the
+    extractor) and removed as soon as its text is read.
+    """
+    processor = processor or _worker_processor
+    with tempfile.TemporaryDirectory(prefix="archive-member-") as tmp:
+        path = Path(tmp) / PurePosixPath(name).name
+        path.write_bytes(data)
+        return processor.extract_text(path)
+
+
+class ArchiveExtractor:
+    """Extract text from the members of ZIP, TAR (plain or compressed) and GZIP files
+
+    Members are read one at a time from the archive stream, so nothing is
+    unpacked to disk as a tree. Zip bombs are bounded by the number of
+    members, the size of each member, the total uncompressed size and the
+    compression ratio; members over a limit are skipped and listed in the
+    archive's summary line.
+    """
+
+    # Below this many members a process pool costs more than it saves
+    PARALLEL_MIN_MEMBERS = 4
+    # Inside an ingestion worker, where files are already spread over processes, only large archives get a pool
+    WORKER_MIN_MEMBERS = 32
+    MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+    def __init__(self, max_members: int = 1000, max_member_bytes: int = 50 * 1024 * 1024,
+                 max_total_bytes: int = 500 * 1024 * 1024, max_ratio: float = 100,
+                 workers: int = None, parallel_min_members: int = PARALLEL_MIN_MEMBERS):
+        self.max_members = max_members
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_ratio = max_ratio
+        self.workers = workers or ArchiveExtractor.MAX_WORKERS
+        self.parallel_min_members = parallel_min_members
+
+    def per_process(self, processes: int) -> int:
+        """Member workers for each of ``processes`` ingestion workers
+
+        At least two when a pool is allowed at all: the ingestion worker only
+        waits on its members meanwhile, so a large archive still overlaps them.
+        """
+        return max(2, self.workers // max(1, processes)) if self.workers >= 2 else 1
+
+    @staticmethod
+    def archive_format(filepath: Path) -> Optional[str]:
+        """'zip', 'tar' or 'gzip', or None for archives that cannot be read (e.g. .rar, .7z)"""
+        if zipfile.is_zipfile(filepath):
+            return 'zip'
+        if tarfile.is_tarfile(filepath):
+            return 'tar'
+        if filepath.suffix.lower() == '.gz':
+            return 'gzip'
+        return None
+
+    def _read_limited(self, stream: IO[bytes]) -> Optional[bytes]:
+        """Member bytes, or None when it decompresses past the per-member limit"""
+        data = stream.read(self.max_member_bytes + 1)
+        return data if len(data) <= self.max_member_bytes else None
+
+    def _raw_members(self, filepath: Path, kind: str) -> Iterator[Tuple[str, int, Optional[int], IO[bytes]]]:
+        """Yield (name, declared size, compressed size or None, stream) for each regular file"""
+        if kind == 'zip':
+            with zipfile.ZipFile(filepath) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    with archive.open(info) as stream:
+                        yield info.filename, info.file_size, info.compress_size, stream
+        elif kind == 'tar':
+            # Stream mode reads members strictly in order without seeking
+            with tarfile.open(filepath, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    yield member.name, member.size, None, archive.extractfile(member)
+        else:
+            with gzip.open(filepath) as stream:
+                yield filepath.stem, 0, None, stream
+
+    def iter_members(self, filepath: Path, skipped: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """Yield (member path, bytes) within the limits; skipped members are appended to ``skipped``"""
+        kind = self.archive_format(filepath)
+        archive_size = max(1, filepath.stat().st_size)
+        total = 0
+        count = 0
+
+        for name, size, compressed, stream in self._raw_members(filepath, kind):
+            if name.startswith("__MACOSX/"):
+                continue
+            if count >= self.max_members:
+                skipped.append(f"remaining members (limit of {self.max_members} reached)")
+                break
+            count += 1
+
+            if name.lower().endswith(NESTED_ARCHIVE_SUFFIXES):
+                skipped.append(f"{name} (nested archive)")
+                continue
+            if size > self.max_member_bytes:
+                skipped.append(f"{name} (too large)")
+                continue
+            if compressed and size / compressed > self.max_ratio:
+                skipped.append(f"{name} (compression ratio {size // compressed}:1)")
+                continue
+
+            # Declared sizes can lie, so the limits are checked again on the bytes actually read
+            data = self._read_limited(stream)
+            if data is None:
+                skipped.append(f"{name} (too large)")
+                continue
+            total += len(data)
+            if total > self.max_total_bytes or total > archive_size * self.max_ratio:
+                skipped.append(f"{name} and after (archive expands past its size limits)")
+                logger.warning(f"⚠️ {filepath.name}: stopped at {name}, uncompressed size over the limit")
+                break
+            yield name, data
+
+    def iter_member_texts(self, filepath: Path, processor, skipped: List[str]) -> Iterator[Tuple[str, str]]:
+        """Yield (member path, text) in archive order, extracting members in a process pool
+        of ``workers`` once the archive has ``parallel_min_members`` members"""
+        members = self.iter_members(filepath, skipped)
+        head = list(islice(members, self.parallel_min_members))
+
+        if len(head) < self.parallel_min_members or self.workers < 2:
+            for name, data in chain(head, members):
+                yield name, _extract_member(name, data, processor)
+            return
+
+        ocr = getattr(processor, 'ocr', None)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_member_worker,
+                                 initargs=(processor, ocr.per_process(self.workers) if ocr else None)) as pool:
+            # A bounded window keeps only a few members' bytes in memory at once
+            window = deque()
+            for name, data in chain(head, members):
+                window.append((name, pool.submit(_extract_member, name, data)))
+                if len(window) >= self.workers * 2:
+                    done_name, future = window.popleft()
+                    yield done_name, future.result()
+            while window:
+                done_name, future = window.popleft()
+                yield done_name, future.result()
+
+    def extract(self, filepath: Path, processor) -> str:
+        """Text of every member under a "=== Member: path ===" header, after a summary line
+
+        ``processor`` is the FileProcessor whose extract_text reads each member.
+        """
+        kind = self.archive_format(filepath)
+        if kind is None:
+            return (f"Archive file ({filepath.suffix.lower()}): {filepath.name}\n"
+                    f"Note: only ZIP, TAR and GZIP archives can be read")
+
+        sections = []
+        skipped: List[str] = []
+        try:
+            for name, text in self.iter_member_texts(filepath, processor, skipped):
+                text = text.strip()
+                if text:
+                    sections.append(f"=== Member: {name} ===\n{text}")
+        except Exception as e:
+            logger.error(f"Error reading archive {filepath}: {e}")
+            skipped.append(f"unreadable remainder ({e})")
+
+        summary = f"Archive: {filepath.name} ({len(sections)} member(s) extracted)"
+        if skipped:
+            summary += "\nSkipped: " + ", ".join(skipped)
+            logger.warning(f"⚠️ {filepath.name}: skipped {len(skipped)} member(s)")
+        logger.info(f"📦 Extracted {len(sections)} member(s) from {filepath.name}")
+        return "\n\n".join([summary] + sections)
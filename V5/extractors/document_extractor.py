@@ -2,16 +2,25 @@
 import docx
 from pptx import Presentation
 from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+import itertools
 import logging
 import csv
 import json
 
 logger = logging.getLogger(__name__)
 
+# (sheet name or None for CSV, (row number, header text), iterator of (row number, row text))
+Table = Tuple[Optional[str], Tuple[int, str], Iterator[Tuple[int, str]]]
+
 
 class DocumentExtractor:
     """Extract text from document files"""
     
+    XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+    # Characters of a spreadsheet or CSV kept as the document text (used for classification)
+    TABLE_PREVIEW_CHARS = 100_000
+    
     @staticmethod
     def extract_docx(filepath: Path) -> str:
         """Extract text from DOCX file"""
@@ -113,24 +122,71 @@ class DocumentExtractor:
             return ""
     
     @staticmethod
-    def extract_xlsx(filepath: Path) -> str:
-        """Extract text from Excel file"""
+    def _row_texts(rows: Iterable) -> Iterator[Tuple[int, str]]:
+        """(row number, "a | b | c") for each row with at least one non-empty cell"""
+        for number, row in enumerate(rows, 1):
+            cells = ["" if cell is None else str(cell) for cell in row]
+            if any(cell.strip() for cell in cells):
+                yield number, " | ".join(cells)
+    
+    @staticmethod
+    def iter_xlsx_tables(filepath: Path) -> Iterator[Table]:
+        """Stream each sheet as (sheet name, header row, remaining rows) without loading the workbook"""
+        import openpyxl
+        wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
         try:
-            import openpyxl
-            wb = openpyxl.load_workbook(filepath, data_only=True)
-            text_parts = []
-            
             for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                text_parts.append(f"\n=== Sheet: {sheet_name} ===\n")
-                
-                for row in sheet.iter_rows(values_only=True):
-                    row_text = " | ".join([str(cell) if cell is not None else "" for cell in row])
-                    if row_text.strip():
-                        text_parts.append(row_text)
-            
-            logger.info(f"Extracted {len(wb.sheetnames)} sheets from {filepath.name}")
-            return '\n'.join(text_parts).strip()
+                rows = DocumentExtractor._row_texts(wb[sheet_name].iter_rows(values_only=True))
+                header = next(rows, None)
+                if header is not None:
+                    yield sheet_name, header, rows
+        finally:
+            wb.close()
+    
+    @staticmethod
+    def iter_csv_tables(filepath: Path) -> Iterator[Table]:
+        """Stream a CSV file as one (None, header row, remaining rows) table"""
+        with open(filepath, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            rows = DocumentExtractor._row_texts(csv.reader(f))
+            header = next(rows, None)
+            if header is not None:
+                yield None, header, rows
+    
+    @staticmethod
+    def iter_tables(filepath: Path) -> Optional[Iterator[Table]]:
+        """Streaming tables for spreadsheet and CSV files, None for other files"""
+        ext = Path(filepath).suffix.lower()
+        if ext in DocumentExtractor.XLSX_EXTENSIONS:
+            return DocumentExtractor.iter_xlsx_tables(filepath)
+        if ext == '.csv':
+            return DocumentExtractor.iter_csv_tables(filepath)
+        return None
+    
+    @classmethod
+    def table_preview(cls, tables: Iterator[Table]) -> str:
+        """Text of the first TABLE_PREVIEW_CHARS of a table stream, in the old extract_xlsx layout"""
+        parts, size = [], 0
+        try:
+            for name, header, rows in tables:
+                if name is not None:
+                    parts.append(f"\n=== Sheet: {name} ===\n")
+                for _, row_text in itertools.chain([header], rows):
+                    if size >= cls.TABLE_PREVIEW_CHARS:
+                        parts.append("... (preview truncated; all rows are indexed)")
+                        return '\n'.join(parts).strip()
+                    parts.append(row_text)
+                    size += len(row_text) + 1
+        finally:
+            tables.close()
+        return '\n'.join(parts).strip()
+    
+    @classmethod
+    def extract_xlsx(cls, filepath: Path) -> str:
+        """Extract a bounded text preview of an Excel file (rows are chunked from iter_tables)"""
+        try:
+            text = cls.table_preview(cls.iter_xlsx_tables(filepath))
+            logger.info(f"Extracted preview of {filepath.name}")
+            return text
             
         except ImportError:
             logger.warning("openpyxl not installed, cannot extract Excel files")
@@ -139,19 +195,11 @@ class DocumentExtractor:
             logger.error(f"Error extracting XLSX {filepath}: {e}")
             return f"Excel file: {filepath.name}"
     
-    @staticmethod
-    def extract_csv(filepath: Path) -> str:
-        """Extract text from CSV file"""
+    @classmethod
+    def extract_csv(cls, filepath: Path) -> str:
+        """Extract a bounded text preview of a CSV file (rows are chunked from iter_tables)"""
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                reader = csv.reader(f)
-                rows = []
-                for i, row in enumerate(reader):
-                    if i > 1000:  # Limit to first 1000 rows
-                        rows.append(f"... (truncated at 1000 rows)")
-                        break
-                    rows.append(" | ".join(row))
-                return '\n'.join(rows)
+            return cls.table_preview(cls.iter_csv_tables(filepath))
         except Exception as e:
             logger.error(f"Error extracting CSV {filepath}: {e}")
             return f"CSV file: {filepath.name}"
@@ -1,22 +1,24 @@
 """Image text extraction using OCR"""
-from PIL import Image
-import pytesseract
 from pathlib import Path
+from typing import Optional
 import logging
 
+from .ocr import OCRService
+
 logger = logging.getLogger(__name__)
 
 
 class ImageExtractor:
     """Extract text from images using OCR"""
     
-    @staticmethod
-    def extract(filepath: Path) -> str:
-        """Extract text from image using Tesseract OCR"""
+    def __init__(self, ocr: Optional[OCRService] = None):
+        self.ocr = ocr or OCRService()
+    
+    def extract(self, filepath: Path) -> str:
+        """Extract text from image using Tesseract OCR (cached by file content); unreadable files give ''"""
         try:
-            image = Image.open(filepath)
-            text = pytesseract.image_to_string(image)
-            return text.strip() if text else ""
+            image = Path(filepath).read_bytes()
         except Exception as e:
             logger.error(f"Error extracting image {filepath}: {e}")
             return ""
+        return self.ocr.ocr_images([image])[0]
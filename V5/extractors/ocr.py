@@ -0,0 +1,197 @@
+"""Tesseract OCR with a worker pool and a cache keyed by image hash"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+
+from PIL import Image
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+
+class OCRService:
+    """Runs pytesseract over images, reusing results for images it has seen before.
+
+    Before OCR, images are downscaled to at most ``max_dpi`` (and
+    ``max_side`` pixels), converted to grayscale and, with ``binarize``,
+    thresholded to black and white. Results are cached by a hash of the
+    image bytes, the language and these settings, in memory and, when
+    ``cache_path`` is given, in SQLite, so re-ingesting the same images
+    costs nothing. Tesseract runs as a subprocess, so a thread pool of
+    ``workers`` (capped at the CPU count) OCRs that many images at once; an
+    image that takes longer than ``timeout`` seconds yields no text. Process
+    pools give each process ``per_process`` workers, so the pool as a whole
+    stays near ``workers``.
+    """
+
+    # Bump when preprocessing changes so cached text from the old pipeline is not reused
+    PREPROCESS_VERSION = "1"
+
+    def __init__(self, cache_path: Optional[Path] = None, workers: int = 2,
+                 timeout: float = 60, lang: str = "eng", max_dpi: int = 300,
+                 max_side: int = 4000, binarize: bool = True):
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.workers = max(1, min(workers, os.cpu_count() or 1))
+        self.timeout = timeout
+        self.lang = lang
+        self.max_dpi = max_dpi
+        self.max_side = max_side
+        self.binarize = binarize
+        self._setup()
+
+    def _setup(self) -> None:
+        self._lock = threading.Lock()
+        self._memory: Dict[str, str] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._available: Optional[bool] = None
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+        self._db = None
+        if self.cache_path is not None:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Several ingestion processes may share the file
+            self._db = sqlite3.connect(str(self.cache_path), timeout=30, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+            self._db.commit()
+
+    # Pool workers get their own connection and threads
+    def __getstate__(self) -> dict:
+        return {'cache_path': self.cache_path, 'workers': self.workers, 'timeout': self.timeout,
+                'lang': self.lang, 'max_dpi': self.max_dpi, 'max_side': self.max_side,
+                'binarize': self.binarize}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._setup()
+
+    @classmethod
+    def from_config(cls, config) -> "OCRService":
+        return cls(cache_path=config.OCR_CACHE_DB, workers=config.OCR_WORKERS,
+                   timeout=config.OCR_TIMEOUT, lang=config.OCR_LANG, max_dpi=config.OCR_MAX_DPI,
+                   max_side=config.OCR_MAX_SIDE, binarize=config.OCR_BINARIZE)
+
+    def per_process(self, processes: int) -> int:
+        """Workers for each of ``processes`` pool processes (at least one, which blocks while tesseract runs)"""
+        return max(1, self.workers // max(1, processes))
+
+    def is_available(self) -> bool:
+        """Whether the tesseract binary can be run (checked once)"""
+        if self._available is None:
+            try:
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception as e:
+                logger.warning(f"⚠️ Tesseract not available, OCR disabled: {e}")
+                self._available = False
+        return self._available
+
+    def image_key(self, image_bytes: bytes) -> str:
+        settings = f"{self.lang}|{self.max_dpi}|{self.max_side}|{self.binarize}|{self.PREPROCESS_VERSION}"
+        return hashlib.sha256(settings.encode("utf-8") + b"\0" + image_bytes).hexdigest()
+
+    @staticmethod
+    def otsu_threshold(histogram: List[int]) -> int:
+        """Gray level that best separates a 256-bin histogram into dark and light pixels"""
+        total = sum(histogram)
+        weighted_total = sum(level * count for level, count in enumerate(histogram))
+        background = weighted_background = 0
+        best_level, best_variance = 127, -1.0
+        for level, count in enumerate(histogram):
+            background += count
+            if background == 0:
+                continue
+            foreground = total - background
+            if foreground == 0:
+                break
+            weighted_background += level * count
+            mean_background = weighted_background / background
+            mean_foreground = (weighted_total - weighted_background) / foreground
+            variance = background * foreground * (mean_background - mean_foreground) ** 2
+            if variance > best_variance:
+                best_level, best_variance = level, variance
+        return best_level
+
+    def preprocess(self, image: Image.Image) -> Image.Image:
+        """Downscale to the DPI and size caps, then grayscale and (optionally) binarize"""
+        scale = 1.0
+        dpi = image.info.get('dpi')
+        if dpi and dpi[0] and dpi[0] > self.max_dpi:
+            scale = self.max_dpi / float(dpi[0])
+        longest = max(image.size) * scale
+        if longest > self.max_side:
+            scale *= self.max_side / longest
+        if scale < 1.0:
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        image = image.convert("L")
+        if self.binarize:
+            threshold = self.otsu_threshold(image.histogram())
+            image = image.point(lambda level: 255 if level > threshold else 0)
+        return image
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is None and self._db is not None:
+                row = self._db.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+                if row:
+                    text = self._memory[key] = row[0]
+            return text
+
+    def _store(self, key: str, text: str) -> None:
+        with self._lock:
+            self._memory[key] = text
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO ocr (key, text) VALUES (?, ?)", (key, text))
+                self._db.commit()
+
+    def _ocr_one(self, image_bytes: bytes) -> Optional[str]:
+        """Text of one image, or None when tesseract failed or timed out"""
+        try:
+            image = self.preprocess(Image.open(io.BytesIO(image_bytes)))
+            text = pytesseract.image_to_string(image, lang=self.lang, timeout=self.timeout)
+            return text.strip() if text else ""
+        except Exception as e:
+            logger.error(f"OCR failed: {e}")
+            return None
+
+    def ocr_images(self, images: List[bytes]) -> List[str]:
+        """OCR encoded images (PNG, JPEG, ...), returning one text per image in order"""
+        keys = [self.image_key(image) for image in images]
+        found = {key: self._lookup(key) for key in set(keys)}
+        # Identical images in one batch are OCR'd once
+        missing = {key: image for key, image in zip(keys, images) if found[key] is None}
+        self.hits += sum(1 for key in keys if key not in missing)
+        self.misses += len(missing)
+
+        if missing and self.is_available():
+            if self._pool is None:
+                # One core per tesseract process; the pool provides the parallelism
+                os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+            for key, text in zip(missing, self._pool.map(self._ocr_one, missing.values())):
+                if text is None:
+                    # Not cached, so a later run can try again
+                    self.failures += 1
+                    continue
+                found[key] = text
+                self._store(key, text)
+
+        return [found[key] or "" for key in keys]
+
+    def get_stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'failures': self.failures,
+            'workers': self.workers,
+        }
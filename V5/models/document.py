@@ -33,6 +33,8 @@ class DocumentChunk:
     filename: str
     category: str
     filepath: str
+    locator: str = ""  # e.g. "page 3", "slide 2-4", "sheet Sales"; empty for unstructured text
+    member: str = ""  # path inside the archive at filepath; empty for plain files
     
     def to_metadata(self) -> dict:
         """Convert chunk to ChromaDB metadata format"""
@@ -41,5 +43,7 @@ class DocumentChunk:
             'category': self.category,
             'filepath': self.filepath,
             'file_hash': self.document_hash,
-            'chunk_index': self.chunk_index
+            'chunk_index': self.chunk_index,
+            'locator': self.locator,
+            'member': self.member
         }
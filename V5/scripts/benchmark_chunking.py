@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Benchmark the structure-aware chunker against the legacy fixed-width TextUtils.chunk_text
+
+Reports chunk count, estimated tokens to embed and retrieval hit rate. Queries
+are sentences sampled from the documents; a query hits when one of the top-k
+retrieved chunks contains the whole sentence. Retrieval uses BM25, plus
+vectors when the configured embedding backend can load.
+
+Usage: python scripts/benchmark_chunking.py [documents_dir] [queries_per_file]
+"""
+
+import logging
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import Config
+from core.bm25_index import BM25Index
+from core.embeddings import EmbeddingService
+from core.processor import FileProcessor
+from models.document import DocumentChunk
+from utils.chunker import StructuredChunker
+from utils.text_utils import TextUtils
+
+DOCUMENTS_DIR = Path(__file__).parent.parent.parent / "V1" / "data" / "incoming"
+QUERIES_PER_FILE = 20
+TOP_K = 5
+LEGACY_CHUNK_SIZE = 600  # what the watcher passed to create_chunks before the structured chunker
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def sample_queries(texts: dict, per_file: int, seed: int = 7) -> list:
+    """Whole sentences of 8-40 words from each document (a sentence never spans paragraphs or pages)"""
+    rng = random.Random(seed)
+    queries = []
+    for name, text in texts.items():
+        sentences = [normalize(s) for s in re.split(r"(?<=[.!?])\s+|\n[ \t]*\n|\f", text)]
+        sentences = sorted({s for s in sentences if 8 <= len(s.split()) <= 40})
+        queries.extend((name, s) for s in rng.sample(sentences, min(per_file, len(sentences))))
+    return queries
+
+
+def chunk_legacy(text: str) -> list:
+    return TextUtils.chunk_text(text, LEGACY_CHUNK_SIZE)
+
+
+def chunk_structured(text: str) -> list:
+    chunker = StructuredChunker(target_tokens=Config.CHUNK_TOKENS, overlap_tokens=Config.CHUNK_OVERLAP_TOKENS)
+    return [chunk.text for chunk in chunker.iter_chunks(text)]
+
+
+def build_chunks(texts: dict, chunk_fn) -> list:
+    chunks = []
+    for name, text in texts.items():
+        for i, chunk_text in enumerate(chunk_fn(text)):
+            chunks.append(DocumentChunk(chunk_id=f"{name}_{i}", document_hash=name, text=chunk_text,
+                                        chunk_index=i, filename=name, category="benchmark", filepath=name))
+    return chunks
+
+
+def hit_rate(queries: list, retrieve) -> float:
+    hits = 0
+    for _, sentence in queries:
+        if any(sentence in normalize(text) for text in retrieve(sentence)):
+            hits += 1
+    return hits / len(queries) if queries else 0.0
+
+
+def bm25_retriever(chunks: list, workdir: Path):
+    index = BM25Index(workdir / "bm25.db")
+    index.add_chunks(chunks)
+    return lambda query: [row['text'] for row in index.search(query, n_results=TOP_K)]
+
+
+def vector_retriever(chunks: list, service: EmbeddingService):
+    import numpy as np
+    matrix = np.asarray(service.embed([chunk.text for chunk in chunks]), dtype=np.float32)
+
+    def retrieve(query):
+        scores = matrix @ np.asarray(service.embed([query])[0], dtype=np.float32)
+        return [chunks[i].text for i in np.argsort(-scores)[:TOP_K]]
+    return retrieve
+
+
+def load_embedding_service(workdir: Path):
+    """The configured embedding backend with a throwaway cache, or None when it cannot load"""
+    try:
+        service = EmbeddingService.from_config(Config)
+        if service is None:
+            return None
+        service = EmbeddingService(service.backend, cache_path=workdir / "embeddings.db")
+        service.embed(["warm-up"])
+        return service
+    except Exception as e:
+        print(f"(vector retrieval skipped: {e})")
+        return None
+
+
+def run_benchmark(documents_dir: Path, per_file: int):
+    processor = FileProcessor()
+    texts = {}
+    for path in sorted(documents_dir.iterdir()):
+        if path.is_file():
+            text = processor.extract_text(path)
+            if text:
+                texts[path.name] = text
+    queries = sample_queries(texts, per_file)
+
+    print("=" * 78)
+    print(f"CHUNKING BENCHMARK: {len(texts)} files from {documents_dir}, {len(queries)} queries, top-{TOP_K}")
+    print("=" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embedding_service = load_embedding_service(Path(tmp))
+        print(f"{'Chunker':<12} {'Chunks':>7} {'Tokens':>8} {'Avg':>5} {'Chunk time':>11} "
+              f"{'BM25 hit':>9} {'Vector hit':>11}")
+        print("-" * 78)
+
+        for label, chunk_fn in [("legacy", chunk_legacy), ("structured", chunk_structured)]:
+            started = time.perf_counter()
+            chunks = build_chunks(texts, chunk_fn)
+            chunk_time = time.perf_counter() - started
+            tokens = sum(TextUtils.estimate_tokens(chunk.text) for chunk in chunks)
+
+            workdir = Path(tmp) / label
+            workdir.mkdir()
+            bm25_hits = hit_rate(queries, bm25_retriever(chunks, workdir))
+            vector_hits = (f"{hit_rate(queries, vector_retriever(chunks, embedding_service)):>10.1%}"
+                           if embedding_service else f"{'-':>10}")
+
+            print(f"{label:<12} {len(chunks):>7} {tokens:>8} {tokens // max(1, len(chunks)):>5} "
+                  f"{chunk_time * 1000:>9.1f}ms {bm25_hits:>8.1%} {vector_hits}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    documents_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DOCUMENTS_DIR
+    per_file = int(sys.argv[2]) if len(sys.argv) > 2 else QUERIES_PER_FILE
+    run_benchmark(documents_dir, per_file)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Benchmark single-pass keyword scoring and content rules against the legacy per-keyword/per-rule scans"""
+
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.classifier import DocumentClassifier
+from core.llm import LLMService
+from utils.keyword_matcher import TokenizedText
+
+BASE_DIR = Path(__file__).parent.parent
+
+SIZES_MB = [0.5, 1, 5]
+
+
+def legacy_classify_hierarchical(classifier: DocumentClassifier, text: str, filename: str = "") -> dict:
+    """Scoring as it was before the compiled matcher: one str.count per keyword"""
+    text_lower = text.lower()
+    filename_lower = filename.lower()
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+    for rule in classifier.GUARDRAIL_RULES:
+        if any(k in text_lower or k in filename_lower for k in rule["kw"]):
+            is_uav = rule["domain"] == "Technology" and rule["category"] == "UAV"
+            return {
+                "domain": rule["domain"],
+                "category": rule["category"],
+                "file_extension": ext or "files",
+                "confidence": 0.95 if is_uav else 0.9,
+                "domain_score": 100 if is_uav else 95,
+                "category_score": 100 if is_uav else 95,
+            }
+    if ext in {"md", "rst", "adoc"}:
+        return {"domain": "Documentation", "category": "Other", "file_extension": ext,
+                "confidence": 0.85, "domain_score": 90, "category_score": 90}
+
+    domain_scores = {}
+    for domain, keywords in classifier.DOMAIN_KEYWORDS.items():
+        score = 0
+        for keyword in keywords["strong"]:
+            score += text_lower.count(keyword) * 2
+        for keyword in keywords["weak"]:
+            score += text_lower.count(keyword) * 1
+        for keyword in keywords["strong"]:
+            if keyword in filename_lower:
+                score += 5
+        domain_scores[domain] = score
+
+    best_domain = max(domain_scores, key=domain_scores.get)
+    if domain_scores[best_domain] == 0:
+        best_domain = "Technology"
+    best_domain_score = domain_scores[best_domain]
+
+    category_scores = {}
+    for category, keywords in classifier.CATEGORY_KEYWORDS_BY_DOMAIN.get(best_domain, {}).items():
+        if category == "Other":
+            continue
+        score = sum(text_lower.count(kw) for kw in keywords)
+        score += sum(5 for kw in keywords if kw in filename_lower)
+        category_scores[category] = score
+
+    best_category = max(category_scores, key=category_scores.get) if category_scores else "Other"
+    if category_scores.get(best_category, 0) == 0:
+        best_category = "Other"
+    best_category_score = category_scores.get(best_category, 0)
+
+    total_category_score = sum(category_scores.values())
+    category_confidence = best_category_score / total_category_score if total_category_score > 0 else 0
+    total_domain_score = sum(domain_scores.values())
+    domain_confidence = best_domain_score / total_domain_score if total_domain_score > 0 else 0
+
+    return {
+        "domain": best_domain,
+        "category": best_category,
+        "file_extension": ext or "files",
+        "confidence": round(min(1.0, (domain_confidence * 0.6) + (category_confidence * 0.4)), 2),
+        "domain_score": best_domain_score,
+        "category_score": best_category_score,
+    }
+
+
+def load_corpus_lines(patterns=("**/*.md", "**/*.py")) -> list:
+    """Lines of real prose and code from the project's own docs and sources"""
+    lines = []
+    for pattern in patterns:
+        for path in BASE_DIR.glob(pattern):
+            if not path.is_file():
+                continue
+            text = path.read_text(encoding="utf-8", errors="ignore")
+            lines.extend(line for line in text.split("\n") if line.strip())
+    return lines
+
+
+def make_document(size_mb: float, lines: list, seed: int) -> str:
+    """Build a synthetic document of roughly ``size_mb`` megabytes from sampled lines"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts, length = [], 0
+    while length < target:
+        line = rng.choice(lines)
+        parts.append(line)
+        length += len(line) + 1
+    return "\n".join(parts)
+
+
+def legacy_count_scan(classifier: DocumentClassifier, text_lower: str) -> dict:
+    """The legacy scoring stage in isolation: one str.count per keyword"""
+    return {kw: text_lower.count(kw) for kw in classifier._keyword_matcher.keywords}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark():
+    classifier = DocumentClassifier()
+    matcher = classifier._keyword_matcher
+    guardrail_keywords = [kw for rule in classifier.GUARDRAIL_RULES for kw in rule["kw"]]
+
+    corpus = load_corpus_lines()
+    # Documents that reach keyword scoring must not trip any guardrail rule
+    no_guardrail_corpus = [line for line in corpus
+                           if not any(kw in line.lower() for kw in guardrail_keywords)]
+
+    print("\n=== Classifier Keyword Scoring Benchmark ===\n")
+    print(f"Keywords compiled: {len(matcher.keywords)}")
+    print(f"Corpus lines: {len(corpus)} ({len(no_guardrail_corpus)} without guardrail keywords)\n")
+    print(f"{'Document':<20} {'Size':>7} {'Scan legacy':>12} {'Scan single':>12} {'Speedup':>8} "
+          f"{'Classify legacy':>16} {'Classify new':>13}  Match")
+    print("-" * 104)
+
+    for size_mb in SIZES_MB:
+        for label, lines in [("mixed prose", corpus), ("no guardrail hits", no_guardrail_corpus)]:
+            text = make_document(size_mb, lines, seed=int(size_mb * 10))
+            text_lower = text.lower()
+            filename = "Unit-4 notes.txt"
+
+            legacy_counts, legacy_scan = timed(legacy_count_scan, classifier, text_lower)
+            counts, single_scan = timed(matcher.count_all, text_lower)
+            legacy, legacy_time = timed(legacy_classify_hierarchical, classifier, text, filename)
+            compiled, compiled_time = timed(classifier.classify_hierarchical, text, filename)
+
+            # Raw per-keyword counts must agree as well, not just the final labels
+            counts_match = all(counts.get(kw, 0) == n for kw, n in legacy_counts.items())
+            match = "✓" if legacy == compiled and counts_match else "✗"
+
+            print(f"{label:<20} {size_mb:>5}MB {legacy_scan:>11.3f}s {single_scan:>11.3f}s "
+                  f"{legacy_scan / single_scan:>7.1f}x {legacy_time:>15.3f}s {compiled_time:>12.3f}s  {match}")
+
+            if match != "✓":
+                print(f"   legacy:   {legacy}")
+                print(f"   compiled: {compiled}")
+
+
+def legacy_rule_scan(engine, text_lower: str) -> set:
+    """The legacy content stage in isolation: one re.search over the text per rule"""
+    return {name for name, pattern in engine._debug_patterns.items() if pattern.search(text_lower)}
+
+
+def compiled_rule_scan(engine, text_lower: str) -> set:
+    """Tokenize once, then evaluate the whole rule table"""
+    return engine.evaluate(TokenizedText(text_lower))
+
+
+def run_content_rule_benchmark():
+    llm_service = LLMService()
+    engine = llm_service._content_rule_engine
+    corpora = [("mixed prose", load_corpus_lines()), ("docs only", load_corpus_lines(("**/*.md",)))]
+
+    print("\n=== LLMService Content Rule Benchmark ===\n")
+    print(f"Content rules compiled: {len(engine.rules)}\n")
+    print(f"{'Document':<12} {'Size':>7} {'Rules legacy':>13} {'Rules engine':>13} {'Speedup':>8} "
+          f"{'Analysis':>10}  Match")
+    print("-" * 77)
+
+    for size_mb, (label, lines) in [(size, corpus) for size in SIZES_MB for corpus in corpora]:
+        text = make_document(size_mb, lines, seed=int(size_mb * 10))
+        text_lower = text.lower()
+
+        legacy, legacy_time = timed(legacy_rule_scan, engine, text_lower)
+        fired, engine_time = timed(compiled_rule_scan, engine, text_lower)
+        _, analysis_time = timed(llm_service._classify_by_analysis, text)
+
+        match = "✓" if legacy == fired else "✗"
+        print(f"{label:<12} {size_mb:>5}MB {legacy_time:>12.3f}s {engine_time:>12.3f}s "
+              f"{legacy_time / engine_time:>7.1f}x {analysis_time:>9.3f}s  {match}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    run_benchmark()
+    run_content_rule_benchmark()
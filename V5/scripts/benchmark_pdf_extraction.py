@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Benchmark PDF text extraction: pdfminer (whole file) vs PyMuPDF page by page, sequential and page-parallel
+
+Usage: python scripts/benchmark_pdf_extraction.py [pdf_dir] [workers]
+"""
+
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import fitz
+from pdfminer.high_level import extract_text as extract_pdf_text
+
+from extractors.pdf_extractor import PDFExtractor
+
+PDF_DIR = Path(__file__).parent.parent.parent / "V1" / "data" / "incoming"
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def page_timings(path: Path) -> list:
+    """Seconds PyMuPDF spends on each page"""
+    timings = []
+    with fitz.open(str(path)) as doc:
+        for page in doc:
+            _, seconds = timed(page.get_text, "text")
+            timings.append(seconds)
+    return timings
+
+
+def extract_parallel(path: Path, workers: int) -> list:
+    """PDFExtractor.extract_pages with the page threshold lifted, so every file uses the pool"""
+    threshold = PDFExtractor.PARALLEL_MIN_PAGES
+    PDFExtractor.PARALLEL_MIN_PAGES = 0
+    try:
+        return PDFExtractor.extract_pages(path, workers=workers)
+    finally:
+        PDFExtractor.PARALLEL_MIN_PAGES = threshold
+
+
+def run_benchmark(pdf_dir: Path, workers: int):
+    pdfs = sorted(pdf_dir.glob("*.pdf"))
+
+    print("=" * 104)
+    print(f"PDF EXTRACTION BENCHMARK: {len(pdfs)} PDFs from {pdf_dir}, {workers} workers for the parallel run")
+    print("=" * 104)
+    print(f"{'File':<40} {'Pages':>5} {'pdfminer':>9} {'PyMuPDF':>8} {'Parallel':>9} {'Speedup':>8} "
+          f"{'ms/page':>8} {'p95 page':>9} {'Chars':>7}")
+    print("-" * 104)
+
+    totals = [0, 0.0, 0.0, 0.0]
+    for path in pdfs:
+        legacy_text, legacy_time = timed(extract_pdf_text, str(path))
+        text, pymupdf_time = timed(PDFExtractor().extract, path)
+        _, parallel_time = timed(extract_parallel, path, workers)
+        pages = page_timings(path)
+        p95 = statistics.quantiles(pages, n=20)[-1] if len(pages) > 1 else pages[0]
+
+        print(f"{path.name[:40]:<40} {len(pages):>5} {legacy_time:>8.3f}s {pymupdf_time:>7.3f}s "
+              f"{parallel_time:>8.3f}s {legacy_time / pymupdf_time:>7.1f}x "
+              f"{pymupdf_time / len(pages) * 1000:>8.2f} {p95 * 1000:>7.2f}ms {len(text):>7}")
+
+        totals[0] += len(pages)
+        totals[1] += legacy_time
+        totals[2] += pymupdf_time
+        totals[3] += parallel_time
+
+    pages, legacy_time, pymupdf_time, parallel_time = totals
+    print("-" * 104)
+    print(f"{'Total':<40} {pages:>5} {legacy_time:>8.3f}s {pymupdf_time:>7.3f}s {parallel_time:>8.3f}s "
+          f"{legacy_time / pymupdf_time:>7.1f}x {pymupdf_time / pages * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    pdf_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else PDF_DIR
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else PDFExtractor.MAX_WORKERS
+    run_benchmark(pdf_dir, workers)
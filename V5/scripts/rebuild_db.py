@@ -8,7 +8,11 @@ from pathlib import Path
 # Add root to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from config import Config
 from core import DatabaseManager, FileProcessor
+from core.embeddings import EmbeddingService
+from extractors import OCRService
+from core.manifest import IngestionManifest, prune_missing, reindex_if_changed
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -20,19 +24,24 @@ SORTED_DIR = DATA_DIR / "sorted"
 DB_DIR = DATA_DIR / "database"
 
 # Initialize services
-db_manager = DatabaseManager(DB_DIR)
-file_processor = FileProcessor()
+db_manager = DatabaseManager(DB_DIR, retrieval_mode=Config.RETRIEVAL_MODE,
+                             embedding_service=EmbeddingService.from_config(Config))
+file_processor = FileProcessor(chunk_tokens=Config.CHUNK_TOKENS, overlap_tokens=Config.CHUNK_OVERLAP_TOKENS,
+                               ocr=OCRService.from_config(Config), ocr_dpi=Config.OCR_DPI,
+                               ocr_max_pages=Config.OCR_MAX_PAGES)
+manifest = IngestionManifest(Config.MANIFEST_DB)
 
 def rebuild_database():
-    """Rebuild database from existing sorted files"""
+    """Rebuild database from existing sorted files, skipping files the manifest marks unchanged"""
     logger.info("=" * 60)
     logger.info("REBUILDING DATABASE FROM SORTED FILES")
     logger.info("=" * 60)
     
     total_files = 0
     total_chunks = 0
+    skipped = 0
     
-    # Walk through all sorted directories
+    # Walk through all sorted directories (Domain/Category/FileExtension/...)
     for category_dir in sorted(SORTED_DIR.iterdir()):
         if not category_dir.is_dir():
             continue
@@ -40,33 +49,27 @@ def rebuild_database():
         category = category_dir.name
         logger.info(f"\nProcessing category: {category}")
         
-        for filepath in category_dir.iterdir():
+        for filepath in sorted(category_dir.rglob('*')):
             if filepath.is_file() and not filepath.name.startswith('.'):
                 try:
-                    logger.info(f"  Processing: {filepath.name}")
-                    
-                    # Extract text
-                    text = file_processor.extract_text(filepath)
-                    
-                    # Create document
-                    document = file_processor.create_document(filepath, text, category)
-                    
-                    # Create chunks with new improved settings
-                    chunks = file_processor.create_chunks(document, chunk_size=600)
-                    
-                    # Add to database
-                    if chunks:
-                        db_manager.add_chunks(chunks)
-                        logger.info(f"    ✓ Added {len(chunks)} chunks")
-                        total_files += 1
-                        total_chunks += len(chunks)
+                    written = reindex_if_changed(manifest, db_manager, file_processor, filepath, category)
+                    if written is None:
+                        skipped += 1
+                        continue
+                    logger.info(f"  ✓ {filepath.name}: added {written} chunks")
+                    total_files += 1
+                    total_chunks += written
                     
                 except Exception as e:
                     logger.error(f"  ✗ Error processing {filepath.name}: {e}")
     
+    removed = prune_missing(manifest, db_manager)
+    
     logger.info("\n" + "=" * 60)
     logger.info(f"REBUILD COMPLETE")
-    logger.info(f"Total files: {total_files}")
+    logger.info(f"Files indexed: {total_files}")
+    logger.info(f"Unchanged files skipped: {skipped}")
+    logger.info(f"Missing files removed: {removed}")
     logger.info(f"Total chunks: {total_chunks}")
     logger.info(f"Documents in database: {db_manager.get_count()}")
     logger.info("=" * 60)
@@ -10,7 +10,11 @@ from pathlib import Path
 # Add root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from config import Config
 from core import DatabaseManager, FileProcessor
+from core.embeddings import EmbeddingService
+from extractors import OCRService
+from core.manifest import IngestionManifest, prune_missing, reindex_if_changed
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,8 +28,12 @@ def rebuild_database_fast():
     DB_DIR = DATA_DIR / "database"
     
     # Initialize database
-    db_manager = DatabaseManager(DB_DIR)
-    processor = FileProcessor()
+    db_manager = DatabaseManager(DB_DIR, retrieval_mode=Config.RETRIEVAL_MODE,
+                                 embedding_service=EmbeddingService.from_config(Config))
+    processor = FileProcessor(chunk_tokens=Config.CHUNK_TOKENS, overlap_tokens=Config.CHUNK_OVERLAP_TOKENS,
+                              ocr=OCRService.from_config(Config), ocr_dpi=Config.OCR_DPI,
+                              ocr_max_pages=Config.OCR_MAX_PAGES)
+    manifest = IngestionManifest(Config.MANIFEST_DB)
     
     print("=" * 60)
     print("FAST DATABASE REBUILD")
@@ -33,14 +41,15 @@ def rebuild_database_fast():
     
     total_chunks = 0
     total_files = 0
+    skipped = 0
     
-    # Process each category
+    # Process each category; only new or changed files are extracted
     for category_dir in sorted(SORTED_DIR.iterdir()):
         if not category_dir.is_dir():
             continue
         
         category = category_dir.name
-        files = list(category_dir.glob('*'))
+        files = [f for f in category_dir.rglob('*') if f.is_file()]
         
         if not files:
             continue
@@ -48,19 +57,19 @@ def rebuild_database_fast():
         print(f"\n📁 {category} ({len(files)} files)")
         
         for file_path in files:
-            if file_path.is_file():
-                try:
-                    # Process file
-                    chunks = processor.process_file(str(file_path), category)
-                    
-                    if chunks:
-                        db_manager.add_chunks(chunks)
-                        total_chunks += len(chunks)
-                        total_files += 1
-                        print(f"   ✓ {file_path.name} ({len(chunks)} chunks)")
-                    
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
+            try:
+                written = reindex_if_changed(manifest, db_manager, processor, file_path, category)
+                if written is None:
+                    skipped += 1
+                    continue
+                total_chunks += written
+                total_files += 1
+                print(f"   ✓ {file_path.name} ({written} chunks)")
+                
+            except Exception as e:
+                logger.error(f"Error processing {file_path}: {e}")
+    
+    removed = prune_missing(manifest, db_manager)
     
     # Final count
     final_count = db_manager.get_count()
@@ -68,6 +77,8 @@ def rebuild_database_fast():
     print("\n" + "=" * 60)
     print(f"✅ REBUILD COMPLETE")
     print(f"   Files processed: {total_files}")
+    print(f"   Unchanged (skipped): {skipped}")
+    print(f"   Removed: {removed}")
     print(f"   Total chunks: {total_chunks}")
     print(f"   Database count: {final_count}")
     print("=" * 60)
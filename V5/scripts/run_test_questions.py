@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Run TEST_QUESTIONS.txt against a running server through /chat/batch
+
+Usage: python scripts/run_test_questions.py [questions_file] [base_url]
+"""
+
+import json
+import re
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import Config
+
+QUESTIONS_FILE = Path(__file__).parent.parent.parent / "V4" / "TEST_QUESTIONS.txt"
+BASE_URL = "http://localhost:5000"
+
+
+def load_questions(path: Path) -> list:
+    """Questions are lines like '**Q1**: What is ...?'"""
+    text = path.read_text(encoding='utf-8', errors='ignore')
+    return re.findall(r"^\*\*Q\d+\*\*:\s*(.+?)\s*$", text, flags=re.MULTILINE)
+
+
+def post_batch(base_url: str, queries: list) -> dict:
+    request = urllib.request.Request(
+        f"{base_url}/chat/batch",
+        data=json.dumps({'queries': queries}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=3600) as response:
+        return json.loads(response.read())
+
+
+def main():
+    questions_file = Path(sys.argv[1]) if len(sys.argv) > 1 else QUESTIONS_FILE
+    base_url = sys.argv[2] if len(sys.argv) > 2 else BASE_URL
+    questions = load_questions(questions_file)
+
+    print("=" * 60)
+    print(f"BATCH QUESTION RUN: {len(questions)} questions from {questions_file.name}")
+    print("=" * 60)
+
+    started = time.time()
+    for start in range(0, len(questions), Config.BATCH_MAX_QUERIES):
+        batch = questions[start:start + Config.BATCH_MAX_QUERIES]
+        data = post_batch(base_url, batch)
+        for i, result in enumerate(data['results'], start + 1):
+            timings = result['timings']
+            retrieval_ms = timings['retrieval_ms'].get('total_ms', 0)
+            print(f"\nQ{i}: {result['query']}")
+            print(f"   confidence {result['confidence_score']}%, retrieval {retrieval_ms:.0f}ms, "
+                  f"generation {timings['generation_ms']:.0f}ms")
+            print(f"   sources: {', '.join(result['cited_files']) or '-'}")
+            print(f"   {result['answer'][:200]}")
+        print(f"\n⏱️ Batch of {len(batch)}: {data['timings']['total_ms'] / 1000:.1f}s")
+
+    print("\n" + "=" * 60)
+    print(f"✅ {len(questions)} questions in {time.time() - started:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
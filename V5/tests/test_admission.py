@@ -0,0 +1,138 @@
+"""Test cases for LLM admission control and async generation"""
+import asyncio
+import unittest
+from unittest import mock
+from core import llm
+from core.admission import AdmissionController, Overloaded
+from core.llm import LLMService
+
+CHUNKS = [{"chunk_id": "abc_0", "filename": "unit1.pdf", "text": "Cyber security protects systems.",
+           "similarity": 0.8, "distance": 0.4}]
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Concurrency limit, bounded queue and fast rejections"""
+
+    def test_queue_full_is_rejected_with_429(self):
+        """Requests beyond the concurrency limit plus queue should be turned away at once"""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=7)
+            release = asyncio.Event()
+
+            async def hold():
+                async with controller.slot():
+                    await release.wait()
+
+            holder = asyncio.create_task(hold())
+            waiter = asyncio.create_task(hold())
+            await asyncio.sleep(0.01)
+            self.assertEqual((controller.in_flight, controller.waiting), (1, 1))
+            with self.assertRaises(Overloaded) as ctx:
+                async with controller.slot():
+                    pass
+            release.set()
+            await asyncio.gather(holder, waiter)
+            return ctx.exception, controller.get_stats()
+
+        error, stats = asyncio.run(scenario())
+        self.assertEqual((error.status, error.retry_after), (429, 7))
+        self.assertEqual((stats["admitted"], stats["rejected"], stats["in_flight"]), (2, 1, 0))
+
+    def test_queue_timeout_is_503(self):
+        """Waiting too long for a slot should give 503"""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+            async with controller.slot():
+                with self.assertRaises(Overloaded) as ctx:
+                    async with controller.slot():
+                        pass
+            return ctx.exception, controller.get_stats()
+
+        error, stats = asyncio.run(scenario())
+        self.assertEqual(error.status, 503)
+        self.assertEqual((stats["timed_out"], stats["queue_depth"]), (1, 0))
+
+
+class FakeAsyncClient:
+    """Stands in for ollama.AsyncClient"""
+
+    def __init__(self, delay=0.0, tokens=("It ", "protects ", "systems.")):
+        self.delay = delay
+        self.tokens = tokens
+        self.closed = False
+
+    async def generate(self, stream=False, **kwargs):
+        await asyncio.sleep(self.delay)
+        if not stream:
+            return {"response": "".join(self.tokens)}
+
+        async def chunks():
+            try:
+                for token in self.tokens:
+                    await asyncio.sleep(self.delay)
+                    yield {"response": token}
+            finally:
+                self.closed = True
+        return chunks()
+
+
+class TestAsyncGeneration(unittest.TestCase):
+    """Async generation should respect timeouts and admission"""
+
+    def test_async_answer(self):
+        service = LLMService()
+        service._async_client = FakeAsyncClient()
+        answer, cited, _, _ = asyncio.run(service.generate_response_async("What is cyber security?", CHUNKS))
+        self.assertTrue(answer.startswith("It protects systems."))
+        self.assertEqual(cited, ["unit1.pdf"])
+
+    def test_timeout_raises(self):
+        """A slow generation should raise instead of holding the request forever"""
+        service = LLMService()
+        service._async_client = FakeAsyncClient(delay=0.5)
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(service.generate_response_async("What is cyber security?", CHUNKS, timeout=0.05))
+
+    def test_stream_holds_slot_until_done(self):
+        """Streaming should hold an admission slot and release it afterwards"""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            service = LLMService()
+            service._async_client = FakeAsyncClient()
+            seen = []
+            async for event in service.generate_response_stream_async("q", CHUNKS, admission=controller):
+                seen.append((event["type"], controller.in_flight))
+            return seen, controller.get_stats()
+
+        seen, stats = asyncio.run(scenario())
+        self.assertEqual([kind for kind, _ in seen], ["token", "token", "token", "done"])
+        self.assertTrue(all(in_flight == 1 for kind, in_flight in seen if kind == "token"))
+        self.assertEqual(stats["in_flight"], 0)
+
+
+    def test_abandoned_stream_releases_slot(self):
+        """Closing or cancelling a stream mid-generation (client gone) frees the slot and Ollama's stream"""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1)
+            service = LLMService()
+            service._async_client = client = FakeAsyncClient(delay=0.05)
+            events = service.generate_response_stream_async("q", CHUNKS, admission=controller)
+            self.assertEqual((await events.__anext__())["type"], "token")
+            await events.aclose()
+            closed = (controller.in_flight, client.closed)
+
+            service._async_client = client = FakeAsyncClient(delay=10)
+            consumer = asyncio.ensure_future(
+                service.generate_response_stream_async("r", CHUNKS, admission=controller).__anext__())
+            await asyncio.sleep(0.05)
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+            return closed, (controller.in_flight, client.closed)
+
+        closed, cancelled = asyncio.run(scenario())
+        self.assertEqual(closed, (0, True))
+        self.assertEqual(cancelled[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
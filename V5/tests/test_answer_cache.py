@@ -0,0 +1,88 @@
+"""Test cases for the answer cache"""
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from core import llm
+from core.answer_cache import AnswerCache
+from core.llm import LLMService
+
+ANSWER = ("Cyber security protects systems.", ["unit1.pdf"], 72, [{"id": 1, "filename": "unit1.pdf"}])
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Test LRU/TTL eviction, key normalization and the SQLite tier"""
+
+    def test_key_normalization(self):
+        """Case, whitespace, trailing punctuation and chunk order should not matter"""
+        key = AnswerCache.make_key("What is  Cyber Security?", "llama3.2", ["b", "a"])
+        self.assertEqual(key, AnswerCache.make_key("what is cyber security", "llama3.2", ["a", "b"]))
+        self.assertNotEqual(key, AnswerCache.make_key("what is cyber security", "llama3.2", ["a", "c"]))
+        self.assertNotEqual(key, AnswerCache.make_key("what is cyber security", "mistral", ["a", "b"]))
+
+    def test_hit_and_miss_counters(self):
+        """Lookups should be counted as hits or misses"""
+        cache = AnswerCache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", ANSWER)
+        self.assertEqual(cache.get("k"), ANSWER)
+        stats = cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_lru_eviction(self):
+        """Least recently used entries should be evicted first"""
+        cache = AnswerCache(max_entries=2)
+        cache.put("a", ANSWER)
+        cache.put("b", ANSWER)
+        cache.get("a")
+        cache.put("c", ANSWER)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_ttl_expiry(self):
+        """Entries older than the TTL should not be returned"""
+        cache = AnswerCache(ttl_seconds=60)
+        cache.put("k", ANSWER)
+        with mock.patch("core.answer_cache.time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("k"))
+
+    def test_sqlite_tier_survives_restart(self):
+        """Answers written to disk should be served by a fresh cache instance"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "answers.db"
+            AnswerCache(db_path=db_path).put("k", ANSWER)
+
+            restarted = AnswerCache(db_path=db_path)
+            self.assertEqual(restarted.get("k"), ANSWER)
+            self.assertEqual(restarted.get_stats()["disk_hits"], 1)
+
+
+class TestLLMServiceCaching(unittest.TestCase):
+    """generate_response should consult the cache before calling Ollama"""
+
+    CHUNKS = [{"chunk_id": "abc_0", "filename": "unit1.pdf", "text": "Cyber security protects systems.",
+               "similarity": 0.8, "distance": 0.4}]
+
+    def test_repeated_question_skips_ollama(self):
+        """Second identical question should be answered from the cache"""
+        service = LLMService(answer_cache=AnswerCache())
+        with mock.patch.object(llm.ollama, "generate", return_value={"response": "It protects systems."}) as gen:
+            first = service.generate_response("What is cyber security?", self.CHUNKS)
+            second = service.generate_response("what is cyber security", self.CHUNKS)
+        self.assertEqual(first, second)
+        self.assertEqual(gen.call_count, 1)
+
+    def test_errors_are_not_cached(self):
+        """Ollama failures should be retried on the next request"""
+        service = LLMService(answer_cache=AnswerCache())
+        with mock.patch.object(llm.ollama, "generate", side_effect=ConnectionError("connection refused")) as gen:
+            service.generate_response("What is cyber security?", self.CHUNKS)
+            service.generate_response("What is cyber security?", self.CHUNKS)
+        self.assertEqual(gen.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Test cases for archive member extraction"""
+import io
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from datetime import datetime
+from pathlib import Path
+import fitz
+from core.processor import FileProcessor
+from extractors import archive_extractor
+from extractors.archive_extractor import ArchiveExtractor
+from models.document import Document
+
+
+def make_document(path: Path, text: str) -> Document:
+    return Document(filename=path.name, filepath=path, file_hash="h", category="Archive", text_content=text,
+                    file_type="archive", size_bytes=path.stat().st_size, created_at=datetime.now())
+
+
+def make_pdf(pages: list) -> bytes:
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class TestArchiveExtractor(unittest.TestCase):
+    """Members go through extract_text, chunks record the member, limits stop bombs"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.processor = FileProcessor(chunk_tokens=120)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_zip_members_are_extracted_and_chunked_per_member(self):
+        path = self.dir / "course.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("unit1/notes.txt", "Routing tables map prefixes to next hops.")
+            archive.writestr("unit2/slides.pdf", make_pdf(["Subnetting basics here", "CIDR aggregation here"]))
+            archive.writestr("unit2/", "")
+
+        text = self.processor.extract_text(path)
+        self.assertTrue(text.startswith("Archive: course.zip (2 member(s) extracted)"))
+        chunks = self.processor.create_chunks(make_document(path, text))
+        members = {chunk.member for chunk in chunks}
+        self.assertEqual(members, {"", "unit1/notes.txt", "unit2/slides.pdf"})
+        pdf_chunk = next(chunk for chunk in chunks if chunk.member == "unit2/slides.pdf")
+        self.assertEqual(pdf_chunk.locator, "page 1-2")
+        self.assertEqual(pdf_chunk.filepath, str(path))
+        self.assertEqual(pdf_chunk.to_metadata()['member'], "unit2/slides.pdf")
+
+    def test_tar_gz_is_streamed(self):
+        path = self.dir / "code.tar.gz"
+        with tarfile.open(path, "w:gz") as archive:
+            for name in ["a.py", "b.md"]:
+                data = f"content of {name}".encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+        text = ArchiveExtractor().extract(path, self.processor)
+        self.assertIn("=== Member: a.py ===", text)
+        self.assertIn("content of b.md", text)
+
+    def test_limits_skip_bombs_and_nested_archives(self):
+        path = self.dir / "bomb.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("zeros.txt", b"0" * 1_000_000)
+            archive.writestr("inner.zip", b"PK")
+            archive.writestr("ok.txt", "fine")
+
+        text = ArchiveExtractor(max_ratio=50).extract(path, self.processor)
+        self.assertIn("zeros.txt (compression ratio", text)
+        self.assertIn("inner.zip (nested archive)", text)
+        self.assertIn("=== Member: ok.txt ===\nfine", text)
+
+        text = ArchiveExtractor(max_member_bytes=1000).extract(path, self.processor)
+        self.assertIn("zeros.txt (too large)", text)
+
+        text = ArchiveExtractor(max_members=1).extract(path, self.processor)
+        self.assertIn("limit of 1 reached", text)
+        self.assertNotIn("ok.txt ===", text)
+
+    def test_member_pool_share_and_threshold(self):
+        """Ingestion workers split the member pool; archives below the threshold stay in-process"""
+        self.assertEqual([ArchiveExtractor(workers=7).per_process(n) for n in (1, 2, 7)], [7, 3, 2])
+        self.assertEqual(ArchiveExtractor(workers=1).per_process(4), 1)
+
+        path = self.dir / "small.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            for i in range(5):
+                archive.writestr(f"unit{i}.txt", f"Unit {i} notes")
+        extractor = ArchiveExtractor(workers=2, parallel_min_members=ArchiveExtractor.WORKER_MIN_MEMBERS)
+        with mock.patch.object(archive_extractor, "ProcessPoolExecutor", side_effect=AssertionError("pool")):
+            text = extractor.extract(path, self.processor)
+        self.assertTrue(text.startswith("Archive: small.zip (5 member(s) extracted)"))
+
+    def test_unsupported_archive_keeps_a_note(self):
+        path = self.dir / "data.7z"
+        path.write_bytes(b"7z\xbc\xaf\x27\x1c")
+        text = self.processor.extract_text(path)
+        self.assertIn("only ZIP, TAR and GZIP", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
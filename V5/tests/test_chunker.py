@@ -0,0 +1,59 @@
+"""Test cases for the structure-aware chunker"""
+import unittest
+from core.context_packer import ContextPacker
+from utils.chunker import StructuredChunker
+from utils.text_utils import TextUtils
+
+PARAGRAPH = " ".join(f"Sentence {i} explains part {i} of the firewall policy." for i in range(60))
+
+
+class TestStructuredChunker(unittest.TestCase):
+    """Token targets, section locators and overlap"""
+
+    def test_chunks_respect_token_target_and_sentences(self):
+        chunker = StructuredChunker(target_tokens=100, overlap_tokens=20)
+        chunks = chunker.chunk(PARAGRAPH)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(TextUtils.estimate_tokens(chunk.text), 100)
+            self.assertTrue(chunk.text.startswith("Sentence "))
+            self.assertTrue(chunk.text.endswith("policy."))
+            self.assertEqual(chunk.locator, "")
+
+    def test_overlap_is_removed_by_context_packer(self):
+        """Consecutive chunks share trailing sentences that ContextPacker can stitch back"""
+        chunks = StructuredChunker(target_tokens=100, overlap_tokens=20).chunk(PARAGRAPH)
+        first_sentence = chunks[1].text.split(". ", 1)[0] + "."
+        self.assertTrue(chunks[0].text.endswith(first_sentence))
+        joined = chunks[0].text
+        for chunk in chunks[1:]:
+            joined = ContextPacker.join_overlapping(joined, chunk.text)
+        self.assertEqual(joined, PARAGRAPH)
+
+    def test_slides_are_packed_and_located(self):
+        text = "\n".join(f"\n=== Slide {n} ===\nSlide {n} covers topic {n}.\n" for n in range(1, 4))
+        chunks = StructuredChunker(target_tokens=200).chunk(text)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].locator, "slide 1-3")
+        self.assertIn("=== Slide 1 ===", chunks[0].text)
+
+    def test_large_sections_break_at_markers(self):
+        text = (f"=== Sheet: Sales ===\n{PARAGRAPH[:600]}\n\n"
+                f"=== Sheet: Costs ===\n{PARAGRAPH[:600]}")
+        chunks = StructuredChunker(target_tokens=200).chunk(text)
+        self.assertEqual([c.locator for c in chunks], ["sheet Sales", "sheet Costs"])
+        self.assertTrue(chunks[1].text.startswith("=== Sheet: Costs ==="))
+
+    def test_pdf_form_feeds_are_pages(self):
+        page = "Paragraph about hashing. " * 20
+        chunks = StructuredChunker(target_tokens=150).chunk("\f".join([page, page, page]))
+        self.assertEqual([c.locator for c in chunks], ["page 1", "page 2", "page 3"])
+
+    def test_fewer_chunks_than_fixed_width(self):
+        text = "\n\n".join([PARAGRAPH] * 5)
+        structured = StructuredChunker(target_tokens=200, overlap_tokens=30).chunk(text)
+        self.assertLess(len(structured), len(TextUtils.chunk_text(text, 600)))
+
+
+if __name__ == "__main__":
+    unittest.main()
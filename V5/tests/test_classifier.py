@@ -0,0 +1,77 @@
+"""Test cases for hierarchical classification and keyword matching"""
+import random
+import unittest
+from core.classifier import DocumentClassifier
+from utils.keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Single-pass counts must equal str.count for every keyword"""
+
+    def assert_counts_match(self, keywords, text):
+        counts = KeywordMatcher(keywords).count_all(text)
+        for kw in set(keywords):
+            self.assertEqual(counts.get(kw, 0), text.count(kw), f"count mismatch for {kw!r}")
+
+    def test_nested_and_prefix_keywords(self):
+        """Shorter keywords inside longer matches are still counted"""
+        self.assert_counts_match(["api", "rest", "rest api", "api design", "pi"],
+                                 "rest api design uses a rest api and an api")
+
+    def test_self_overlapping_keywords(self):
+        """Overlapping repeats follow str.count's non-overlapping rule"""
+        self.assert_counts_match(["sales", "aa", "aba"], "salesales aaaa ababa sales")
+
+    def test_special_characters(self):
+        """Regex metacharacters in keywords are matched literally"""
+        self.assert_counts_match(["c++", "ci/cd", "## ", "<!doctype", "(x)"],
+                                 "## c++ and ci/cd <!doctype html> (x) c++")
+
+    def test_random_alphabet(self):
+        """Randomized keywords over a tiny alphabet agree with str.count"""
+        rng = random.Random(7)
+        for _ in range(300):
+            keywords = [''.join(rng.choice("ab ") for _ in range(rng.randint(1, 4)))
+                        for _ in range(rng.randint(1, 6))]
+            text = ''.join(rng.choice("ab ") for _ in range(rng.randint(0, 50)))
+            self.assert_counts_match(keywords, text)
+
+    def test_contains_any(self):
+        """Should detect presence of any keyword"""
+        matcher = KeywordMatcher(["docker", "kubernetes"])
+        self.assertTrue(matcher.contains_any("deployed with kubernetes"))
+        self.assertFalse(matcher.contains_any("plain text"))
+        self.assertFalse(matcher.contains_any(""))
+
+
+class TestDocumentClassifier(unittest.TestCase):
+    """Test hierarchical classification"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = DocumentClassifier()
+
+    def test_guardrail_forces_category(self):
+        """Guardrail keywords should force their domain/category"""
+        result = self.classifier.classify_hierarchical("Flight plan for the quadcopter", "mission.pdf")
+        self.assertEqual(result["domain"], "Technology")
+        self.assertEqual(result["category"], "UAV")
+        self.assertEqual(result["file_extension"], "pdf")
+
+    def test_keyword_scoring_without_guardrail(self):
+        """Scores come from domain/category keyword counts when no guardrail fires"""
+        text = "The teacher and student study the lesson plan for the class"
+        result = self.classifier.classify_hierarchical(text, "notes.txt")
+        self.assertEqual(result["domain"], "Education")
+        self.assertGreater(result["domain_score"], 0)
+
+    def test_no_keywords_defaults(self):
+        """Should default to Technology/Other when nothing matches"""
+        result = self.classifier.classify_hierarchical("zzz qqq", "")
+        self.assertEqual(result["domain"], "Technology")
+        self.assertEqual(result["category"], "Other")
+        self.assertEqual(result["file_extension"], "files")
+
+
+if __name__ == '__main__':
+    unittest.main()
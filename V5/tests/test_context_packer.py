@@ -0,0 +1,70 @@
+"""Test cases for token-budgeted context packing"""
+import unittest
+from unittest import mock
+from core import llm
+from core.context_packer import ContextPacker
+from core.llm import LLMService
+from utils.text_utils import TextUtils
+
+TEXT = " ".join(f"Sentence {i} explains part {i} of the firewall policy." for i in range(60))
+
+
+def make_chunks(texts, file_hash="abc", similarity=0.8, indexes=None):
+    indexes = indexes if indexes is not None else range(len(texts))
+    return [{"chunk_id": f"{file_hash}_{i}", "text": text, "filename": f"{file_hash}.pdf",
+             "similarity": similarity, "distance": 0.4} for i, text in zip(indexes, texts)]
+
+
+class TestContextPacker(unittest.TestCase):
+    """Merging, deduplication and the token budget"""
+
+    def test_adjacent_chunks_merge_without_overlap(self):
+        """Consecutive chunk_text chunks should rebuild the original text"""
+        pieces = TextUtils.chunk_text(TEXT, chunk_size=800, overlap=150)
+        chunks = make_chunks(pieces[:3])
+        # Retrieval order is by relevance, not by position in the file
+        packed = ContextPacker(token_budget=10000).pack([chunks[1], chunks[0], chunks[2]])
+        self.assertEqual(len(packed["chunks"]), 1)
+        self.assertEqual(packed["merged"], 2)
+        passage = packed["chunks"][0]
+        self.assertEqual(passage["text"], TEXT[:len(passage["text"])])
+        self.assertEqual(passage["chunk_ids"], ["abc_0", "abc_1", "abc_2"])
+
+    def test_non_adjacent_and_duplicate_chunks(self):
+        chunks = make_chunks(["alpha text", "gamma text"], indexes=[0, 2])
+        duplicate = make_chunks(["alpha text"], file_hash="def")
+        packed = ContextPacker().pack(chunks + duplicate)
+        self.assertEqual([c["chunk_id"] for c in packed["chunks"]], ["abc_0", "abc_2"])
+        self.assertEqual(packed["merged"], 1)
+
+    def test_budget_keeps_most_relevant(self):
+        chunks = make_chunks(["a" * 400], "one") + make_chunks(["b" * 4000], "two") + make_chunks(["c" * 400], "three")
+        packed = ContextPacker(token_budget=250).pack(chunks)
+        self.assertEqual([c["filename"] for c in packed["chunks"]], ["one.pdf", "three.pdf"])
+        self.assertEqual((packed["context_tokens"], packed["dropped"]), (200, 1))
+
+        # An oversized best passage is trimmed rather than leaving the prompt empty
+        packed = ContextPacker(token_budget=100).pack(make_chunks(["b" * 4000]))
+        self.assertEqual(len(packed["chunks"][0]["text"]), 400)
+
+    def test_num_ctx_rounds_to_power_of_two(self):
+        packer = ContextPacker(num_ctx_min=2048, num_ctx_max=8192)
+        self.assertEqual(packer.num_ctx_for(500, 1024), 2048)
+        self.assertEqual(packer.num_ctx_for(2000, 1024), 4096)
+        self.assertEqual(packer.num_ctx_for(20000, 1024), 8192)
+
+    def test_generation_uses_packed_num_ctx(self):
+        service = LLMService(model="test-model", context_packer=ContextPacker(num_ctx_min=1024))
+        chunks = make_chunks(["Firewalls filter traffic."])
+        report = {}
+        with mock.patch.object(llm.ollama, "generate", return_value={"response": "Firewalls filter traffic."}) as generate:
+            service.generate_response("what is a firewall", chunks, report=report)
+        context = report["context"]
+        self.assertIs(service.last_context, context)
+        self.assertEqual(generate.call_args.kwargs["options"]["num_ctx"], context["num_ctx"])
+        self.assertEqual(context["passages"], 1)
+        self.assertGreater(context["prompt_tokens"], context["context_tokens"])
+
+
+if __name__ == "__main__":
+    unittest.main()
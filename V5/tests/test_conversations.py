@@ -0,0 +1,101 @@
+"""Test cases for server-side conversation sessions"""
+import unittest
+from unittest import mock
+from core import conversations
+from core.conversations import ConversationStore
+
+
+class StubDatabase:
+    """Stands in for DatabaseManager's query and get_chunks"""
+
+    def __init__(self, stored):
+        self.stored = {chunk['chunk_id']: chunk for chunk in stored}
+        self.queries = []
+        self.fetched = []
+
+    def query(self, query, n_results=5):
+        self.queries.append(query)
+        return [dict(chunk, similarity=0.9 - i * 0.1) for i, chunk in enumerate(list(self.stored.values())[:2])]
+
+    def get_chunks(self, chunk_ids):
+        self.fetched.append(list(chunk_ids))
+        return [dict(self.stored[chunk_id], similarity=0.0) for chunk_id in chunk_ids if chunk_id in self.stored]
+
+
+class TestConversationStore(unittest.TestCase):
+    """Follow-ups reuse the previous turn's chunks; other questions retrieve again"""
+
+    def setUp(self):
+        self.store = ConversationStore(max_sessions=2, ttl_seconds=60)
+        self.db = StubDatabase([{'chunk_id': f"abc_{i}", 'text': f"chunk {i}", 'filename': "notes.txt"}
+                                for i in range(4)])
+
+    def first_turn(self):
+        session = self.store.get_or_create()
+        chunks, follow_up = self.store.start_turn(session, "What is TCP congestion control?", self.db)
+        self.store.record_turn(session, "What is TCP congestion control?", chunks, follow_up)
+        session['context'] = [1, 2, 3]  # stored by LLMService after generating
+        return session
+
+    def test_follow_up_detection(self):
+        session = self.first_turn()
+        self.assertTrue(self.store.is_follow_up(session, "Explain the second point more"))
+        self.assertTrue(self.store.is_follow_up(session, "And why is that?"))
+        self.assertFalse(self.store.is_follow_up(session, "What is a B-tree index?"))
+        self.assertTrue(self.store.is_follow_up(session, "Why does TCP congestion control do that?"))
+        self.assertFalse(self.store.is_follow_up(self.store.get_or_create(), "Explain it more"))
+
+    def test_new_subject_is_not_a_follow_up(self):
+        """Follow-up phrasing around a subject the last question did not name still retrieves"""
+        session = self.first_turn()
+        self.assertFalse(self.store.is_follow_up(session, "What about unit 4?"))
+        self.assertFalse(self.store.is_follow_up(session, "What is this course's syllabus?"))
+        self.assertFalse(self.store.is_follow_up(session, "How about its effect on latency?"))
+
+    def test_neighbour_chunk_ids(self):
+        session = {'chunk_ids': ["abc_0", "abc_2"]}
+        self.assertEqual(self.store.follow_up_chunk_ids(session), ["abc_0", "abc_2", "abc_1", "abc_3"])
+
+    def test_follow_up_reuses_chunks_and_context(self):
+        session = self.first_turn()
+        chunks, follow_up = self.store.start_turn(session, "Explain that more", self.db)
+
+        self.assertTrue(follow_up)
+        self.assertEqual(len(self.db.queries), 1)
+        self.assertEqual([chunk['chunk_id'] for chunk in chunks], ["abc_0", "abc_1", "abc_2"])
+        self.assertEqual(chunks[0]['similarity'], 0.9)
+        self.assertEqual(session['context'], [1, 2, 3])
+
+        self.store.record_turn(session, "Explain that more", chunks, follow_up)
+        self.assertEqual(session['chunk_ids'], ["abc_0", "abc_1"])
+        self.assertEqual(self.store.get_stats()['follow_ups'], 1)
+
+    def test_new_question_retrieves_and_resets_context(self):
+        session = self.first_turn()
+        session['exchange'] = ("What is TCP congestion control?", "It limits the sending rate.")
+        chunks, follow_up = self.store.start_turn(session, "Which sorting algorithms are stable?", self.db)
+        self.assertFalse(follow_up)
+        self.assertEqual(len(self.db.queries), 2)
+        self.assertIsNone(session['context'])
+        self.assertIsNone(session['exchange'])
+
+    def test_missing_chunks_fall_back_to_retrieval(self):
+        session = self.first_turn()
+        self.db.stored.clear()
+        _, follow_up = self.store.start_turn(session, "Explain that more", self.db)
+        self.assertFalse(follow_up)
+
+    def test_lru_and_ttl_eviction(self):
+        first = self.store.get_or_create()
+        second = self.store.get_or_create()
+        self.assertIs(self.store.get_or_create(first['id']), first)
+        self.store.get_or_create()
+        self.assertIsNot(self.store.get_or_create(second['id']), second)
+
+        with mock.patch.object(conversations.time, "time", return_value=first['updated_at'] + 61):
+            self.assertIsNot(self.store.get_or_create(first['id']), first)
+        self.assertGreaterEqual(self.store.get_stats()['evictions'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Test cases for streaming spreadsheet and CSV extraction"""
+import csv
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+import openpyxl
+from core.processor import FileProcessor
+from extractors.document_extractor import DocumentExtractor
+from models.document import Document
+
+
+def make_document(path: Path, text: str) -> Document:
+    return Document(filename=path.name, filepath=path, file_hash="h", category="Data", text_content=text,
+                    file_type="data", size_bytes=path.stat().st_size, created_at=datetime.now())
+
+
+class TestTabularExtraction(unittest.TestCase):
+    """Every row is indexed, chunks repeat the header, memory stays bounded"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.processor = FileProcessor(chunk_tokens=120)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_csv_rows_beyond_old_limit_are_chunked_with_header(self):
+        path = self.dir / "orders.csv"
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["order_id", "customer", "amount"])
+            writer.writerows([i, f"customer {i}", i * 10] for i in range(1, 3001))
+
+        text = self.processor.extract_text(path)
+        chunks = self.processor.create_chunks(make_document(path, text))
+        self.assertTrue(all(chunk.text.startswith("order_id | customer | amount\n") for chunk in chunks))
+        self.assertIn("3000 | customer 3000 | 30000", chunks[-1].text)
+        self.assertEqual(chunks[0].locator.split("-")[0], "rows 2")
+        self.assertEqual(chunks[-1].locator.split("-")[1], "3001")
+        rows = sum(chunk.text.count("\n") for chunk in chunks)
+        self.assertEqual(rows, 3000)
+
+    def test_preview_is_bounded(self):
+        path = self.dir / "big.csv"
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerows([[i, "x" * 50] for i in range(5000)])
+        with mock.patch.object(DocumentExtractor, "TABLE_PREVIEW_CHARS", 1000):
+            text = DocumentExtractor.extract_csv(path)
+        self.assertLess(len(text), 1200)
+        self.assertTrue(text.endswith("(preview truncated; all rows are indexed)"))
+
+    def test_xlsx_streams_in_read_only_mode(self):
+        path = self.dir / "budget.xlsx"
+        workbook = openpyxl.Workbook(write_only=True)
+        for name in ("Sales", "Costs"):
+            sheet = workbook.create_sheet(name)
+            sheet.append(["month", "value"])
+            for month in range(1, 13):
+                sheet.append([f"2024-{month:02d}", month * 100])
+        workbook.save(path)
+
+        with mock.patch.object(openpyxl, "load_workbook", wraps=openpyxl.load_workbook) as load:
+            text = self.processor.extract_text(path)
+            chunks = self.processor.create_chunks(make_document(path, text))
+        self.assertTrue(all(call.kwargs.get("read_only") for call in load.call_args_list))
+        self.assertIn("=== Sheet: Sales ===\n\nmonth | value\n2024-01 | 100", text)
+        self.assertEqual([c.locator for c in chunks], ["sheet Sales rows 2-13", "sheet Costs rows 2-13"])
+        self.assertTrue(chunks[1].text.startswith("=== Sheet: Costs ===\nmonth | value\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
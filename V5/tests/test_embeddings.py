@@ -0,0 +1,64 @@
+"""Test cases for the embedding service and its cache"""
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+from core.embeddings import EmbeddingService
+
+
+class CountingBackend:
+    """Deterministic stand-in backend that records every text it embeds"""
+
+    name = "counting"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+
+
+class TestEmbeddingService(unittest.TestCase):
+    """Vectors should be cached by text hash and embedded once"""
+
+    def test_duplicates_embedded_once(self):
+        """Repeated texts in one call should reach the backend once"""
+        backend = CountingBackend()
+        service = EmbeddingService(backend)
+        vectors = service.embed(["alpha", "beta", "alpha"])
+        self.assertEqual(backend.calls, [["alpha", "beta"]])
+        np.testing.assert_array_equal(vectors[0], vectors[2])
+
+    def test_sqlite_cache_survives_restart(self):
+        """Re-ingesting identical chunks should not call the backend again"""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = Path(tmp) / "embeddings.db"
+            first = EmbeddingService(CountingBackend(), cache_path=cache_path).embed(["alpha", "beta"])
+
+            backend = CountingBackend()
+            service = EmbeddingService(backend, cache_path=cache_path)
+            second = service.embed(["beta", "alpha", "gamma"])
+            self.assertEqual(backend.calls, [["gamma"]])
+            np.testing.assert_array_equal(second[0], first[1])
+            self.assertEqual(service.get_stats()["hits"], 2)
+            self.assertEqual(service.get_stats()["cached_vectors"], 3)
+
+    def test_keys_depend_on_backend(self):
+        """Switching models must not serve vectors from the old one"""
+        a, b = CountingBackend(), CountingBackend()
+        b.name = "counting-int8"
+        self.assertNotEqual(EmbeddingService(a).text_key("x"), EmbeddingService(b).text_key("x"))
+
+    def test_chroma_backend_config(self):
+        """The 'chroma' backend keeps Chroma's default embedding function"""
+        class Settings:
+            EMBEDDING_BACKEND = "chroma"
+        self.assertIsNone(EmbeddingService.from_config(Settings))
+        Settings.EMBEDDING_BACKEND = "word2vec"
+        with self.assertRaises(ValueError):
+            EmbeddingService.from_config(Settings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Test cases for the download file index"""
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+from core.file_index import FileIndex
+from core.manifest import IngestionManifest
+
+
+class TestFileIndex(unittest.TestCase):
+    """Lookups by file ID, chunk ID and name, kept current by manifest writes"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.sorted = root / "sorted"
+        self.manifest = IngestionManifest(root / "manifest.db")
+        self.a = self.add(self.sorted / "CS" / "pdf" / "notes.pdf", "hash_a")
+        self.b = self.add(self.sorted / "Math" / "pdf" / "notes.pdf", "hash_b")
+        self.index = FileIndex(self.manifest, self.sorted)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, path: Path, file_hash: str) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(file_hash.encode() * 100)
+        self.manifest.record(path, file_hash, "1", [f"{file_hash}_0"])
+        return path
+
+    def test_resolves_file_and_chunk_ids(self):
+        self.assertEqual(self.index.resolve("hash_a"), ("hash_a", self.a.absolute()))
+        self.assertEqual(self.index.resolve("hash_b_3"), ("hash_b", self.b.absolute()))
+        self.assertIsNone(self.index.resolve("missing"))
+
+    def test_colliding_names_return_every_file(self):
+        self.assertEqual({file_id for file_id, _ in self.index.find_by_name("notes.pdf")}, {"hash_a", "hash_b"})
+
+    def test_manifest_writes_from_another_connection_reload_the_index(self):
+        other = IngestionManifest(self.manifest.db_path)
+        path = self.sorted / "CS" / "txt" / "new.txt"
+        path.parent.mkdir(parents=True)
+        path.write_text("new")
+        other.record(path, "hash_new", "1", [])
+        self.assertEqual(self.index.resolve("hash_new")[1], path.absolute())
+
+        other.remove(self.a)
+        self.a.unlink()
+        self.assertIsNone(self.index.resolve("hash_a"))
+        reloads = self.index.reloads
+        self.index.resolve("hash_b")
+        self.assertEqual(self.index.reloads, reloads)
+
+    def test_manifest_writes_are_applied_without_reloading(self):
+        """Only the changed rows are applied; the files table is not read again"""
+        reloads = self.index.reloads
+        moved = self.sorted / "CS" / "pdf" / "renamed.pdf"
+        self.a.rename(moved)
+        self.manifest.record(moved, "hash_a", "1", ["hash_a_0"])
+        self.manifest.remove(self.a)
+        with mock.patch.object(self.manifest, "files", side_effect=AssertionError("full reload")):
+            self.assertEqual(self.index.resolve("hash_a"), ("hash_a", moved.absolute()))
+            self.assertEqual(self.index.find_by_name("notes.pdf"), [("hash_b", self.b.absolute())])
+        self.assertEqual(self.index.reloads, reloads)
+        self.assertEqual(self.index.updates, 2)
+
+    def test_index_far_behind_the_change_log_reloads(self):
+        self.manifest.CHANGE_LOG_LIMIT = 2
+        for i in range(4):
+            self.add(self.sorted / "CS" / "txt" / f"new_{i}.txt", f"hash_n{i}")
+        reloads = self.index.reloads
+        self.assertEqual(self.index.resolve("hash_n0")[0], "hash_n0")
+        self.assertEqual(self.index.reloads, reloads + 1)
+
+    def test_identical_copies_are_one_match(self):
+        """Copies of one file under the same name are not ambiguous"""
+        copy = self.add(self.sorted / "Archive" / "pdf" / "notes.pdf", "hash_a")
+        matches = self.index.find_by_name("notes.pdf")
+        self.assertEqual(sorted(file_id for file_id, _ in matches), ["hash_a", "hash_b"])
+
+        self.b.unlink()
+        self.manifest.remove(self.b)
+        self.assertEqual(len(self.index.find_by_name("notes.pdf")), 1)
+        self.a.unlink()
+        self.assertEqual(self.index.find_by_name("notes.pdf"), [("hash_a", copy.absolute())])
+
+    def test_files_outside_root_are_not_served(self):
+        outside = Path(self.tmp.name) / "secret.txt"
+        outside.write_text("x")
+        self.manifest.record(outside, "hash_secret", "1", [])
+        self.assertIsNone(self.index.resolve("hash_secret"))
+
+
+if __name__ == '__main__':
+    unittest.main()
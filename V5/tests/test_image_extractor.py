@@ -0,0 +1,91 @@
+"""Test cases for image OCR preprocessing and caching"""
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from PIL import Image, ImageDraw
+from extractors import ocr
+from extractors.image_extractor import ImageExtractor
+from extractors.ocr import OCRService
+
+
+def png_bytes(size=(400, 200), dpi=None, shade=230) -> bytes:
+    image = Image.new("RGB", size, (shade, shade, shade))
+    ImageDraw.Draw(image).rectangle([20, 20, 120, 60], fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", **({"dpi": dpi} if dpi else {}))
+    return buffer.getvalue()
+
+
+class TestOCRPreprocessing(unittest.TestCase):
+    """DPI/size caps, grayscale and binarization"""
+
+    def test_downscales_to_dpi_cap(self):
+        service = OCRService(max_dpi=300)
+        image = service.preprocess(Image.open(io.BytesIO(png_bytes((1200, 600), dpi=(600, 600)))))
+        self.assertEqual(image.size, (600, 300))
+        self.assertEqual(image.mode, "L")
+        self.assertEqual({level for _, level in image.getcolors()}, {0, 255})
+
+    def test_downscales_to_size_cap_without_dpi(self):
+        service = OCRService(max_side=100, binarize=False)
+        image = service.preprocess(Image.open(io.BytesIO(png_bytes((400, 200)))))
+        self.assertEqual(image.size, (100, 50))
+        self.assertGreater(len({level for _, level in image.getcolors()}), 2)
+
+    def test_otsu_threshold_splits_modes(self):
+        histogram = [0] * 256
+        histogram[30], histogram[220] = 100, 300
+        self.assertTrue(30 <= OCRService.otsu_threshold(histogram) < 220)
+
+    def test_workers_capped_at_cpu_count(self):
+        with mock.patch.object(ocr.os, "cpu_count", return_value=2):
+            self.assertEqual(OCRService(workers=8).workers, 2)
+
+    def test_workers_shared_across_processes(self):
+        with mock.patch.object(ocr.os, "cpu_count", return_value=16):
+            self.assertEqual(OCRService(workers=8).per_process(4), 2)
+            self.assertEqual(OCRService(workers=2).per_process(7), 1)
+
+
+class TestImageExtractorCache(unittest.TestCase):
+    """Content-hash cache: identical images are OCR'd once, re-ingestion never"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "a.png").write_bytes(png_bytes(shade=230))
+        (self.dir / "copy_of_a.png").write_bytes(png_bytes(shade=230))
+        (self.dir / "b.png").write_bytes(png_bytes(shade=200))
+        self.paths = [self.dir / "a.png", self.dir / "copy_of_a.png", self.dir / "b.png", self.dir / "missing.png"]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_batch(self, service):
+        calls = []
+
+        def fake_ocr(image, lang, timeout):
+            calls.append(image.mode)
+            return f"text {len(calls)}"
+
+        with mock.patch.object(ocr.pytesseract, "get_tesseract_version", return_value="5.0"), \
+                mock.patch.object(ocr.pytesseract, "image_to_string", side_effect=fake_ocr):
+            extractor = ImageExtractor(ocr=service)
+            return [extractor.extract(path) for path in self.paths], calls
+
+    def test_batch_uses_cache(self):
+        texts, calls = self.run_batch(OCRService(cache_path=self.dir / "ocr.db", workers=1))
+        self.assertEqual(texts[0], "text 1")
+        self.assertEqual(texts[1], "text 1")  # same content, same result
+        self.assertEqual(texts[2], "text 2")
+        self.assertEqual(texts[3], "")
+        self.assertEqual(calls, ["L", "L"])
+
+        texts_again, calls = self.run_batch(OCRService(cache_path=self.dir / "ocr.db"))
+        self.assertEqual((texts_again, calls), (texts, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
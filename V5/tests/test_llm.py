@@ -0,0 +1,427 @@
+"""Test cases for LLM service content analysis"""
+import random
+import unittest
+from unittest import mock
+from core import llm
+from core.llm import LLMService
+from utils.keyword_matcher import TokenizedText
+from utils.rule_engine import RuleEngine
+
+# Representative documents per category. Expected results were recorded with
+# the per-rule re.search implementation the rule engine replaced.
+SAMPLE_DOCUMENTS = {
+    "python_backend": (
+        "from flask import Flask\n"
+        "app = Flask(__name__)\n"
+        "\n"
+        "@app.route('/users')\n"
+        "def get_users():\n"
+        "    return db.session.query(User).all()\n"
+        "\n"
+        "class UserService:\n"
+        "    def create(self, data):\n"
+        "        return data\n"
+    ),
+    "html_page": (
+        "<!DOCTYPE html>\n"
+        "<html>\n"
+        "<head>\n"
+        "<meta charset='utf-8'>\n"
+        "<link rel='stylesheet' href='style.css'>\n"
+        "</head>\n"
+        "<body>\n"
+        "<div class='nav'><button onclick='go()'>Go</button></div>\n"
+        "<form><input type='text'></form>\n"
+        "</body>\n"
+        "</html>\n"
+    ),
+    "react_component": (
+        "import React, { useState, useEffect } from 'react';\n"
+        "export default function Counter(props) {\n"
+        "  const [count, setCount] = useState(0);\n"
+        "  useEffect(() => { document.title = count; });\n"
+        "  return <div className='counter'>{props.label}: {count}</div>;\n"
+        "}\n"
+    ),
+    "data_science": (
+        "import pandas as pd\n"
+        "import numpy as np\n"
+        "df = pd.read_csv('data.csv')\n"
+        "from sklearn.model_selection import train_test_split\n"
+        "X_train, X_test = train_test_split(df)\n"
+        "model.fit(X_train)\n"
+        "print(accuracy, precision, recall)\n"
+    ),
+    "markdown_docs": (
+        "# Project\n"
+        "## Installation\n"
+        "Run pip install.\n"
+        "## Usage\n"
+        "Call the API.\n"
+        "### Getting Started\n"
+        "See the tutorial.\n"
+        "## API Reference\n"
+        "Parameters: name\n"
+        "Returns: object\n"
+        "## Notes\n"
+        "## FAQ\n"
+    ),
+    "course_unit": (
+        "Unit 3: Database Management Systems\n"
+        "Lecture notes for the course.\n"
+        "Question 1: Explain normalization.\n"
+        "Question 2: What is a transaction?\n"
+        "Assignment: design a relational schema.\n"
+        "Exam preparation and quiz.\n"
+    ),
+    "cyber_security": (
+        "Unit 1 Introduction to Cyber Security\n"
+        "Topics: encryption, hashing, firewall, vulnerability assessment.\n"
+        "Lesson 2 covers network security and attack vectors.\n"
+        "What is penetration testing? How does it work?\n"
+    ),
+    "medical_record": (
+        "Patient: John Doe\n"
+        "Diagnosis: hypertension\n"
+        "Treatment plan: medication daily.\n"
+        "Vital signs: blood pressure 140/90, heart rate 80.\n"
+        "Physician notes from the hospital clinic.\n"
+    ),
+    "legal_contract": (
+        "This Agreement is made hereby between the parties.\n"
+        "Whereas the party shall comply with all terms and conditions.\n"
+        "Clause 4: Liability and indemnity.\n"
+        "Copyright and trademark license terms apply pursuant to section 2.\n"
+    ),
+    "finance_report": (
+        "Quarterly revenue and profit increased.\n"
+        "Balance sheet shows assets and liabilities; equity improved.\n"
+        "Cash flow for the fiscal year is positive.\n"
+        "Investment portfolio with dividend stock and ROI analysis.\n"
+        "Audit follows GAAP accounting.\n"
+    ),
+    "business_plan": (
+        "Business strategy and value proposition.\n"
+        "Marketing and sales targets with customer acquisition.\n"
+        "KPI metrics, milestones and roadmap for the team.\n"
+        "Stakeholder management and leadership.\n"
+    ),
+    "research_paper": (
+        "Abstract\n"
+        "We study the hypothesis with an experiment.\n"
+        "Introduction\n"
+        "Methodology and statistical analysis, p-value < 0.05.\n"
+        "Results and conclusion. Smith et al. report similar findings (Figure 2, Table 1).\n"
+        "References\n"
+        "DOI: 10.1000/xyz journal peer-review.\n"
+    ),
+    "algorithms": (
+        "Sorting algorithms: quicksort and mergesort use recursion.\n"
+        "Binary search over a sorted array.\n"
+        "class Node:\n"
+        "    def __init__(self):\n"
+        "        self.next = None\n"
+        "for i in range(n):\n"
+        "    while stack:\n"
+        "        stack.pop()\n"
+    ),
+    "plain_text": (
+        "The weather was pleasant and we walked along the river.\n"
+        "Birds sang in the trees.\n"
+    ),
+    "empty": "",
+    "presentation": (
+        "=== Slide 1 ===\n"
+        "Introduction to Programming\n"
+        "=== Slide 2 ===\n"
+        "function add(a, b) { return a + b; }\n"
+        "for (let i = 0; i < 10; i++) { console.log(i); }\n"
+        "=== Slide 3 ===\n"
+        "Lecture summary\n"
+    ),
+}
+
+EXPECTED_SAMPLE_RESULTS = {
+    "python_backend": ("BackendCode", 38.5),
+    "html_page": ("FrontendCode", 80.0),
+    "react_component": ("FrontendCode", 27.5),
+    "data_science": ("DataScience", 30.5),
+    "markdown_docs": ("Documentation", 65.0),
+    "course_unit": ("Education", 47.5),
+    "cyber_security": ("Education", 61.5),
+    "medical_record": ("Healthcare", 28.5),
+    "legal_contract": ("Legal", 38.0),
+    "finance_report": ("Finance", 48.0),
+    "business_plan": ("Business", 38.5),
+    "research_paper": ("ResearchPaper", 45.0),
+    "algorithms": ("Code", 18.0),
+    "plain_text": ("BackendCode", 0.0),
+    "empty": ("BackendCode", 0.0),
+    "presentation": ("Code", 11.0),
+}
+
+SNIPPET_LINES = [
+    "def process(data):", "    return [x for x in data if x]", "class Handler(BaseHandler):", "import os, sys",
+    "from flask import request, jsonify", "SELECT name FROM users WHERE id = 1 GROUP BY name;",
+    "<div class=\"card\"><span>Title</span></div>", "<button onclick=\"save()\">Save</button>",
+    "const total = items.reduce((a, b) => a + b, 0);", "let value = props.value;", "df = pd.DataFrame(rows)",
+    "model = keras.Sequential()", "The neural network uses deep learning and LSTM layers.", "## Installation",
+    "### Usage", "Parameters: query (str)", "Returns: list of results", "Question 4: Define normalization.",
+    "Answer: it reduces redundancy.", "Unit 5 covers transactions and indexing.",
+    "Chapter 2 lesson on software engineering and design patterns.", "What is a REST API? How do endpoints work?",
+    "The patient was given a prescription for medication.", "Blood pressure and heart rate were recorded.",
+    "Whereas the parties agree pursuant to clause 3.", "This contract grants a license to the trademark.",
+    "Revenue rose while operating loss narrowed; EBITDA improved.", "The portfolio return on investment was 12%.",
+    "Our strategy focuses on market share and target audience.", "Stakeholder leadership sets the KPI milestones.",
+    "Abstract: we present empirical results.", "See Figure 3 and Table 2 for the statistical analysis.",
+    "Bibliography and citation format follow the journal.", "- bullet point item", "```python", "```",
+    "{\"key\": \"value\", \"count\": 3}", "Explain why the algorithm terminates. Solve for x.",
+    "Unit test with assert and mock objects; debugging the stack trace.", "Cyber security: encryption and hashing.",
+    "The quick brown fox jumps over the lazy dog.", "Meeting notes from the weekly sync.", "   # indented header",
+    "Tailwind and bootstrap components with flexbox grid margin.", "Slide presentation for the lecture module.",
+]
+
+# (seed, line count) -> expected (category, score) for generate_document()
+EXPECTED_GENERATED_RESULTS = {
+    (1, 40): ("Education", 100.0),
+    (2, 40): ("Education", 90.75),
+    (3, 3000): ("Code", 2257.0),
+    (4, 40): ("Education", 80.25),
+    (5, 40): ("Education", 81.0),
+    (6, 3000): ("Code", 2726.0),
+    (7, 40): ("Education", 124.5),
+    (8, 40): ("FrontendCode", 60.5),
+    (9, 3000): ("Documentation", 2449.0),
+    (10, 40): ("Education", 122.25),
+    (11, 40): ("Education", 112.25),
+    (12, 3000): ("Business", 1936.5),
+    (13, 40): ("Education", 87.75),
+    (14, 40): ("Education", 93.5),
+    (15, 3000): ("Code", 3131.0),
+    (16, 40): ("Education", 81.25),
+    (17, 40): ("Education", 106.25),
+    (18, 3000): ("Documentation", 2905.0),
+    (19, 40): ("Education", 79.75),
+    (20, 40): ("Education", 99.5),
+    (21, 3000): ("Education", 2897.25),
+    (22, 40): ("Education", 80.25),
+    (23, 40): ("Education", 97.5),
+    (24, 3000): ("Documentation", 2880.5),
+}
+
+
+def generate_document(seed: int, line_count: int) -> str:
+    """Deterministic mixed-content document built from SNIPPET_LINES"""
+    rng = random.Random(seed)
+    weights = [rng.random() ** 3 for _ in SNIPPET_LINES]
+    return "\n".join(rng.choices(SNIPPET_LINES, weights=weights, k=line_count))
+
+
+class TestTokenizedText(unittest.TestCase):
+    """Token vocabulary lookups must agree with plain substring checks"""
+
+    def test_contains_matches_substring(self):
+        """contains() should equal ``in`` for local and space-spanning literals"""
+        rng = random.Random(3)
+        for _ in range(500):
+            text = ''.join(rng.choice("ab \n:-") for _ in range(rng.randint(0, 30)))
+            tokens = TokenizedText(text)
+            for literal in ["a", "ab ", "b a", " a", "a b:", "\n-", "  "]:
+                self.assertEqual(tokens.contains(literal), literal in text, f"{literal!r} in {text!r}")
+
+    def test_words(self):
+        """Word set should hold maximal word runs only"""
+        tokens = TokenizedText("node.js and flask_app, f1-score")
+        self.assertIn("flask_app", tokens.words)
+        self.assertIn("js", tokens.words)
+        self.assertNotIn("flask", tokens.words)
+
+
+class TestRuleEngine(unittest.TestCase):
+    """Test the precompiled content rule engine"""
+
+    RULES = [
+        {"name": "word", "terms": ["test", "unit test"]},
+        {"name": "dotted", "terms": ["node.js", "props.", "et al."]},
+        {"name": "tag", "substrings": ["<div"]},
+        {"name": "numbered", "patterns": [r'\b(chapter|unit)\s+\d+'], "prefixes": ["chapter", "unit"]},
+    ]
+
+    def test_rule_semantics(self):
+        """Each rule fires exactly when its single reference regex would match"""
+        engine = RuleEngine(self.RULES)
+        rng = random.Random(5)
+        pieces = ["test", "unit", "unit test", "node", ".js", "props", ".", "et al", "<div", "chapter", "4",
+                  " ", "\n", "x", "_"]
+        for _ in range(1000):
+            text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            fired = engine.evaluate(TokenizedText(text))
+            for name, pattern in engine._debug_patterns.items():
+                self.assertEqual(name in fired, pattern.search(text) is not None, f"{name} on {text!r}")
+
+    def test_hit_counts(self):
+        """Engine should record firing documents and count individual matches"""
+        engine = RuleEngine(self.RULES)
+        engine.evaluate(TokenizedText("unit 1 test and unit 2 test <div>"))
+        engine.evaluate(TokenizedText("plain text"))
+        self.assertEqual(engine.hit_counts, {"word": 1, "tag": 1, "numbered": 1})
+        counts = engine.count_matches("unit 1 test and unit 2 test <div>")
+        self.assertEqual(counts, {"word": 2, "dotted": 0, "tag": 1, "numbered": 2})
+
+    def test_duplicate_names_rejected(self):
+        """Rule names identify rules in debug output and must be unique"""
+        with self.assertRaises(ValueError):
+            RuleEngine([{"name": "a", "terms": ["x"]}, {"name": "a", "terms": ["y"]}])
+
+
+class TestContentAnalysis(unittest.TestCase):
+    """Content analysis must keep producing the same categories and scores"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.llm = LLMService()
+
+    def test_sample_documents(self):
+        """Representative documents keep their category and score"""
+        for name, text in SAMPLE_DOCUMENTS.items():
+            with self.subTest(document=name):
+                self.assertEqual(self.llm._classify_by_analysis(text), EXPECTED_SAMPLE_RESULTS[name])
+
+    def test_generated_documents(self):
+        """Mixed and long generated documents keep their category and score"""
+        for (seed, line_count), expected in EXPECTED_GENERATED_RESULTS.items():
+            with self.subTest(seed=seed, lines=line_count):
+                text = generate_document(seed, line_count)
+                self.assertEqual(self.llm._classify_by_analysis(text), expected)
+
+    def test_content_rules_match_reference_regexes(self):
+        """Every CONTENT_RULES entry fires exactly when its combined regex matches"""
+        engine = self.llm._content_rule_engine
+        for name, text in SAMPLE_DOCUMENTS.items():
+            text_lower = text.lower()
+            fired = engine.evaluate(TokenizedText(text_lower))
+            for rule_name, pattern in engine._debug_patterns.items():
+                self.assertEqual(rule_name in fired, pattern.search(text_lower) is not None,
+                                 f"{rule_name} on {name}")
+
+    def test_explain_content_rules(self):
+        """Debug helper should report per-rule match counts"""
+        counts = self.llm.explain_content_rules(SAMPLE_DOCUMENTS["medical_record"])
+        self.assertEqual(set(counts), {rule["name"] for rule in self.llm.CONTENT_RULES})
+        self.assertGreater(counts["healthcare_clinical"], 1)
+        self.assertEqual(counts["legal_language"], 0)
+
+
+class TestResponseStreaming(unittest.TestCase):
+    """Streamed answers must end with the same result as generate_response"""
+
+    CHUNKS = [{"filename": "python.txt", "text": "Python was created by Guido van Rossum",
+               "similarity": 0.8, "distance": 0.4}]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.llm = LLMService()
+
+    def test_stream_tokens_then_done(self):
+        """Tokens arrive as separate events and the final event matches generate_response"""
+        stream = [{"response": "Guido "}, {"response": "van Rossum."}, {"response": "", "done": True}]
+        with mock.patch.object(llm.ollama, "generate", return_value=iter(stream)):
+            events = list(self.llm.generate_response_stream("Who created Python?", self.CHUNKS))
+        with mock.patch.object(llm.ollama, "generate", return_value={"response": "Guido van Rossum."}):
+            answer, cited_files, confidence, snippets = self.llm.generate_response("Who created Python?", self.CHUNKS)
+
+        self.assertEqual([e["text"] for e in events if e["type"] == "token"], ["Guido ", "van Rossum."])
+        done = events[-1]
+        self.assertEqual(done["type"], "done")
+        self.assertEqual(done["answer"], answer)
+        self.assertEqual(done["cited_files"], cited_files)
+        self.assertEqual(done["confidence_score"], confidence)
+        self.assertEqual(done["source_snippets"], snippets)
+
+    def test_stream_ollama_unavailable(self):
+        """Connection errors end the stream with the Ollama-not-running answer"""
+        with mock.patch.object(llm.ollama, "generate", side_effect=ConnectionError("connection refused")):
+            events = list(self.llm.generate_response_stream("Who created Python?", self.CHUNKS))
+        self.assertEqual(len(events), 1)
+        self.assertIn("Ollama is not running", events[0]["answer"])
+        self.assertEqual(events[0]["cited_files"], [])
+
+
+class TestPromptReuse(unittest.TestCase):
+    """Static rules go in the system prompt; follow-ups reuse Ollama's token context"""
+
+    CHUNKS = TestResponseStreaming.CHUNKS
+
+    def test_rules_are_sent_as_system_prompt(self):
+        service = LLMService()
+        with mock.patch.object(llm.ollama, "generate", return_value={"response": "Guido."}) as generate:
+            service.generate_response("Who created Python?", self.CHUNKS)
+        kwargs = generate.call_args.kwargs
+        self.assertEqual(kwargs["system"], LLMService.SYSTEM_PROMPT)
+        self.assertNotIn("CRITICAL RULES", kwargs["prompt"])
+        self.assertTrue(kwargs["prompt"].startswith("Documents:"))
+        self.assertIsNone(kwargs["context"])
+
+    def test_follow_up_reuses_context_and_skips_the_cache(self):
+        from core.answer_cache import AnswerCache
+        service = LLMService(answer_cache=AnswerCache())
+        conversation = {}
+        replies = [{"response": "Guido.", "context": [1, 2, 3]}, {"response": "In 1991.", "context": [1, 2, 3, 4]},
+                   {"response": "Guido van Rossum."}]
+        with mock.patch.object(llm.ollama, "generate", side_effect=replies) as generate:
+            service.generate_response("Who created Python?", self.CHUNKS, conversation)
+            self.assertEqual(conversation["context"], [1, 2, 3])
+            service.generate_response("When?", self.CHUNKS, conversation)
+            self.assertEqual(generate.call_args.kwargs["context"], [1, 2, 3])
+            self.assertEqual(conversation["context"], [1, 2, 3, 4])
+            # The follow-up's answer was not cached for a fresh "When?"
+            answer = service.generate_response("When?", self.CHUNKS)[0]
+        self.assertTrue(answer.startswith("Guido van Rossum."))
+
+    def test_first_turn_from_the_cache_still_carries_over(self):
+        """A cached first answer is kept on the conversation; the follow-up is then never cached or coalesced"""
+        from core.answer_cache import AnswerCache
+        service = LLMService(answer_cache=AnswerCache())
+        with mock.patch.object(llm.ollama, "generate", return_value={"response": "Guido."}):
+            service.generate_response("Who created Python?", self.CHUNKS)
+
+        conversation = {}
+        replies = [{"response": "In 1991."}, {"response": "Guido van Rossum."}]
+        with mock.patch.object(llm.ollama, "generate", side_effect=replies) as generate, \
+                mock.patch.object(service.single_flight, "do") as coalesce:
+            service.generate_response("Who created Python?", self.CHUNKS, conversation)
+            self.assertEqual(generate.call_count, 0)
+            self.assertEqual(conversation["exchange"][0], "Who created Python?")
+            self.assertIsNone(conversation.get("context"))
+
+            service.generate_response("When?", self.CHUNKS, conversation)
+            self.assertEqual(generate.call_count, 1)
+            self.assertIn("Previous question: Who created Python?", generate.call_args.kwargs["prompt"])
+            self.assertIn("Previous answer: Guido.", generate.call_args.kwargs["prompt"])
+            coalesce.assert_not_called()
+
+            # Another user's fresh "When?" is not served the follow-up's answer
+            answer = service.generate_response("When?", self.CHUNKS)[0]
+        self.assertTrue(answer.startswith("Guido van Rossum."))
+
+    def test_report_describes_the_prompt_actually_sent(self):
+        service = LLMService()
+        conversation = {"context": [1, 2, 3]}
+        report = {}
+        replies = [{"response": "In 1991."}, iter([{"response": "Guido."}, {"response": "", "done": True}])]
+        with mock.patch.object(llm.ollama, "generate", side_effect=replies) as generate:
+            service.generate_response("When?", self.CHUNKS, conversation, report=report)
+            events = list(service.generate_response_stream("Who created Python?", self.CHUNKS))
+        self.assertEqual(report["context"]["history_tokens"], 3)
+        self.assertEqual(report["context"]["num_ctx"], generate.call_args_list[0].kwargs["options"]["num_ctx"])
+        self.assertEqual(events[-1]["context"]["history_tokens"], 0)
+
+    def test_oversized_history_is_dropped(self):
+        service = LLMService()
+        history = list(range(service.context_packer.num_ctx_max))
+        prepared = service._prepare_generation("Who created Python?", self.CHUNKS, history)
+        self.assertIsNone(prepared["history"])
+
+
+if __name__ == '__main__':
+    unittest.main()
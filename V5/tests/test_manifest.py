@@ -0,0 +1,220 @@
+"""Test cases for the ingestion manifest"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from core import manifest as manifest_module
+from core.manifest import IngestionManifest, move_indexed, prune_missing, reindex_if_changed, release_chunks
+from core.processor import FileProcessor
+
+
+class RecordingDatabase:
+    """Stands in for DatabaseManager and records added and deleted chunk IDs"""
+
+    def __init__(self):
+        self.added = []
+        self.deleted = []
+        self.deleted_paths = []
+        self.repointed = {}
+        self.categories = {}
+
+    def add_chunks(self, chunks):
+        self.added.extend(chunk.chunk_id for chunk in chunks)
+
+    def delete_chunks(self, chunk_ids):
+        self.deleted.extend(chunk_ids)
+        return len(chunk_ids)
+
+    def delete_by_filepath(self, filepath):
+        self.deleted_paths.append(filepath)
+        return 0
+
+    def repoint_chunks(self, chunk_ids, filepath, category=None):
+        self.repointed.update(dict.fromkeys(chunk_ids, filepath))
+        self.categories.update(dict.fromkeys(chunk_ids, category))
+        return len(chunk_ids)
+
+
+class TestIngestionManifest(unittest.TestCase):
+    """Stat-first change detection with content hashing only on stat changes"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.manifest = IngestionManifest(root / "manifest.db")
+        self.path = root / "notes.txt"
+        self.path.write_text("Lecture on database normalization. " * 40)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_new_file_needs_ingest(self):
+        """Files without a record should always be ingested"""
+        self.assertEqual(self.manifest.needs_ingest(self.path, "1"), (True, None))
+
+    def test_unchanged_file_is_not_hashed(self):
+        """Matching size and mtime should skip without reading the file"""
+        self.manifest.record(self.path, "h", "1", ["a_0"])
+        with mock.patch.object(manifest_module.FileUtils, "get_file_hash") as get_hash:
+            self.assertEqual(self.manifest.needs_ingest(self.path, "1"), (False, "h"))
+        get_hash.assert_not_called()
+
+    def test_touched_file_with_same_content_is_skipped(self):
+        """A new mtime with identical content should refresh the stat data, not re-ingest"""
+        file_hash = manifest_module.FileUtils.get_file_hash(self.path)
+        self.manifest.record(self.path, file_hash, "1", ["a_0"])
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+        self.assertEqual(self.manifest.needs_ingest(self.path, "1"), (False, file_hash))
+        self.assertEqual(self.manifest.get(self.path)["mtime_ns"], self.path.stat().st_mtime_ns)
+
+    def test_changed_content_needs_ingest(self):
+        """Different content should be re-ingested and the new hash returned"""
+        self.manifest.record(self.path, manifest_module.FileUtils.get_file_hash(self.path), "1", ["a_0"])
+        self.path.write_text("Completely different notes on operating systems.")
+        needed, file_hash = self.manifest.needs_ingest(self.path, "1")
+        self.assertTrue(needed)
+        self.assertEqual(file_hash, manifest_module.FileUtils.get_file_hash(self.path))
+
+    def test_extractor_version_bump_needs_ingest(self):
+        """Bumping the extractor version should re-ingest every file"""
+        self.manifest.record(self.path, "h", "1", ["a_0"])
+        self.assertTrue(self.manifest.needs_ingest(self.path, "2")[0])
+
+    def test_remove_returns_record(self):
+        """remove should hand back the chunk IDs so callers can delete them"""
+        self.manifest.record(self.path, "h", "1", ["a_0", "a_1"])
+        record = self.manifest.remove(self.path)
+        self.assertEqual(record["chunk_ids"], ["a_0", "a_1"])
+        self.assertIsNone(self.manifest.get(self.path))
+        self.assertEqual(len(self.manifest), 0)
+
+    def test_paths_under(self):
+        """Directory lookups should match only paths inside that directory"""
+        root = Path(self.tmp.name)
+        for name in ("Education/a.txt", "Education/sub/b.txt", "Education2/c.txt"):
+            path = root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(name)
+            self.manifest.record(path, "h", "1", [])
+        found = sorted(Path(p).relative_to(root).as_posix() for p in self.manifest.paths_under(root / "Education"))
+        self.assertEqual(found, ["Education/a.txt", "Education/sub/b.txt"])
+
+    def test_reindex_skips_unchanged_and_replaces_changed(self):
+        """Only new or edited files should be extracted, and stale chunks deleted"""
+        db = RecordingDatabase()
+        processor = FileProcessor()
+        self.assertGreater(reindex_if_changed(self.manifest, db, processor, self.path, "Education"), 0)
+        first_ids = list(db.added)
+        self.assertIsNone(reindex_if_changed(self.manifest, db, processor, self.path, "Education"))
+
+        self.path.write_text("Revised notes on computer networks and routing. " * 40)
+        self.assertGreater(reindex_if_changed(self.manifest, db, processor, self.path, "Education"), 0)
+        self.assertEqual(db.deleted, first_ids)
+
+    def test_unrecorded_file_clears_old_chunks_first(self):
+        """Files indexed before the manifest may hold chunks from an older chunker"""
+        db = RecordingDatabase()
+        reindex_if_changed(self.manifest, db, FileProcessor(), self.path, "Education")
+        self.assertEqual(db.deleted_paths, [str(self.path)])
+
+    def test_identical_copies_share_chunks(self):
+        """Removing one copy keeps the chunks the other copy still records, pointed at that copy"""
+        copy = self.path.with_name("copy.txt")
+        copy.write_bytes(self.path.read_bytes())
+        self.manifest.record(self.path, "h", "1", ["h_0", "h_1"])
+        self.manifest.record(copy, "h", "1", ["h_0"])
+
+        db = RecordingDatabase()
+        self.assertEqual(release_chunks(self.manifest, db, self.manifest.remove(self.path)), 1)
+        self.assertEqual(db.deleted, ["h_1"])
+        self.assertEqual(db.repointed, {"h_0": os.path.abspath(copy)})
+
+        release_chunks(self.manifest, db, self.manifest.remove(copy))
+        self.assertEqual(db.deleted, ["h_1", "h_0"])
+
+    def test_move_repoints_instead_of_reindexing(self):
+        """A moved file keeps its record and chunks, re-keyed to the new path without being read"""
+        db = RecordingDatabase()
+        reindex_if_changed(self.manifest, db, FileProcessor(), self.path, "Education")
+        record = self.manifest.get(self.path)
+        dest = self.path.parent / "Science" / "renamed.txt"
+        dest.parent.mkdir()
+        self.path.rename(dest)
+
+        with mock.patch.object(manifest_module.FileUtils, "get_file_hash") as get_hash:
+            self.assertTrue(move_indexed(self.manifest, db, self.path, dest, "Science"))
+        get_hash.assert_not_called()
+        self.assertIsNone(self.manifest.get(self.path))
+        moved = self.manifest.get(dest)
+        self.assertEqual((moved['file_hash'], moved['chunk_ids']), (record['file_hash'], record['chunk_ids']))
+        self.assertEqual(db.repointed, dict.fromkeys(record['chunk_ids'], str(dest)))
+        self.assertEqual(set(db.categories.values()), {"Science"})
+        self.assertEqual(len(db.added), len(record['chunk_ids']))
+        self.assertEqual(db.deleted, [])
+        self.assertEqual([(os.path.basename(d), files) for d, _, files, _, _ in self.manifest.totals()],
+                         [("Science", 1)])
+        self.assertIsNone(reindex_if_changed(self.manifest, db, FileProcessor(), dest, "Science"))
+
+    def test_move_over_an_indexed_file_releases_it(self):
+        db = RecordingDatabase()
+        target = self.path.with_name("target.txt")
+        target.write_text("Old notes on compilers.")
+        self.manifest.record(self.path, "h", FileProcessor.EXTRACTOR_VERSION, ["h_0"])
+        self.manifest.record(target, "t", FileProcessor.EXTRACTOR_VERSION, ["t_0"])
+        self.path.replace(target)
+
+        self.assertTrue(move_indexed(self.manifest, db, self.path, target, "Education"))
+        self.assertEqual(db.deleted, ["t_0"])
+        self.assertEqual(self.manifest.get(target)['chunk_ids'], ["h_0"])
+        self.assertEqual(len(self.manifest), 1)
+
+    def test_moved_file_with_new_content_is_not_followed(self):
+        self.manifest.record(self.path, "h", FileProcessor.EXTRACTOR_VERSION, ["h_0"])
+        dest = self.path.with_name("edited.txt")
+        dest.write_text("Different notes on operating systems.")
+        db = RecordingDatabase()
+        self.assertFalse(move_indexed(self.manifest, db, self.path, dest, "Education"))
+        self.assertIsNotNone(self.manifest.get(self.path))
+        self.assertEqual(db.repointed, {})
+
+    def test_prune_missing(self):
+        """Records for deleted files should be dropped along with their chunks"""
+        db = RecordingDatabase()
+        self.manifest.record(self.path, "h", "1", ["a_0"])
+        self.path.unlink()
+        self.assertEqual(prune_missing(self.manifest, db), 1)
+        self.assertEqual(db.deleted, ["a_0"])
+        self.assertEqual(len(self.manifest), 0)
+
+
+class PagedCollection:
+    """Stands in for a Chroma collection and serves metadata in pages"""
+
+    def __init__(self, filepaths):
+        self.metadatas = [{"filepath": fp} for fp in filepaths]
+        self.calls = []
+
+    def get(self, include=None, limit=None, offset=0):
+        self.calls.append((tuple(include), limit, offset))
+        return {"ids": [], "metadatas": self.metadatas[offset:offset + limit]}
+
+
+class TestFilepathPaging(unittest.TestCase):
+    """Reconciliation should page metadata only and yield each path once"""
+
+    def test_iter_filepaths_pages_and_dedupes(self):
+        from core.database import DatabaseManager
+        db = DatabaseManager.__new__(DatabaseManager)
+        db.collection = PagedCollection([f"/sorted/file_{i // 4}.pdf" for i in range(10)])
+
+        self.assertEqual(list(db.iter_filepaths(page_size=4)),
+                         ["/sorted/file_0.pdf", "/sorted/file_1.pdf", "/sorted/file_2.pdf"])
+        self.assertEqual([call[2] for call in db.collection.calls], [0, 4, 8])
+        self.assertTrue(all(call[0] == ("metadatas",) for call in db.collection.calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
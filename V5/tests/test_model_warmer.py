@@ -0,0 +1,105 @@
+"""Test cases for model warm-up, keep_alive and cold/warm latency"""
+import unittest
+from datetime import datetime
+from unittest import mock
+from config import Config
+from core import llm, model_warmer
+from core.llm import LLMService
+from core.model_warmer import LatencyTracker, ModelWarmer
+
+
+class TestModelWarmer(unittest.TestCase):
+    """Warm-up loads the model, heartbeats renew keep_alive in working hours"""
+
+    def setUp(self):
+        self.warmer = ModelWarmer("llama3.2", keep_alive="30m", working_hours=(8, 20),
+                                  working_days=(0, 1, 2, 3, 4), num_ctx=2048)
+
+    def test_warm_up_is_a_one_token_generation_with_keep_alive(self):
+        with mock.patch.object(model_warmer.ollama, "generate",
+                               return_value={"response": "Hi", "load_duration": 3_000_000_000}) as generate:
+            self.assertTrue(self.warmer.warm_up())
+        kwargs = generate.call_args.kwargs
+        self.assertEqual(kwargs["keep_alive"], "30m")
+        self.assertEqual(kwargs["options"], {"num_ctx": 2048, "num_predict": 1})
+        self.assertEqual(self.warmer.last_warmup["load_seconds"], 3.0)
+
+    def test_heartbeat_sends_an_empty_prompt(self):
+        with mock.patch.object(model_warmer.ollama, "generate", return_value={}) as generate:
+            self.assertTrue(self.warmer.heartbeat())
+        self.assertEqual(generate.call_args.kwargs["prompt"], "")
+        self.assertEqual(generate.call_args.kwargs["options"], {"num_ctx": 2048})
+
+    def test_unreachable_ollama_does_not_raise(self):
+        with mock.patch.object(model_warmer.ollama, "generate", side_effect=ConnectionError("refused")):
+            self.assertFalse(self.warmer.warm_up())
+            self.assertFalse(self.warmer.heartbeat())
+
+    def test_working_hours(self):
+        self.assertTrue(self.warmer.in_working_hours(datetime(2026, 10, 14, 9)))   # Wednesday
+        self.assertFalse(self.warmer.in_working_hours(datetime(2026, 10, 14, 20)))
+        self.assertFalse(self.warmer.in_working_hours(datetime(2026, 10, 17, 9)))  # Saturday
+
+
+class TestServingOptions(unittest.TestCase):
+    """Warm-up and heartbeats use the num_ctx real requests use, so Ollama never reloads"""
+
+    CHUNKS = [{"chunk_id": f"abc_{i}", "filename": "networks.txt", "similarity": 0.8,
+               "text": f"Section {i}: TCP congestion control adjusts the sending window. " * 20}
+              for i in range(5)]
+
+    def test_warmer_options_match_generation_options(self):
+        service = LLMService()
+        warmer = ModelWarmer.from_config(Config, service)
+        prepared = service._prepare_generation("How does TCP congestion control work?", self.CHUNKS)
+        self.assertEqual(warmer.current_options(), prepared["options"])
+
+        with mock.patch.object(llm.ollama, "generate", return_value={"response": "It adapts."}):
+            service.generate_response("How does TCP congestion control work?", self.CHUNKS)
+        with mock.patch.object(model_warmer.ollama, "generate", return_value={}) as generate:
+            warmer.heartbeat()
+        self.assertEqual(generate.call_args.kwargs["options"], prepared["options"])
+
+    def test_heartbeat_follows_the_latest_generation(self):
+        service = LLMService()
+        warmer = ModelWarmer.from_config(Config, service)
+        service.last_num_ctx = 8192
+        with mock.patch.object(model_warmer.ollama, "generate", return_value={}) as generate:
+            warmer.heartbeat()
+        self.assertEqual(generate.call_args.kwargs["options"]["num_ctx"], 8192)
+
+
+class TestGenerationLatency(unittest.TestCase):
+    """Each generation is recorded as cold or warm from Ollama's load_duration"""
+
+    CHUNKS = [{"filename": "python.txt", "text": "Python was created by Guido van Rossum",
+               "similarity": 0.8, "distance": 0.4}]
+
+    def test_cold_then_warm(self):
+        service = LLMService(keep_alive="10m")
+        responses = [{"response": "Guido.", "load_duration": 4_000_000_000},
+                     {"response": "Guido van Rossum.", "load_duration": 1_000_000}]
+        with mock.patch.object(llm.ollama, "generate", side_effect=responses) as generate:
+            service.generate_response("Who created Python?", self.CHUNKS)
+            service.generate_response("Who made Python?", self.CHUNKS)
+
+        self.assertEqual(generate.call_args.kwargs["keep_alive"], "10m")
+        stats = service.latency.get_stats()
+        self.assertEqual(stats["cold"]["requests"], 1)
+        self.assertEqual(stats["cold"]["avg_load_seconds"], 4.0)
+        self.assertEqual(stats["warm"]["requests"], 1)
+        self.assertEqual(stats["last"]["kind"], "warm")
+
+    def test_stream_uses_the_final_chunk(self):
+        service = LLMService()
+        stream = [{"response": "Guido."}, {"response": "", "done": True, "load_duration": 2_000_000_000}]
+        with mock.patch.object(llm.ollama, "generate", return_value=iter(stream)):
+            list(service.generate_response_stream("Who created Python?", self.CHUNKS))
+        self.assertEqual(service.latency.get_stats()["cold"]["requests"], 1)
+
+    def test_missing_durations_count_as_warm(self):
+        self.assertEqual(LatencyTracker().record(0.2, LatencyTracker.load_seconds({})), "warm")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Test cases for page-wise PDF text extraction"""
+import io
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import fitz
+from PIL import Image
+from extractors import ocr, pdf_extractor
+from extractors.ocr import OCRService
+from extractors.pdf_extractor import PDFExtractor
+from utils.chunker import StructuredChunker
+
+PAGES = ["Hashing maps data to a digest.", "", "Firewalls filter network traffic."]
+
+
+class TestPDFExtractor(unittest.TestCase):
+    """PyMuPDF pages, pdfminer fallback and the page-parallel path"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "notes.pdf"
+        doc = fitz.open()
+        for text in PAGES:
+            page = doc.new_page()
+            if text:
+                page.insert_text((72, 72), text)
+        doc.save(str(self.path))
+        doc.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_are_separated_by_form_feeds(self):
+        text = PDFExtractor().extract(self.path)
+        self.assertEqual(text.split("\f"), PAGES)
+        chunks = StructuredChunker().chunk(text)
+        self.assertEqual(chunks[0].locator, "page 1-3")
+
+    def test_unreadable_page_falls_back_to_pdfminer(self):
+        with mock.patch.object(fitz.Page, "get_text", side_effect=RuntimeError("broken page")):
+            text = PDFExtractor().extract(self.path)
+        self.assertIn("Hashing maps data to a digest.", text.split("\f")[0])
+        self.assertIn("Firewalls filter network traffic.", text.split("\f")[2])
+
+    def test_unopenable_file_falls_back_to_pdfminer(self):
+        with mock.patch.object(pdf_extractor.fitz, "open", side_effect=RuntimeError("cannot open")):
+            text = PDFExtractor().extract(self.path)
+        self.assertIn("Firewalls filter network traffic.", text)
+
+    def test_page_ranges(self):
+        self.assertEqual(PDFExtractor.page_ranges(10, 3), [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual(PDFExtractor.page_ranges(2, 4), [(0, 1), (1, 2)])
+
+    def test_parallel_matches_sequential(self):
+        with mock.patch.object(PDFExtractor, "PARALLEL_MIN_PAGES", 0):
+            parallel = PDFExtractor.extract_pages(self.path, workers=2)
+        self.assertEqual(parallel, pdf_extractor._extract_page_range(str(self.path), 0, len(PAGES)))
+
+
+
+class TestScannedPDFOCR(unittest.TestCase):
+    """Pages without a text layer are rendered, OCR'd and cached by image hash"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "scan.pdf"
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "This page has a real text layer with enough characters.")
+        for shade in (40, 200):
+            image = io.BytesIO()
+            Image.new("RGB", (200, 100), (shade, shade, shade)).save(image, format="PNG")
+            doc.new_page().insert_image(fitz.Rect(72, 72, 272, 172), stream=image.getvalue())
+        doc.save(str(self.path))
+        doc.close()
+        self.cache_path = Path(self.tmp.name) / "ocr.db"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def extract(self, service, **kwargs):
+        calls = []
+
+        def fake_ocr(image, lang, timeout):
+            calls.append(image.size)
+            return f"Scanned text {len(calls)}"
+
+        with mock.patch.object(ocr.pytesseract, "get_tesseract_version", return_value="5.0"), \
+                mock.patch.object(ocr.pytesseract, "image_to_string", side_effect=fake_ocr):
+            text = PDFExtractor(ocr=service, **kwargs).extract(self.path)
+        return text, calls
+
+    def test_scanned_pages_are_ocrd_and_cached(self):
+        text, calls = self.extract(OCRService(cache_path=self.cache_path), ocr_dpi=72)
+        pages = text.split("\f")
+        self.assertTrue(pages[0].startswith("This page has a real text layer"))
+        self.assertEqual(sorted(pages[1:]), ["Scanned text 1", "Scanned text 2"])
+        # Rendered at 72 DPI, an A4 page is 595x842 pixels
+        self.assertEqual(calls, [(595, 842), (595, 842)])
+
+        # Re-ingestion (a new process with the same cache file) runs no OCR at all
+        service = pickle.loads(pickle.dumps(OCRService(cache_path=self.cache_path)))
+        again, calls = self.extract(service, ocr_dpi=72)
+        self.assertEqual((again, calls), (text, []))
+        self.assertEqual(service.get_stats()["hits"], 2)
+
+    def test_page_limit(self):
+        text, calls = self.extract(OCRService(), ocr_dpi=72, ocr_max_pages=1)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(text.split("\f")[2], "")
+
+    def test_failures_are_not_cached(self):
+        service = OCRService(cache_path=self.cache_path)
+        with mock.patch.object(ocr.pytesseract, "get_tesseract_version", return_value="5.0"), \
+                mock.patch.object(ocr.pytesseract, "image_to_string", side_effect=RuntimeError("Tesseract timeout")):
+            text = PDFExtractor(ocr=service, ocr_dpi=72).extract(self.path)
+        self.assertEqual(text.count("\f"), 2)
+        self.assertEqual(service.get_stats()["failures"], 2)
+        _, calls = self.extract(service, ocr_dpi=72)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+"""Test cases for the staged ingestion pipeline"""
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from core.classifier import DocumentClassifier
+from core import pipeline as pipeline_module
+from core.pipeline import IngestionPipeline, move_to_sorted
+from core.processor import FileProcessor
+
+
+class RecordingDatabase:
+    """Stands in for DatabaseManager and records each add_chunks batch"""
+
+    def __init__(self, fail: bool = False, fail_on: str = None):
+        self.batches = []
+        self.fail = fail
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def add_chunks(self, chunks):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        ids = [chunk.chunk_id for chunk in chunks]
+        if len(set(ids)) != len(ids):
+            raise ValueError("duplicate IDs in add")  # as Chroma's DuplicateIDError
+        if self.fail_on and any(chunk.filename == self.fail_on for chunk in chunks):
+            raise RuntimeError(f"cannot write {self.fail_on}")
+        with self.lock:
+            self.batches.append(list(chunks))
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    """Files flow through extraction, classification and batched writes"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.incoming = root / "incoming"
+        self.sorted_dir = root / "sorted"
+        self.incoming.mkdir()
+        self.files = []
+        for i in range(12):
+            path = self.incoming / f"notes_{i}.txt"
+            path.write_text(f"Lecture {i} on database normalization and SQL joins. " * 40)
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_pipeline(self, db, **kwargs):
+        indexed = []
+        kwargs.setdefault("flush_interval", 0.2)
+        pipeline = IngestionPipeline(
+            db, DocumentClassifier(), FileProcessor(), self.sorted_dir,
+            workers=2, use_processes=False,
+            on_indexed=lambda document, chunks: indexed.append((document, chunks)), **kwargs
+        )
+        return pipeline, indexed
+
+    def test_all_files_indexed_in_batches(self):
+        """Every file should be moved, chunked and written with fewer writes than files"""
+        db = RecordingDatabase()
+        pipeline, indexed = self.make_pipeline(db, batch_size=10_000, queue_size=4)
+        for path in self.files:
+            pipeline.submit(path)
+        stats = pipeline.close()
+
+        self.assertEqual(stats.files, len(self.files))
+        self.assertEqual(stats.failed, 0)
+        self.assertEqual(len(indexed), len(self.files))
+        self.assertLess(len(db.batches), len(self.files))
+        self.assertEqual(sum(len(batch) for batch in db.batches), stats.chunks)
+        for document, _ in indexed:
+            self.assertTrue(document.filepath.exists())
+            self.assertTrue(str(document.filepath).startswith(str(self.sorted_dir)))
+        self.assertEqual(list(self.incoming.iterdir()), [])
+
+    def test_wait_idle(self):
+        """wait_idle should return once every submitted file is written"""
+        db = RecordingDatabase()
+        pipeline, indexed = self.make_pipeline(db)
+        for path in self.files[:3]:
+            pipeline.submit(path)
+        self.assertTrue(pipeline.wait_idle(timeout=10))
+        self.assertEqual(len(indexed), 3)
+        pipeline.close()
+
+    def test_write_failures_are_counted(self):
+        """A failing database write should mark its files failed, not hang the pipeline"""
+        pipeline, indexed = self.make_pipeline(RecordingDatabase(fail=True))
+        for path in self.files[:3]:
+            pipeline.submit(path)
+        stats = pipeline.close()
+        self.assertEqual(stats.failed, 3)
+        self.assertEqual(indexed, [])
+
+    def test_identical_files_in_one_batch(self):
+        """Byte-identical files share chunk IDs; each ID is written once and both files are indexed"""
+        copy = self.incoming / "copy.txt"
+        copy.write_bytes(self.files[0].read_bytes())
+        db = RecordingDatabase()
+        pipeline, indexed = self.make_pipeline(db, batch_size=10_000, flush_interval=30)
+        pipeline.submit(self.files[0])
+        pipeline.submit(copy)
+        stats = pipeline.close()
+
+        self.assertEqual((stats.files, stats.failed), (2, 0))
+        self.assertEqual(len(indexed), 2)
+        self.assertEqual(len(db.batches), 1)
+        self.assertEqual(len(db.batches[0]), len(indexed[0][1]))
+
+    def test_failed_batch_falls_back_to_single_files(self):
+        """One unwritable file should not sink the rest of its batch, and is queued for retry"""
+        db = RecordingDatabase(fail_on="notes_1.txt")
+        pipeline, indexed = self.make_pipeline(db, batch_size=10_000)
+        for path in self.files[:3]:
+            pipeline.submit(path)
+        stats = pipeline.close()
+
+        self.assertEqual((stats.files, stats.failed), (2, 1))
+        self.assertEqual(sorted(document.filename for document, _ in indexed), ["notes_0.txt", "notes_2.txt"])
+        unwritten = pipeline.take_unwritten()
+        self.assertEqual([path.name for path in unwritten], ["notes_1.txt"])
+        self.assertTrue(unwritten[0].exists())
+        self.assertEqual(pipeline.take_unwritten(), [])
+
+    def test_large_csv_is_written_in_bounded_batches(self):
+        """A big CSV reaches the database in parts of at most batch_size, never as one list"""
+        path = self.incoming / "grades.csv"
+        with open(path, "w") as f:
+            f.write("student,course,grade\n")
+            for i in range(20_000):
+                f.write(f"student {i},Database Systems,{i % 100}\n")
+        db = RecordingDatabase()
+        pipeline, indexed = self.make_pipeline(db, batch_size=50, queue_size=2)
+        largest = []
+        original = pipeline.file_processor.iter_chunk_batches
+
+        def watch_batches(document, batch_size):
+            for batch in original(document, batch_size):
+                largest.append(len(batch))
+                yield batch
+        pipeline.file_processor.iter_chunk_batches = watch_batches
+        pipeline.submit(path)
+        stats = pipeline.close()
+
+        self.assertEqual((stats.files, stats.failed), (1, 0))
+        self.assertGreater(len(db.batches), 10)
+        self.assertLessEqual(max(largest), 50)
+        self.assertTrue(all(len(batch) <= 50 for batch in db.batches))
+        chunk_ids = indexed[0][1]
+        self.assertEqual(chunk_ids, [chunk.chunk_id for batch in db.batches for chunk in batch])
+        self.assertEqual(len(chunk_ids), stats.chunks)
+        self.assertIn("student 19999", db.batches[-1][-1].text)
+
+    def test_worker_gets_its_share_of_ocr_workers(self):
+        """Each extraction process runs only its share of the OCR and archive member workers"""
+        processor = FileProcessor()
+        processor.ocr.workers = 4
+        processor.archive_extractor.workers = 7
+        try:
+            pipeline_module._init_worker(processor, processor.ocr.per_process(2),
+                                         processor.archive_extractor.per_process(2))
+            worker_processor = pipeline_module._worker_processor
+        finally:
+            pipeline_module._worker_processor = None
+        self.assertEqual(worker_processor.ocr.workers, 2)
+        self.assertIs(worker_processor.pdf_extractor.ocr, worker_processor.ocr)
+        archive = worker_processor.archive_extractor
+        self.assertEqual((archive.workers, archive.parallel_min_members), (3, archive.WORKER_MIN_MEMBERS))
+
+    def test_move_to_sorted_renames_duplicates(self):
+        """Duplicate names should get a clean numeric suffix"""
+        hierarchy = {"domain": "Education", "category": "Other", "file_extension": "txt"}
+        first = move_to_sorted(self.files[0], hierarchy, self.sorted_dir)
+        duplicate = self.incoming / "notes_0.txt"
+        duplicate.write_text("again")
+        second = move_to_sorted(duplicate, hierarchy, self.sorted_dir)
+        self.assertEqual(first.name, "notes_0.txt")
+        self.assertEqual(second.name, "notes_0_2.txt")
+
+
+if __name__ == '__main__':
+    unittest.main()
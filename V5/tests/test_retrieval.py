@@ -0,0 +1,172 @@
+"""Test cases for BM25 keyword retrieval and hybrid fusion"""
+import tempfile
+import unittest
+from pathlib import Path
+from core.bm25_index import BM25Index
+from core.database import DatabaseManager
+from core.embeddings import EmbeddingService, QueryEmbeddingCache
+from models.document import DocumentChunk
+
+
+def make_chunk(chunk_id, text, file_hash="h1", filepath="/sorted/notes.pdf"):
+    return DocumentChunk(chunk_id=chunk_id, document_hash=file_hash, text=text, chunk_index=0,
+                         filename=Path(filepath).name, category="Education", filepath=filepath)
+
+
+CHUNKS = [
+    make_chunk("a_0", "Unit-4 covers process scheduling and deadlocks in CS-301."),
+    make_chunk("a_1", "Operating systems manage memory, files and processes."),
+    make_chunk("b_0", "Error ECONNREFUSED means the server refused the connection.",
+               file_hash="h2", filepath="/sorted/errors.txt"),
+]
+
+
+class TestBM25Index(unittest.TestCase):
+    """Inverted index maintenance and exact-term ranking"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = BM25Index(Path(self.tmp.name) / "bm25.db")
+        self.index.add_chunks(CHUNKS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_exact_terms_rank_first(self):
+        """Course codes and error names should retrieve the chunk that contains them"""
+        self.assertEqual(self.index.search("What is in Unit-4 of CS-301?")[0]["chunk_id"], "a_0")
+        self.assertEqual(self.index.search("ECONNREFUSED")[0]["chunk_id"], "b_0")
+
+    def test_query_syntax_is_escaped(self):
+        """FTS5 operators and quotes in user text should not raise"""
+        self.assertEqual(BM25Index.build_match_query('NEAR("x" AND -y)'), '"near" OR "x" OR "and" OR "y"')
+        self.assertEqual(self.index.search('"zebra NOT ('), [])
+        self.assertEqual(self.index.search("?!"), [])
+
+    def test_deletes_and_replacements(self):
+        """Deletes by ID, hash and filepath should drop entries; re-adding an ID replaces it"""
+        self.index.add_chunks([make_chunk("a_1", "Replaced text about paging.")])
+        self.assertEqual(self.index.count(), 3)
+        self.assertEqual(self.index.search("paging")[0]["chunk_id"], "a_1")
+
+        self.assertEqual(self.index.delete_by_filepath("/sorted/errors.txt"), 1)
+        self.assertEqual(self.index.search("ECONNREFUSED"), [])
+        self.assertEqual(self.index.delete_ids(["a_1"]), 1)
+        self.assertEqual(self.index.delete_by_hash("h1"), 1)
+        self.assertEqual(self.index.count(), 0)
+
+
+class LengthBackend:
+    """Tiny deterministic embedding backend"""
+
+    name = "length"
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class StubCollection:
+    """Stands in for a Chroma collection with a fixed dense ranking"""
+
+    def __init__(self, ranking):
+        self.ranking = ranking
+
+    def count(self):
+        return len(CHUNKS)
+
+    def query(self, query_embeddings, n_results):
+        self.queries = getattr(self, "queries", 0) + 1
+        hits = self.ranking[:n_results]
+        per_query = len(query_embeddings)
+        return {
+            "ids": [[c.chunk_id for c in hits]] * per_query,
+            "documents": [[c.text for c in hits]] * per_query,
+            "metadatas": [[c.to_metadata() for c in hits]] * per_query,
+            "distances": [[0.4 + 0.1 * i for i in range(len(hits))]] * per_query,
+        }
+
+
+class TestHybridQuery(unittest.TestCase):
+    """DatabaseManager.query should fuse dense and BM25 rankings"""
+
+    def make_manager(self, mode):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db = DatabaseManager.__new__(DatabaseManager)
+        db.retrieval_mode = mode
+        db.last_timings = {}
+        db.embedding_service = EmbeddingService(LengthBackend())
+        db.query_cache = QueryEmbeddingCache()
+        db.collection = StubCollection([CHUNKS[1], CHUNKS[2], CHUNKS[0]])
+        db.keyword_index = BM25Index(Path(tmp.name) / "bm25.db")
+        db.keyword_index.add_chunks(CHUNKS)
+        return db
+
+    def test_rrf_promotes_exact_match(self):
+        """A chunk ranked last by vectors but first by BM25 should move up"""
+        results = self.make_manager("hybrid").query("Unit-4 CS-301 scheduling", n_results=3)
+        self.assertEqual(results[0]["chunk_id"], "a_0")
+        self.assertTrue(all("rrf_score" in c and "similarity" in c for c in results))
+
+    def test_vector_mode_keeps_dense_order(self):
+        """Vector mode should not consult the keyword index"""
+        db = self.make_manager("vector")
+        results = db.query("Unit-4 CS-301 scheduling", n_results=3)
+        self.assertEqual([c["chunk_id"] for c in results], ["a_1", "b_0", "a_0"])
+        self.assertNotIn("bm25_ms", db.last_timings)
+
+    def test_per_stage_timings(self):
+        """Hybrid queries should record a timing for every stage"""
+        db = self.make_manager("hybrid")
+        db.query("scheduling", n_results=2)
+        self.assertEqual(set(db.last_timings), {"embed_ms", "vector_ms", "bm25_ms", "fusion_ms", "total_ms"})
+
+    def test_query_embeddings_are_cached(self):
+        """Repeats and case/punctuation variants should reuse the cached query vector"""
+        db = self.make_manager("vector")
+        db.query("What is Unit-4?", n_results=2)
+        db.query("what is unit-4", n_results=2)
+        self.assertEqual(db.embedding_service.backend.calls, 1)
+        self.assertEqual(db.query_cache.get_stats()["hits"], 1)
+        self.assertIn("embed_ms", db.last_timings)
+
+    def test_precomputed_embedding_skips_embedding(self):
+        """A supplied query vector should be used as is"""
+        db = self.make_manager("vector")
+        db.query("scheduling", n_results=2, query_embedding=[1.0, 0.0])
+        self.assertEqual(db.embedding_service.backend.calls, 0)
+        self.assertNotIn("embed_ms", db.last_timings)
+
+    def test_embed_queries_batches_misses(self):
+        """Distinct uncached queries should be embedded in a single backend call"""
+        db = self.make_manager("vector")
+        vectors = db.embed_queries(["alpha", "beta", "Alpha?"])
+        self.assertEqual(db.embedding_service.backend.calls, 1)
+        self.assertIs(vectors[0], vectors[2])
+
+    def test_query_batch_uses_one_embedding_and_chroma_call(self):
+        """A batch should embed once, query Chroma once and keep input order"""
+        db = self.make_manager("hybrid")
+        results = db.query_batch(["ECONNREFUSED", "Unit-4 CS-301", "memory"], n_results=2)
+        self.assertEqual(db.embedding_service.backend.calls, 1)
+        self.assertEqual(db.collection.queries, 1)
+        self.assertEqual([chunks[0]["chunk_id"] for chunks, _ in results[:2]], ["b_0", "a_0"])
+        self.assertTrue(all("bm25_ms" in timings for _, timings in results))
+
+    def test_fusion_fills_lexical_only_hits(self):
+        """Keyword-only hits should get a neutral similarity so confidence scoring still works"""
+        fused = DatabaseManager.fuse_rankings([], [{"chunk_id": "x", "text": "t"}])
+        self.assertEqual(fused[0]["similarity"], DatabaseManager.LEXICAL_ONLY_SIMILARITY)
+        self.assertAlmostEqual(fused[0]["rrf_score"], 1 / 61)
+
+    def test_unknown_mode_rejected(self):
+        with self.assertRaises(ValueError):
+            DatabaseManager(Path(tempfile.gettempdir()), retrieval_mode="sparse")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""Test cases for single-flight coalescing of identical LLM requests"""
+import asyncio
+import threading
+import unittest
+from unittest import mock
+from core import llm
+from core.llm import LLMService
+from core.single_flight import SingleFlight
+
+CHUNKS = [{"chunk_id": "abc_0", "filename": "unit1.pdf", "text": "Cyber security protects systems.",
+           "similarity": 0.8, "distance": 0.4}]
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Leader/follower bookkeeping"""
+
+    def test_followers_share_result_and_error(self):
+        flights = SingleFlight()
+        flight, leader = flights.join("k")
+        follower, follower_leads = flights.join("k")
+        self.assertTrue(leader)
+        self.assertFalse(follower_leads)
+        self.assertIs(flight, follower)
+        flights.finish("k", flight, result=42)
+        self.assertEqual(follower.wait(), 42)
+
+        # The finished key starts a new flight
+        flight, leader = flights.join("k")
+        self.assertTrue(leader)
+        flights.join("k")
+        flights.finish("k", flight, error=ValueError("boom"))
+        with self.assertRaises(ValueError):
+            flight.wait()
+        self.assertEqual(flights.get_stats(), {"in_flight": 0, "leaders": 2, "coalesced": 2})
+
+
+class TestCoalescedGeneration(unittest.TestCase):
+    """Concurrent identical requests should produce one Ollama call"""
+
+    def test_concurrent_requests_share_one_generation(self):
+        service = LLMService(model="test-model")
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fake_generate(**kwargs):
+            calls.append(kwargs)
+            started.set()
+            release.wait(5)
+            return {"response": "Cyber security protects systems."}
+
+        results = []
+        with mock.patch.object(llm.ollama, "generate", side_effect=fake_generate):
+            threads = [threading.Thread(target=lambda: results.append(
+                service.generate_response("what is cyber security", CHUNKS))) for _ in range(4)]
+            threads[0].start()
+            started.wait(5)
+            for thread in threads[1:]:
+                thread.start()
+            while service.single_flight.get_stats()["coalesced"] < 3:
+                threading.Event().wait(0.01)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(service.single_flight.get_stats(), {"in_flight": 0, "leaders": 1, "coalesced": 3})
+
+    def test_async_followers_wait_for_leader(self):
+        service = LLMService(model="test-model")
+        calls = []
+
+        class FakeAsyncClient:
+            async def generate(self, **kwargs):
+                calls.append(kwargs)
+                await asyncio.sleep(0.05)
+                return {"response": "Cyber security protects systems."}
+
+        service._async_client = FakeAsyncClient()
+
+        async def scenario():
+            return await asyncio.gather(*[service.generate_response_async("what is cyber security", CHUNKS)
+                                          for _ in range(3)])
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(service.single_flight.get_stats()["coalesced"], 2)
+
+    def test_leader_timeout_reaches_followers(self):
+        service = LLMService(model="test-model")
+
+        class SlowAsyncClient:
+            async def generate(self, **kwargs):
+                await asyncio.sleep(1)
+
+        service._async_client = SlowAsyncClient()
+
+        async def scenario():
+            return await asyncio.gather(*[service.generate_response_async("q", CHUNKS, timeout=0.05)
+                                          for _ in range(2)], return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(result, asyncio.TimeoutError) for result in results))
+        self.assertEqual(service.single_flight.get_stats()["in_flight"], 0)
+
+    def test_leader_disconnect_gives_followers_an_error(self):
+        """A leader cancelled by its client must not cancel the followers it was answering"""
+        service = LLMService(model="test-model")
+
+        class HangingAsyncClient:
+            async def generate(self, stream=False, **kwargs):
+                await asyncio.sleep(10)
+
+        service._async_client = HangingAsyncClient()
+
+        async def scenario():
+            leader = asyncio.ensure_future(service.generate_response_async("q", CHUNKS))
+            await asyncio.sleep(0.01)
+            follower = asyncio.ensure_future(service.generate_response_async("q", CHUNKS))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            answer = await asyncio.gather(leader, follower, return_exceptions=True)
+
+            # Streaming leader closed by the server after the client went away
+            events = service.generate_response_stream_async("r", CHUNKS)
+            leading = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.01)
+            following = asyncio.ensure_future(service.generate_response_stream_async("r", CHUNKS).__anext__())
+            await asyncio.sleep(0.01)
+            leading.cancel()
+            await asyncio.gather(leading, return_exceptions=True)
+            await events.aclose()
+            stream = await asyncio.gather(following, return_exceptions=True)
+            return answer, stream
+
+        (leader, follower), (follower_event,) = asyncio.run(scenario())
+        self.assertIsInstance(leader, asyncio.CancelledError)
+        self.assertIsInstance(follower, RuntimeError)
+        self.assertIsInstance(follower_event, RuntimeError)
+        self.assertEqual(service.single_flight.get_stats()["in_flight"], 0)
+
+    def test_sync_leader_interrupt_gives_followers_an_error(self):
+        flights = SingleFlight()
+        flight, _ = flights.join("k")
+        flights.join("k")
+        flights.finish("k", flight, error=KeyboardInterrupt())
+        with self.assertRaisesRegex(RuntimeError, "cancelled"):
+            flight.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Test cases for cached /status statistics"""
+import tempfile
+import unittest
+from pathlib import Path
+from core.manifest import IngestionManifest
+from core.stats import StatsService
+
+
+class StubLLM:
+    def __init__(self):
+        self.checks = 0
+
+    def check_availability(self):
+        self.checks += 1
+        return True
+
+
+class StubDatabase:
+    def get_count(self):
+        return 42
+
+
+class TestStatsService(unittest.TestCase):
+    """Running totals follow ingests and deletes; health comes from the background check"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "sorted"
+        self.manifest = IngestionManifest(Path(self.tmp.name) / "manifest.db")
+        self.llm = StubLLM()
+        self.stats = StatsService(self.manifest, self.root, db_manager=StubDatabase(), llm_service=self.llm)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, relative: str, size: int, chunks: int) -> Path:
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        self.manifest.record(path, relative, "1", [f"{relative}_{i}" for i in range(chunks)])
+        return path
+
+    def test_totals_per_domain_category_and_extension(self):
+        self.add("CS/Networks/pdf/a.pdf", 100, 3)
+        self.add("CS/Networks/pdf/b.pdf", 50, 2)
+        self.add("CS/Databases/docx/c.docx", 10, 1)
+        self.add("Math/Algebra/txt/d.txt", 5, 1)
+
+        stats = self.stats.get_stats()
+        self.assertEqual(stats['sorted_files'], 4)
+        self.assertEqual(stats['categories'], ["CS", "Math"])
+        cs = stats['library']['domains']['CS']
+        self.assertEqual((cs['files'], cs['chunks'], cs['bytes']), (3, 6, 160))
+        pdf = cs['categories']['Networks']['extensions']['.pdf']
+        self.assertEqual(pdf, {'files': 2, 'chunks': 5, 'bytes': 150})
+
+    def test_reindex_and_delete_update_the_totals(self):
+        path = self.add("CS/Networks/pdf/a.pdf", 100, 3)
+        self.add("CS/Networks/pdf/b.pdf", 50, 2)
+        path.write_bytes(b"y" * 70)
+        self.manifest.record(path, "new", "1", ["new_0"])
+        self.manifest.remove(self.root / "CS/Networks/pdf/b.pdf")
+
+        library = self.stats.library()
+        self.assertEqual((library['files'], library['chunks'], library['bytes']), (1, 1, 70))
+        self.manifest.remove(path)
+        self.assertEqual(self.stats.library()['domains'], {})
+
+    def test_existing_manifest_is_backfilled(self):
+        self.add("CS/Networks/pdf/a.pdf", 100, 3)
+        self.manifest._conn.execute("DELETE FROM dir_totals")
+        self.manifest._conn.execute("PRAGMA user_version = 0")
+        self.manifest._conn.commit()
+
+        reopened = IngestionManifest(self.manifest.db_path)
+        self.assertEqual(StatsService(reopened, self.root).library()['chunks'], 3)
+
+    def test_health_is_checked_off_the_request_path(self):
+        stats = self.stats.get_stats()
+        self.assertIsNone(stats['ollama_available'])
+        self.assertEqual(self.llm.checks, 0)
+
+        self.stats.refresh_health()
+        stats = self.stats.get_stats()
+        self.assertTrue(stats['ollama_available'])
+        self.assertEqual(stats['database_count'], 42)
+        self.stats.get_stats()
+        self.assertEqual(self.llm.checks, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
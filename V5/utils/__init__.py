@@ -1,5 +1,9 @@
 """Utility functions"""
 from .file_utils import FileUtils
 from .text_utils import TextUtils
+from .keyword_matcher import KeywordMatcher, TokenizedText
+from .rule_engine import RuleEngine
+from .chunker import StructuredChunker, TextChunk
 
-__all__ = ['FileUtils', 'TextUtils']
+__all__ = ['FileUtils', 'TextUtils', 'KeywordMatcher', 'TokenizedText', 'RuleEngine',
+           'StructuredChunker', 'TextChunk']
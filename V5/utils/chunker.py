@@ -0,0 +1,194 @@
+"""Structure-aware chunking: split text at section markers, paragraphs and sentences to a token target"""
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+import re
+
+from .text_utils import TextUtils
+
+# Section headers written by the extractors, e.g. "=== Slide 3 ===", "=== Sheet: Sales ===",
+# "=== Code Cell 7 ===", "=== Page 2 ===" and "=== Member: docs/a.pdf ===", plus the form
+# feeds pdfminer puts between pages
+SECTION_PATTERN = re.compile(
+    r"^[ \t]*=== (?:(?P<kind>Slide|Page) (?P<number>\d+)|Sheet: (?P<sheet>.*?)"
+    r"|(?:Markdown|Code) Cell (?P<cell>\d+)|Member: (?P<member>.+?)) ===[ \t]*$|\f",
+    re.MULTILINE
+)
+MEMBER_PATTERN = re.compile(r"^[ \t]*=== Member: .+? ===[ \t]*$", re.MULTILINE)
+PARAGRAPH_PATTERN = re.compile(r"\S.*?(?=\n[ \t]*\n|\Z)", re.DOTALL)
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?](?=\s)|\Z)", re.DOTALL)
+
+
+@dataclass
+class TextChunk:
+    """One chunk of text and where it came from (e.g. "page 3", "slide 2-4", "sheet Sales")"""
+    text: str
+    locator: str = ""
+    member: str = ""  # archive member path, for text extracted from archives
+
+
+class StructuredChunker:
+    """Chunks text to about ``target_tokens`` estimated tokens per chunk.
+
+    Chunks break at section markers (slides, sheets, notebook cells, PDF
+    pages) when the current chunk is at least half full, otherwise small
+    sections are packed together; archive members always start a new chunk. Inside a section, text is split at
+    paragraphs, then sentences, then whitespace, and consecutive chunks of a
+    section share up to ``overlap_tokens`` of trailing sentences. Chunk text
+    is always a verbatim slice of the input.
+    """
+
+    def __init__(self, target_tokens: int = 200, overlap_tokens: int = 30):
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = target_tokens // 2
+
+    @staticmethod
+    def iter_sections(text: str) -> Iterator[Tuple[int, int, Optional[Tuple[str, str]], str]]:
+        """Yield (start, end, (kind, label), member) for each marked section; unmarked text has no locator
+
+        Page numbers restart at each archive member, and only members whose
+        own text has form feeds are paged.
+        """
+        first_member = MEMBER_PATTERN.search(text)
+        paged = "\f" in text[:first_member.start() if first_member else len(text)]
+        locator = ("page", "1") if paged else None
+        member = ""
+        page = 1
+        start = 0
+        for match in SECTION_PATTERN.finditer(text):
+            yield start, match.start(), locator, member
+            if match.group(0) == "\f":
+                page += 1
+                locator = ("page", str(page))
+                start = match.end()
+                continue
+            if match.group('member') is not None:
+                member = match.group('member')
+                following = MEMBER_PATTERN.search(text, match.end())
+                page = 1
+                paged = "\f" in text[match.end():following.start() if following else len(text)]
+                locator = ("page", "1") if paged else None
+            elif match.group('kind'):
+                locator = (match.group('kind').lower(), match.group('number'))
+            elif match.group('sheet') is not None:
+                locator = ("sheet", match.group('sheet'))
+            else:
+                locator = ("cell", match.group('cell'))
+            # The header line stays in the chunk text; it names the slide, sheet, cell or member
+            start = match.start()
+        yield start, len(text), locator, member
+
+    def _units(self, text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Spans of paragraphs, or of sentences and word runs where a paragraph is too long"""
+        limit = self.target_tokens * TextUtils.CHARS_PER_TOKEN
+        for paragraph in PARAGRAPH_PATTERN.finditer(text, start, end):
+            if paragraph.end() - paragraph.start() <= limit:
+                yield paragraph.start(), paragraph.end()
+                continue
+            for sentence in SENTENCE_PATTERN.finditer(text, paragraph.start(), paragraph.end()):
+                s_start, s_end = sentence.start(), sentence.end()
+                while s_end - s_start > limit:
+                    cut = text.rfind(" ", s_start + 1, s_start + limit)
+                    cut = cut if cut > s_start else s_start + limit
+                    yield s_start, cut
+                    s_start = cut
+                    while s_start < s_end and text[s_start].isspace():
+                        s_start += 1
+                if s_end > s_start:
+                    yield s_start, s_end
+
+    @staticmethod
+    def format_locator(first: Optional[Tuple[str, str]], last: Optional[Tuple[str, str]]) -> str:
+        if first is None:
+            first = last
+        if first is None:
+            return ""
+        if last is None or last == first:
+            return f"{first[0]} {first[1]}"
+        if last[0] == first[0]:
+            return f"{first[0]} {first[1]}-{last[1]}"
+        return f"{first[0]} {first[1]} - {last[0]} {last[1]}"
+
+    def iter_chunks(self, text: str) -> Iterator[TextChunk]:
+        """Yield chunks in document order"""
+        if not text:
+            return
+
+        units: List[Tuple[int, int]] = []
+        first_locator = last_locator = None
+        chunk_member = ""
+
+        def emit() -> TextChunk:
+            return TextChunk(text[units[0][0]:units[-1][1]],
+                             self.format_locator(first_locator, last_locator), chunk_member)
+
+        def size(extra_end: int) -> int:
+            return TextUtils.estimate_tokens(text[units[0][0]:extra_end]) if units else 0
+
+        for start, end, locator, member in self.iter_sections(text):
+            section_units = list(self._units(text, start, end))
+            if not section_units:
+                continue
+            # Finish a well-filled chunk at the section boundary; keep packing small ones
+            if units and (size(units[-1][1]) >= self.min_tokens or member != chunk_member):
+                yield emit()
+                units = []
+            if not units:
+                first_locator = locator
+                chunk_member = member
+
+            for unit in section_units:
+                if units and size(unit[1]) > self.target_tokens:
+                    yield emit()
+                    units = self._overlap(text, units) if last_locator == locator else []
+                    while units and size(unit[1]) > self.target_tokens:
+                        units.pop(0)
+                    first_locator = locator
+                units.append(unit)
+                last_locator = locator
+
+        if units:
+            yield emit()
+
+    def _overlap(self, text: str, units: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Trailing units of a finished chunk worth repeating at the start of the next one"""
+        carried: List[Tuple[int, int]] = []
+        for unit in reversed(units[1:]):
+            if TextUtils.estimate_tokens(text[unit[0]:(carried or [unit])[-1][1]]) > self.overlap_tokens:
+                break
+            carried.insert(0, unit)
+        return carried
+
+    def iter_table_chunks(self, tables: Iterable[tuple]) -> Iterator[TextChunk]:
+        """Group streamed table rows into chunks that each repeat the table's header row
+        
+        ``tables`` yields (sheet name or None, (row number, header text),
+        iterator of (row number, row text)). Rows are consumed lazily, so
+        only one chunk is held in memory at a time.
+        """
+        for name, (header_row, header), rows in tables:
+            prefix = f"=== Sheet: {name} ===\n{header}" if name is not None else header
+            prefix_tokens = TextUtils.estimate_tokens(prefix)
+            where = f"sheet {name} " if name is not None else ""
+            lines: List[str] = []
+            tokens = prefix_tokens
+            first_row = last_row = 0
+            
+            for number, row_text in rows:
+                row_tokens = TextUtils.estimate_tokens(row_text) + 1
+                if lines and tokens + row_tokens > self.target_tokens:
+                    yield TextChunk("\n".join([prefix] + lines), f"{where}rows {first_row}-{last_row}")
+                    lines, tokens = [], prefix_tokens
+                if not lines:
+                    first_row = number
+                lines.append(row_text)
+                tokens += row_tokens
+                last_row = number
+            
+            if lines:
+                yield TextChunk("\n".join([prefix] + lines), f"{where}rows {first_row}-{last_row}")
+            else:
+                yield TextChunk(prefix, f"{where}rows {header_row}")
+    
+    def chunk(self, text: str) -> List[TextChunk]:
+        return list(self.iter_chunks(text))
@@ -15,7 +15,8 @@ class FileUtils:
         """Generate MD5 hash for file"""
         hasher = hashlib.md5()
         with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            # 1 MB reads: 4 KB reads made hashing large PDFs syscall-bound
+            for chunk in iter(lambda: f.read(1 << 20), b""):
                 hasher.update(chunk)
         return hasher.hexdigest()
     
@@ -36,7 +37,7 @@ class FileUtils:
             'code': ['.py', '.js', '.java', '.cpp', '.c', '.h', '.cs', '.rb', '.go'],
             'web': ['.html', '.css', '.xml'],
             'data': ['.json', '.yaml', '.yml', '.sql'],
-            'archive': ['.zip', '.rar', '.7z', '.tar', '.gz'],
+            'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.tgz'],
             'medical': ['.dcm', '.dicom', '.hl7', '.nii', '.svs', '.ecg'],
             'engineering': ['.dwg', '.dxf', '.stl'],
             'research': ['.tex', '.bib', '.ipynb', '.sav', '.sps', '.dta']
@@ -0,0 +1,164 @@
+"""Single-pass multi-keyword substring counting"""
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Union
+import re
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class TokenizedText:
+    """Text split once on spaces and counted per distinct token.
+
+    Each token keeps its trailing space, so the text is exactly the
+    concatenation of its tokens and any literal with no space before its last
+    character ("def ", "<div", "\\n-") can only occur inside a single token.
+    Counting such literals per distinct token and weighting by the token's
+    frequency gives the same result as counting them in the full text.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        pieces = text.split(' ')
+        last = pieces.pop()
+
+        self.token_counts: Dict[str, int] = {piece + ' ': n for piece, n in Counter(pieces).items()}
+        if last:
+            self.token_counts[last] = self.token_counts.get(last, 0) + 1
+
+        self._vocabulary = None
+        self._words = None
+
+    @staticmethod
+    def is_token_local(literal: str) -> bool:
+        """Check if every occurrence of the literal fits inside one token"""
+        return ' ' not in literal[:-1]
+
+    @property
+    def vocabulary(self) -> str:
+        """Distinct tokens joined by NUL, so token-local literals cannot straddle two tokens"""
+        if self._vocabulary is None:
+            self._vocabulary = '\x00'.join(self.token_counts)
+        return self._vocabulary
+
+    @property
+    def words(self) -> Set[str]:
+        """Maximal word-character runs, i.e. every ``w`` for which ``\\bw\\b`` matches"""
+        if self._words is None:
+            self._words = set(WORD_PATTERN.findall(self.vocabulary))
+        return self._words
+
+    def contains(self, literal: str) -> bool:
+        """Equivalent to ``literal in text``, answered from the vocabulary when possible"""
+        if self.is_token_local(literal):
+            return literal in self.vocabulary
+        # Each space-separated part must appear before the full text is scanned
+        if not all(part in self.vocabulary for part in literal.split(' ') if part):
+            return False
+        return literal in self.text
+
+
+class KeywordMatcher:
+    """Count many keywords in one pass over the text.
+
+    The keywords are compiled into one trie-shaped regex wrapped in a
+    lookahead, so every start position reports the longest keyword found
+    there. All shorter keywords starting at the same position are prefixes
+    of that match, which lets ``count_all`` reproduce ``str.count`` for every
+    keyword without scanning the text once per keyword. The regex runs over
+    the distinct tokens of a ``TokenizedText``, so a word repeated thousands
+    of times is matched once.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({kw for kw in keywords if kw})
+        self._keyword_set = set(self.keywords)
+
+        # Keywords with an inner space span tokens and are counted on the full text
+        local_keywords = [kw for kw in self.keywords if TokenizedText.is_token_local(kw)]
+        self._spanning = [kw for kw in self.keywords if not TokenizedText.is_token_local(kw)]
+
+        # str.count skips overlapping repeats of the same keyword ("sales" in
+        # "salesales"). Those repeats are matched as extra sentinel strings so
+        # the rare token that contains one can fall back to str.count.
+        self._overlap_sentinels: Dict[str, List[str]] = {}
+        for kw in local_keywords:
+            for size in self._border_sizes(kw):
+                self._overlap_sentinels.setdefault(kw + kw[size:], []).append(kw)
+
+        pattern_set = set(local_keywords) | set(self._overlap_sentinels)
+        patterns = sorted(pattern_set)
+
+        # Patterns that are prefixes of each pattern (including itself)
+        self._prefixes: Dict[str, List[str]] = {
+            pat: [pat[:i] for i in range(1, len(pat) + 1) if pat[:i] in pattern_set]
+            for pat in patterns
+        }
+
+        self._pattern = re.compile('(?=(' + self._build_trie_regex(patterns) + '))') if patterns else None
+        self._any_pattern = re.compile(self._build_trie_regex(self.keywords)) if self.keywords else None
+
+    @staticmethod
+    def _border_sizes(keyword: str) -> List[int]:
+        """Lengths of proper suffixes of the keyword that are also its prefix"""
+        return [i for i in range(1, len(keyword)) if keyword.startswith(keyword[-i:])]
+
+    @classmethod
+    def _build_trie_regex(cls, keywords: List[str]) -> str:
+        """Build a prefix-factored alternation that prefers the longest keyword"""
+        trie: dict = {}
+        for kw in keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+        return cls._node_to_regex(trie)
+
+    @classmethod
+    def _node_to_regex(cls, node: dict) -> str:
+        """Render one trie node as a regex fragment"""
+        branches = [re.escape(ch) + cls._node_to_regex(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        is_terminal = '' in node
+        if len(branches) == 1 and not is_terminal:
+            return branches[0]
+        # Greedy optional group: try the longer keywords first, then stop here
+        return '(?:' + '|'.join(branches) + ')' + ('?' if is_terminal else '')
+
+    def contains_any(self, text: str) -> bool:
+        """Check if any keyword occurs in the text, stopping at the first hit"""
+        if not text or self._any_pattern is None:
+            return False
+        return self._any_pattern.search(text) is not None
+
+    def count_all(self, text: Union[str, TokenizedText]) -> Dict[str, int]:
+        """Return ``{keyword: text.count(keyword)}`` for every keyword with a match"""
+        tokens = text if isinstance(text, TokenizedText) else TokenizedText(text)
+        if not tokens.text:
+            return {}
+
+        longest: Counter = Counter()
+        if self._pattern is not None:
+            findall = self._pattern.findall
+            for token, n in tokens.token_counts.items():
+                for match in findall(token):
+                    longest[match] += n
+
+        counts: Dict[str, int] = {}
+        for match, n in longest.items():
+            for kw in self._prefixes[match]:
+                counts[kw] = counts.get(kw, 0) + n
+
+        for sentinel, overlapping in self._overlap_sentinels.items():
+            if sentinel in counts:
+                for kw in overlapping:
+                    counts[kw] = sum(n * token.count(kw) for token, n in tokens.token_counts.items())
+                if sentinel not in self._keyword_set:
+                    del counts[sentinel]
+
+        for kw in self._spanning:
+            if tokens.contains(kw):
+                counts[kw] = tokens.text.count(kw)
+
+        return counts
@@ -0,0 +1,111 @@
+"""Precompiled presence rules evaluated against one tokenized text"""
+from collections import Counter
+from typing import Dict, List, Set
+import re
+
+from .keyword_matcher import TokenizedText, WORD_PATTERN
+
+
+class RuleEngine:
+    """Evaluate a declarative table of content rules in one pass.
+
+    Each rule is a dict with a unique ``name`` and any of:
+
+    - ``terms``: words or phrases matched as ``\\bterm\\b``
+    - ``substrings``: plain substrings matched anywhere
+    - ``patterns``: raw regexes, together with ``prefixes``, the literals
+      every match of those regexes starts with
+
+    A rule fires when any of its terms, substrings or patterns matches. Single
+    words are answered from the text's word set and substrings from the token
+    vocabulary. Phrases and patterns are only tried where their literal
+    prefix occurs, so no rule runs a regex scan over the full text.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        names = [rule["name"] for rule in rules]
+        if len(names) != len(set(names)):
+            raise ValueError("Rule names must be unique")
+
+        self.rules = rules
+        self._checks = {rule["name"]: self._compile_checks(rule) for rule in rules}
+        self._debug_patterns = {rule["name"]: self._compile_debug_pattern(rule) for rule in rules}
+        # Number of evaluated documents each rule fired on
+        self.hit_counts: Counter = Counter()
+
+    @staticmethod
+    def _compile_checks(rule: Dict) -> List[tuple]:
+        """Turn a rule into checks ordered from cheapest to most expensive"""
+        words, phrases, substrings, patterns = [], [], [], []
+        for term in rule.get("terms", []):
+            if WORD_PATTERN.fullmatch(term):
+                words.append(term)
+            else:
+                regex = re.compile(r'\b' + re.escape(term) + r'\b')
+                # Every word in a \bphrase\b match is a whole word of the text
+                phrases.append((term, WORD_PATTERN.findall(term), regex))
+        substrings.extend(rule.get("substrings", []))
+        for pattern in rule.get("patterns", []):
+            patterns.append((re.compile(pattern), rule["prefixes"]))
+
+        checks = []
+        if words:
+            checks.append(("words", words))
+        checks.extend(("phrase", phrase) for phrase in phrases)
+        if substrings:
+            checks.append(("substrings", substrings))
+        checks.extend(("pattern", pattern) for pattern in patterns)
+        return checks
+
+    @staticmethod
+    def _compile_debug_pattern(rule: Dict):
+        """One regex covering the whole rule, used to count individual matches"""
+        parts = []
+        if rule.get("terms"):
+            parts.append(r'\b(?:' + '|'.join(re.escape(term) for term in rule["terms"]) + r')\b')
+        parts.extend(re.escape(substring) for substring in rule.get("substrings", []))
+        parts.extend(rule.get("patterns", []))
+        return re.compile('|'.join('(?:' + part + ')' for part in parts))
+
+    @staticmethod
+    def _match_at_literal(regex, literal: str, haystack: str) -> bool:
+        """Try the regex only at the positions where its literal prefix occurs"""
+        pos = haystack.find(literal)
+        while pos != -1:
+            # match() still sees the characters before pos, so \b behaves as in search()
+            if regex.match(haystack, pos):
+                return True
+            pos = haystack.find(literal, pos + 1)
+        return False
+
+    @classmethod
+    def _run_check(cls, kind: str, check, tokens: TokenizedText) -> bool:
+        if kind == "words":
+            return not tokens.words.isdisjoint(check)
+        if kind == "phrase":
+            term, term_words, regex = check
+            if not all(word in tokens.words for word in term_words):
+                return False
+            # Token-local phrases can be searched in the much shorter vocabulary
+            haystack = tokens.vocabulary if TokenizedText.is_token_local(term) else tokens.text
+            return cls._match_at_literal(regex, term, haystack)
+        if kind == "substrings":
+            return any(tokens.contains(substring) for substring in check)
+        regex, prefixes = check
+        return any(tokens.contains(prefix) and cls._match_at_literal(regex, prefix, tokens.text)
+                   for prefix in prefixes)
+
+    def matches(self, name: str, tokens: TokenizedText) -> bool:
+        """Check a single rule against the text"""
+        return any(self._run_check(kind, check, tokens) for kind, check in self._checks[name])
+
+    def evaluate(self, tokens: TokenizedText) -> Set[str]:
+        """Return the names of all rules that fire on the text"""
+        fired = {rule["name"] for rule in self.rules if self.matches(rule["name"], tokens)}
+        self.hit_counts.update(fired)
+        return fired
+
+    def count_matches(self, text: str) -> Dict[str, int]:
+        """Count every match of every rule, for debugging rule tables"""
+        return {name: sum(1 for _ in pattern.finditer(text))
+                for name, pattern in self._debug_patterns.items()}
@@ -1,6 +1,7 @@
 """Text processing utilities"""
 from typing import List
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -8,6 +9,16 @@ logger = logging.getLogger(__name__)
 class TextUtils:
     """Text processing utilities"""
     
+    # Rough characters per token for English text with Llama-style tokenizers
+    CHARS_PER_TOKEN = 4
+    
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimate the token count of text without loading a tokenizer"""
+        if not text:
+            return 0
+        return math.ceil(len(text) / TextUtils.CHARS_PER_TOKEN)
+    
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 800, overlap: int = 150) -> List[str]:
         """Split text into overlapping chunks for better context retention"""
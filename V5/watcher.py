@@ -5,13 +5,17 @@ Clean, modular architecture with separation of concerns
 
 import os
 import time
-import shutil
 import logging
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from config import Config
 from core import DatabaseManager, LLMService, FileProcessor
+from core.embeddings import EmbeddingService
+from extractors import OCRService
+from core.manifest import IngestionManifest, move_indexed, prune_missing, reindex_if_changed, release_chunks
+from core.pipeline import IngestionPipeline
 from models import Document
 
 # Setup logging
@@ -46,116 +50,72 @@ def should_skip_file(filepath: Path) -> bool:
         return True
     return False
 
-# Ensure directories exist
-INCOMING_DIR.mkdir(parents=True, exist_ok=True)
-SORTED_DIR.mkdir(parents=True, exist_ok=True)
-DB_DIR.mkdir(parents=True, exist_ok=True)
+# Services are created by init_services() rather than at import time, so the
+# extraction worker processes (which re-import this module on Windows) stay light
+db_manager = None
+llm_service = None
+file_processor = None
+manifest = None
+pipeline = None
 
-# Initialize services
-db_manager = DatabaseManager(DB_DIR)
-llm_service = LLMService(model='llama3.2')
-file_processor = FileProcessor()
 
-# Track processed files
-processed_files = {}
+def init_services():
+    """Create directories, database/LLM services and the ingestion pipeline"""
+    global db_manager, llm_service, file_processor, manifest, pipeline
+    
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    SORTED_DIR.mkdir(parents=True, exist_ok=True)
+    DB_DIR.mkdir(parents=True, exist_ok=True)
+    
+    db_manager = DatabaseManager(DB_DIR, retrieval_mode=Config.RETRIEVAL_MODE,
+                                 embedding_service=EmbeddingService.from_config(Config))
+    llm_service = LLMService(model='llama3.2')
+    file_processor = FileProcessor(chunk_tokens=Config.CHUNK_TOKENS, overlap_tokens=Config.CHUNK_OVERLAP_TOKENS,
+                                   ocr=OCRService.from_config(Config), ocr_dpi=Config.OCR_DPI,
+                                   ocr_max_pages=Config.OCR_MAX_PAGES)
+    manifest = IngestionManifest(Config.MANIFEST_DB)
+    pipeline = IngestionPipeline(
+        db_manager, llm_service, file_processor, SORTED_DIR,
+        workers=Config.INGEST_WORKERS,
+        batch_size=Config.INGEST_BATCH_SIZE,
+        queue_size=Config.INGEST_QUEUE_SIZE,
+        on_indexed=track_processed_file
+    )
+
+
+def track_processed_file(document: Document, chunk_ids):
+    """Record where an indexed file lives so deletions can find its chunks"""
+    manifest.record(document.filepath, document.file_hash, FileProcessor.EXTRACTOR_VERSION, chunk_ids)
 
-def process_file(filepath):
-    """Process a single file: extract, chunk, classify, store"""
+
+def process_file(filepath) -> bool:
+    """Queue a single file for extraction, classification and storage"""
     filepath = Path(filepath)
     
     if not filepath.exists() or not filepath.is_file():
-        return
+        return False
     
     # Skip template and config files
     if should_skip_file(filepath):
         logger.info(f"⊘ Skipped (blacklist): {filepath.name}")
-        return
+        return False
     
-    logger.info(f"Processing file: {filepath.name}")
-    
-    try:
-        # Extract text
-        text = file_processor.extract_text(filepath)
-        if not text:
-            text = f"File: {filepath.name}"
-        
-        logger.info(f"Extracted {len(text)} characters from {filepath.name}")
-        
-        # NEW: Hierarchical classification
-        hierarchy = llm_service.classify_hierarchical(text, filepath.name)
-        domain = hierarchy["domain"]
-        category = hierarchy["category"]
-        file_ext = hierarchy["file_extension"]
-        
-        logger.info(f"Hierarchical classification: {domain} > {category} > {file_ext}")
-        
-        # Create document object with domain (use domain as legacy category for DB)
-        document = file_processor.create_document(filepath, text, domain)
-        
-        # Build target directory path: Domain/Category/FileExtension/
-        category_dir = SORTED_DIR / domain / category / file_ext
-        category_dir.mkdir(parents=True, exist_ok=True)
-
-        # Move file to sorted directory
-        dest_path = category_dir / filepath.name
-        
-        # Handle duplicate filenames with clean numbering (not cascading)
-        if dest_path.exists():
-            base_stem = filepath.stem
-            suffix = filepath.suffix
-            counter = 2
-            while dest_path.exists():
-                dest_path = category_dir / f"{base_stem}_{counter}{suffix}"
-                counter += 1
-            logger.info(f"File exists, using clean name: {dest_path.name}")
-        
-        shutil.move(str(filepath), str(dest_path))
-        logger.info(f"Moved to: {dest_path}")
-        
-        # Update document filepath
-        document.filepath = dest_path
-        
-        # Create chunks with better context preservation
-        chunks = file_processor.create_chunks(document, chunk_size=600)
-        logger.info(f"Created {len(chunks)} chunks")
-        
-        # Store in ChromaDB
-        if chunks:
-            db_manager.add_chunks(chunks)
-            
-            # Track processed file
-            processed_files[document.file_hash] = {
-                'filename': document.filename,
-                'path': str(dest_path),
-                'chunk_ids': [chunk.chunk_id for chunk in chunks]
-            }
-            
-            logger.info(f"Added {len(chunks)} chunks to database")
-        
-        logger.info(f"✓ Successfully processed: {filepath.name}")
-        
-    except Exception as e:
-        logger.error(f"Error processing {filepath}: {e}")
+    logger.info(f"Queued file: {filepath.name}")
+    pipeline.submit(filepath)
+    return True
 
 def remove_file_from_db(filepath):
     """Remove file vectors from database when file is deleted"""
     filepath = Path(filepath)
     
     try:
-        # Prefer removing by tracked file hash
-        file_hash = None
-        for hash_key, info in processed_files.items():
-            if info['path'] == str(filepath):
-                file_hash = hash_key
-                break
+        record = manifest.remove(filepath)
         
-        deleted_count = 0
-        if file_hash:
-            deleted_count = db_manager.delete_by_hash(file_hash)
-            if file_hash in processed_files:
-                del processed_files[file_hash]
+        if record:
+            # The manifest knows the exact chunk IDs written for this path (and which copies share them)
+            deleted_count = release_chunks(manifest, db_manager, record)
         else:
-            # Fallback: remove by filepath metadata if hash not tracked
+            # Fallback: remove by filepath metadata if the file was never recorded
             deleted_count = db_manager.delete_by_filepath(str(filepath))
         
         logger.info(f"Removed {deleted_count} chunks from database for {filepath.name}")
@@ -187,6 +147,60 @@ class FileWatcherHandler(FileSystemEventHandler):
             logger.info(f"Folder deleted: {event.src_path}")
 
 
+class SortedTreeHandler(FileSystemEventHandler):
+    """Track deletions and moves inside data/sorted through the manifest path index.
+    
+    New files in the sorted tree are written by the ingestion pipeline, so
+    creation events are ignored here.
+    """
+    
+    def on_deleted(self, event):
+        if event.is_directory:
+            logger.info(f"Sorted folder deleted: {event.src_path}")
+            for path in manifest.paths_under(event.src_path):
+                remove_file_from_db(path)
+        elif manifest.get(event.src_path):
+            logger.info(f"Sorted file deleted: {event.src_path}")
+            remove_file_from_db(event.src_path)
+    
+    def on_moved(self, event):
+        if event.is_directory:
+            src_dir = os.path.abspath(event.src_path)
+            moves = [(path, Path(event.dest_path) / os.path.relpath(path, src_dir))
+                     for path in manifest.paths_under(event.src_path)]
+            new_files = [p for p in Path(event.dest_path).rglob('*') if p.is_file()]
+        else:
+            moves = [(event.src_path, Path(event.dest_path))] if manifest.get(event.src_path) else []
+            new_files = [Path(event.dest_path)]
+        
+        # Files arriving from outside the tree belong to the ingestion pipeline
+        within_sorted = is_in_sorted(event.src_path) and is_in_sorted(event.dest_path)
+        followed = set()
+        for old_path, new_path in moves:
+            try:
+                # Same content at a new path: repoint the record and chunks instead of re-embedding
+                if (within_sorted and not should_skip_file(new_path)
+                        and move_indexed(manifest, db_manager, old_path, new_path, sorted_category(new_path))):
+                    followed.add(new_path.absolute())
+                    logger.info(f"Followed moved file without re-indexing: {new_path}")
+                    continue
+            except Exception as e:
+                logger.error(f"Error following move of {old_path}: {e}")
+            remove_file_from_db(old_path)
+        
+        if not within_sorted:
+            return
+        for filepath in new_files:
+            if filepath.absolute() in followed:
+                continue
+            if filepath.is_file() and not should_skip_file(filepath):
+                try:
+                    reindex_if_changed(manifest, db_manager, file_processor, filepath, sorted_category(filepath))
+                    logger.info(f"Re-indexed moved file: {filepath}")
+                except Exception as e:
+                    logger.error(f"Error re-indexing moved file {filepath}: {e}")
+
+
 def process_folder_recursive(folder_path):
     """Recursively process all files in a folder and its subfolders"""
     folder_path = Path(folder_path)
@@ -198,16 +212,16 @@ def process_folder_recursive(folder_path):
     logger.info(f"Processing folder recursively: {folder_path}")
     file_count = 0
     
-    # Walk through all subdirectories
+    # Walk through all subdirectories; submit() blocks while the pipeline is full
     for item in folder_path.rglob('*'):
         if item.is_file():
             try:
-                process_file(item)
-                file_count += 1
+                if process_file(item):
+                    file_count += 1
             except Exception as e:
                 logger.error(f"Error processing file {item}: {e}")
     
-    logger.info(f"Completed folder processing: {file_count} files processed")
+    logger.info(f"Queued {file_count} files from {folder_path}")
 
 
 def process_existing_files():
@@ -222,21 +236,72 @@ def process_existing_files():
             process_folder_recursive(item)
 
 
+def is_in_sorted(filepath) -> bool:
+    """Whether a path lies inside the sorted tree"""
+    return SORTED_DIR.absolute() in Path(filepath).absolute().parents
+
+
+def sorted_category(filepath: Path) -> str:
+    """Domain folder a sorted file lives under, used as its legacy DB category"""
+    try:
+        return Path(filepath).absolute().relative_to(SORTED_DIR.absolute()).parts[0]
+    except (ValueError, IndexError):
+        return "Other"
+
+
+def reconcile_manifest():
+    """On startup, skip unchanged sorted files and re-index the ones edited while stopped"""
+    removed = prune_missing(manifest, db_manager)
+    reindexed = 0
+    unchanged = 0
+    for path in manifest.paths():
+        filepath = Path(path)
+        try:
+            if reindex_if_changed(manifest, db_manager, file_processor, filepath,
+                                  sorted_category(filepath)) is None:
+                unchanged += 1
+            else:
+                reindexed += 1
+        except Exception as e:
+            logger.error(f"Error re-indexing {filepath}: {e}")
+
+    logger.info(f"Manifest: {unchanged} unchanged, {reindexed} re-indexed, {removed} removed")
+
+
+def retry_unwritten():
+    """Index sorted files whose pipeline database write failed"""
+    for filepath in pipeline.take_unwritten():
+        try:
+            if filepath.exists():
+                reindex_if_changed(manifest, db_manager, file_processor, filepath, sorted_category(filepath))
+                logger.info(f"✓ Retried database write for {filepath.name}")
+        except Exception as e:
+            logger.error(f"Error retrying {filepath}, will try again: {e}")
+            pipeline.mark_unwritten(filepath)
+
+
 def sync_sorted_with_db():
-    """Clean up DB entries for deleted files only (no re-processing)"""
+    """Reconcile the DB with the sorted tree: drop chunks whose file no longer exists.
+    
+    Deletions are normally handled by SortedTreeHandler as they happen; this
+    catches anything missed while the watcher was stopped. It pages through
+    chunk metadata only and checks each distinct filepath once.
+    """
     try:
-        # Only remove DB entries whose files no longer exist
-        results = db_manager.collection.get()
-        ids = results.get('ids', [])
-        metadatas = results.get('metadatas', [])
-        to_delete = []
-        for i, meta in enumerate(metadatas):
-            fp = meta.get('filepath')
-            if fp and not Path(fp).exists():
-                to_delete.append(ids[i])
-        if to_delete:
-            db_manager.collection.delete(ids=to_delete)
-            logger.info(f"Pruned {len(to_delete)} dangling chunks from DB (files missing)")
+        started = time.perf_counter()
+        missing = [fp for fp in db_manager.iter_filepaths(page_size=Config.SYNC_PAGE_SIZE)
+                   if not Path(fp).exists()]
+        
+        pruned = 0
+        for fp in missing:
+            record = manifest.remove(fp)
+            if record:
+                pruned += release_chunks(manifest, db_manager, record)
+            else:
+                pruned += db_manager.delete_by_filepath(fp)
+        if pruned:
+            logger.info(f"Pruned {pruned} dangling chunks from DB ({len(missing)} files missing)")
+        logger.info(f"Reconciliation finished in {time.perf_counter() - started:.1f}s")
     except Exception as e:
         logger.error(f"Error during sync: {e}")
 
@@ -251,30 +316,39 @@ def start_watching():
     logger.info(f"Database: {DB_DIR}")
     logger.info("=" * 60)
     
+    init_services()
+    reconcile_manifest()
+    
     # Process existing incoming files first
     process_existing_files()
     # Initial sync between sorted folder and DB
     sync_sorted_with_db()
     
-    # Setup watchdog for incoming directory only
+    # Setup watchdog for incoming files and for deletions/moves in the sorted tree
     event_handler = FileWatcherHandler()
     observer_incoming = Observer()
     observer_incoming.schedule(event_handler, str(INCOMING_DIR), recursive=False)
+    observer_incoming.schedule(SortedTreeHandler(), str(SORTED_DIR), recursive=True)
     observer_incoming.start()
     
     logger.info("✓ Watcher active. Monitoring data/incoming/ for new files.")
     logger.info("Press Ctrl+C to stop...")
     
     try:
+        last_sync = time.monotonic()
         while True:
-            # Periodic sync to clean up deleted files from DB (every 60 seconds)
-            sync_sorted_with_db()
             time.sleep(60)
+            retry_unwritten()
+            # Full reconciliation is a rare safety net; deletions arrive as events
+            if time.monotonic() - last_sync >= Config.SYNC_RECONCILE_INTERVAL:
+                sync_sorted_with_db()
+                last_sync = time.monotonic()
     except KeyboardInterrupt:
         logger.info("Stopping file watcher...")
         observer_incoming.stop()
     
     observer_incoming.join()
+    pipeline.close()
     logger.info("File watcher stopped.")
 
 